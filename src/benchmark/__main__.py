@@ -0,0 +1,6 @@
+import sys
+
+from benchmark.suite import main
+
+# Run from src/ with: python3 -m benchmark
+sys.exit(main(sys.argv[1:]))
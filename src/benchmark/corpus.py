@@ -0,0 +1,162 @@
+import json
+import os
+import random
+
+from typing import Dict
+
+# Relative weights of the block kinds in generated pages
+DEFAULT_BLOCKS = {
+    "paragraph": 10,
+    "heading": 3,
+    "unordered_list": 2,
+    "ordered_list": 2,
+    "quote": 1,
+    "code": 1,
+}
+
+# Chance that a generated word is replaced by each kind of inline markup
+DEFAULT_INLINE = {
+    "bold": 0.02,
+    "italic": 0.02,
+    "code": 0.01,
+    "link": 0.01,
+    "image": 0.002,
+}
+
+WORDS = (
+    "the of and to in is was that for on as with by he at from his an were are which this be "
+    "or has had one all their there been if more when will would who so no ring elves hobbit "
+    "shire road wizard council mountain river forest song tale lord king ancient shadow light"
+).split()
+
+TEMPLATE = """<!doctype html>
+<html>
+  <head>
+    <meta charset="utf-8" />
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+
+  <body>
+    <article>{{ Content }}</article>
+  </body>
+</html>
+"""
+
+class CorpusGenerator:
+    def __init__(
+        self,
+        seed:int = 0,
+        blocks:Dict[str, float]|None = None,
+        inline:Dict[str, float]|None = None,
+        blocks_per_page:int = 40
+    ):
+        self.seed = seed
+        self.blocks = blocks or DEFAULT_BLOCKS
+        self.inline = inline or DEFAULT_INLINE
+        self.blocks_per_page = blocks_per_page
+
+    def __repr__(self):
+        return f"CorpusGenerator({self.seed}, {self.blocks}, {self.inline}, {self.blocks_per_page})"
+
+    def describe(self) -> dict:
+        return {
+            "seed": self.seed,
+            "blocks": self.blocks,
+            "inline": self.inline,
+            "blocks_per_page": self.blocks_per_page,
+        }
+
+    def word(self, rng:random.Random) -> str:
+        word = rng.choice(WORDS)
+        roll = rng.random()
+        for kind, chance in self.inline.items():
+            if roll >= chance:
+                roll -= chance
+                continue
+            match kind:
+                case "bold":
+                    return f"**{word}**"
+                case "italic":
+                    return f"_{word}_"
+                case "code":
+                    return f"`{word}`"
+                case "link":
+                    return f"[{word}](/blog/{rng.choice(WORDS)})"
+                case "image":
+                    return f"![{word}](/images/{rng.choice(WORDS)}.png)"
+        return word
+
+    def sentence(self, rng:random.Random, words:int) -> str:
+        return " ".join(self.word(rng) for _ in range(words))
+
+    def block(self, rng:random.Random, kind:str) -> str:
+        match kind:
+            case "heading":
+                return f"{'#' * rng.randint(2, 4)} {self.sentence(rng, rng.randint(2, 6))}"
+            case "unordered_list":
+                return "\n".join(f"- {self.sentence(rng, rng.randint(4, 12))}" for _ in range(rng.randint(2, 6)))
+            case "ordered_list":
+                return "\n".join(f"{i}. {self.sentence(rng, rng.randint(4, 12))}" for i in range(1, rng.randint(3, 7)))
+            case "quote":
+                return "\n".join(f"> {self.sentence(rng, rng.randint(6, 14))}" for _ in range(rng.randint(1, 4)))
+            case "code":
+                lines = (f"print(\"{rng.choice(WORDS)}\")" for _ in range(rng.randint(2, 10)))
+                return "```\n" + "\n".join(lines) + "\n```"
+            case _:
+                lines = (self.sentence(rng, rng.randint(8, 20)) for _ in range(rng.randint(1, 5)))
+                return "\n".join(lines)
+
+    def page(self, index:int, blocks:int|None = None) -> str:
+        rng = random.Random(f"{self.seed}:{index}")
+        kinds = list(self.blocks)
+        weights = [self.blocks[kind] for kind in kinds]
+        chosen = rng.choices(kinds, weights, k=blocks or self.blocks_per_page)
+        return "\n\n".join([f"# Page {index} {self.sentence(rng, 3)}"] + [self.block(rng, kind) for kind in chosen]) + "\n"
+
+    def pathological_page(self, size:int) -> str:
+        # One huge page, mostly long paragraphs with dense inline markup
+        parts = ["# Pathological page"]
+        total = 0
+        index = 0
+        while total < size:
+            block = self.page(1_000_000 + index, blocks=50)
+            block = block.split("\n\n", 1)[1]
+            parts.append(block)
+            total += len(block)
+            index += 1
+        return "\n\n".join(parts)
+
+    def write(self, root:str, pages:int, pathological_mb:float = 0):
+        content = os.path.join(root, "content")
+        for index in range(pages):
+            # Spread pages over nested sections like a real site
+            path = os.path.join(content, f"section{index % 10}", f"group{index // 1000}", f"page{index}.md")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as file:
+                file.write(self.page(index))
+
+        if pathological_mb:
+            path = os.path.join(content, "pathological.md")
+            with open(path, "w") as file:
+                file.write(self.pathological_page(int(pathological_mb * 1024 * 1024)))
+
+        os.makedirs(os.path.join(root, "static"), exist_ok=True)
+        with open(os.path.join(root, "static", "index.css"), "w") as file:
+            file.write("body { margin: 0 auto; max-width: 40em; }\n")
+        with open(os.path.join(root, "template.html"), "w") as file:
+            file.write(TEMPLATE)
+        with open(os.path.join(root, "corpus.json"), "w") as file:
+            json.dump({**self.describe(), "pages": pages, "pathological_mb": pathological_mb}, file, sort_keys=True)
+
+    def ensure(self, root:str, pages:int, pathological_mb:float = 0) -> bool:
+        # Generating 100k pages takes a while, reuse an identical corpus
+        description = {**self.describe(), "pages": pages, "pathological_mb": pathological_mb}
+        try:
+            with open(os.path.join(root, "corpus.json")) as file:
+                if json.load(file) == json.loads(json.dumps(description)):
+                    return False
+        except (OSError, ValueError):
+            pass
+        self.write(root, pages, pathological_mb)
+        return True
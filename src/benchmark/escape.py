@@ -0,0 +1,76 @@
+import argparse
+import statistics
+import time
+
+from benchmark.corpus import CorpusGenerator
+from convert import markdown_to_html_node
+from htmlnode import HTMLNode
+from leafnode import LeafNode
+from unittest import mock
+
+# Run from src/ with: python3 -m benchmark.escape
+
+def raw_start_html(self):
+    if self.value is None:
+        raise ValueError("Error: LeafNode expecting value property")
+    if not self.tag:
+        return f"{self.value}"
+    return f"<{self.tag}{self.props_to_html()}>" + (f"{self.value}</{self.tag}>" if self.value != "" else "")
+
+def raw_props_to_html(self):
+    if not self.props:
+        return ""
+    return "".join(list(f" {key}=\"{value}\"" for key, value in self.props.items()))
+
+def unescaped():
+    # The renderer as it was before escaping, values written as they are
+    return [
+        mock.patch.object(LeafNode, "start_html", raw_start_html),
+        mock.patch.object(HTMLNode, "props_to_html", raw_props_to_html),
+    ]
+
+def best_time(trees, rounds:int, patches=()) -> float:
+    for patch in patches:
+        patch.start()
+    try:
+        times = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            for tree in trees:
+                tree.to_html()
+            times.append(time.perf_counter() - start)
+        return min(times)
+    finally:
+        for patch in patches:
+            patch.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Time to_html with and without escaping on a synthetic corpus")
+    parser.add_argument("--pages", type=int, default=1000, help="pages rendered per round")
+    parser.add_argument("--rounds", type=int, default=41, help="rounds of each, alternated so both see the same machine")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the corpus generator")
+    options = parser.parse_args()
+
+    generator = CorpusGenerator(options.seed)
+    trees = [markdown_to_html_node(generator.page(index)) for index in range(options.pages)]
+
+    # Every round times both back to back, in turns first, and the
+    # overhead is the median of the per-round ratios, which a slow moment
+    # of the machine moves far less than a ratio of best times
+    raws = []
+    ratios = []
+    for index in range(options.rounds):
+        if index % 2:
+            escaped = best_time(trees, 1)
+            raw = best_time(trees, 1, unescaped())
+        else:
+            raw = best_time(trees, 1, unescaped())
+            escaped = best_time(trees, 1)
+        raws.append(raw)
+        ratios.append(escaped / raw)
+    low, median, high = statistics.quantiles(ratios, n=4)
+    print(f"{'unescaped':<12}{statistics.median(raws):>10.4f}s")
+    print(f"{'escaped':<12}{median - 1:>+10.1%} median, {low - 1:+.1%} to {high - 1:+.1%} interquartile")
+
+if __name__ == "__main__":
+    main()
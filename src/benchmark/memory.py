@@ -0,0 +1,73 @@
+import argparse
+import tracemalloc
+
+from blocknode import BlockNode, BlockType
+from htmlnode import HTMLNode
+from leafnode import LeafNode
+from parentnode import ParentNode
+from textnode import TextNode, TextType
+
+# Run from src/ with: python3 -m benchmark.memory
+
+def dict_backed(cls):
+    # The layout the node classes had before __slots__: the same fields
+    # stored in a per-instance __dict__
+    def __init__(self, **fields):
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+    return type(f"Dict{cls.__name__}", (), {"__init__": __init__})
+
+def measure(factory, count:int) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    nodes = [factory(i) for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # The list holding the nodes is not part of a node
+    return (after - before - nodes.__sizeof__()) / count
+
+def node_shapes():
+    text = "Some paragraph text"
+    children = []
+    html = {"tag": "p", "value": text, "children": None, "props": None}
+    return [
+        (HTMLNode, ("p", text), html),
+        (LeafNode, ("p", text), html),
+        (ParentNode, ("p", children), {**html, "value": "", "children": children}),
+        (TextNode, (text, TextType.TEXT), {"text": text, "text_type": TextType.TEXT, "url": None}),
+        (BlockNode, (text, BlockType.PARAGRAPH), {"text": text, "block_type": BlockType.PARAGRAPH}),
+    ]
+
+def props_benchmark(count:int, distinct:int):
+    urls = [f"/blog/post-{i}" for i in range(distinct)]
+
+    def fresh(i):
+        return {"href": urls[i % distinct]}
+
+    def shared(i):
+        return TextNode("link", TextType.LINK, urls[i % distinct]).get_html_props()
+
+    # Warm the props cache so only the memory each node keeps is measured
+    for i in range(distinct):
+        shared(i)
+    return measure(fresh, count), measure(shared, count)
+
+def main():
+    parser = argparse.ArgumentParser(description="Report the memory used per node before and after __slots__")
+    parser.add_argument("--count", type=int, default=100000, help="nodes allocated per measurement")
+    parser.add_argument("--distinct-urls", type=int, default=100, help="distinct link targets in the props benchmark")
+    options = parser.parse_args()
+
+    print(f"{'bytes/node':<12}{'before':>10}{'after':>10}{'saved':>8}")
+    for cls, args, fields in node_shapes():
+        before_cls = dict_backed(cls)
+        before = measure(lambda i: before_cls(**fields), options.count)
+        after = measure(lambda i: cls(*args), options.count)
+        print(f"{cls.__name__:<12}{before:>9.0f}B{after:>9.0f}B{1 - after / before:>8.0%}")
+
+    fresh, shared = props_benchmark(options.count, options.distinct_urls)
+    print(f"{'link props':<12}{fresh:>9.0f}B{shared:>9.0f}B{1 - shared / fresh:>8.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import main as site
+
+from benchmark.corpus import CorpusGenerator
+from blocknode import BlockType
+from convert import markdown_to_blocks, markdown_to_html_node, text_to_text_nodes
+from generate import collect_pages, generate_page
+from typing import Callable, Dict, List
+
+# Stages in the order they run, each timed on its own
+STAGES = ["markdown_to_blocks", "text_to_text_nodes", "to_html", "generate_page", "main"]
+
+def time_stage(function:Callable[[], object], repeat:int) -> dict:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    # The fastest run is the least disturbed by the rest of the machine
+    return {"best": min(times), "median": statistics.median(times), "runs": times}
+
+def read_corpus(content:str) -> Dict[str, str]:
+    pages = {}
+    for directory, _, names in os.walk(content):
+        for name in names:
+            path = os.path.join(directory, name)
+            with open(path) as file:
+                pages[path] = file.read()
+    return pages
+
+def stage_functions(root:str, pages:Dict[str, str], scratch:str) -> Dict[str, Callable[[], object]]:
+    # Every stage gets its inputs prepared up front so it only times itself
+    markdown = list(pages.values())
+    blocks = [block for text in markdown for block in markdown_to_blocks(text)]
+    inline = [block.text for block in blocks if block.block_type != BlockType.CODE]
+    trees = [markdown_to_html_node(text) for text in markdown]
+    template = os.path.join(root, "template.html")
+    targets = collect_pages(os.path.join(root, "content"), os.path.join(scratch, "pages"))
+
+    def generate_all():
+        for source, destination in targets:
+            generate_page(source, template, destination, "/")
+
+    def main_build():
+        cwd = os.getcwd()
+        os.chdir(root)
+        try:
+            site.main(["main.py"])
+        finally:
+            os.chdir(cwd)
+
+    return {
+        "markdown_to_blocks": lambda: [markdown_to_blocks(text) for text in markdown],
+        "text_to_text_nodes": lambda: [text_to_text_nodes(text) for text in inline],
+        "to_html": lambda: [tree.to_html() for tree in trees],
+        "generate_page": generate_all,
+        "main": main_build,
+    }
+
+def run_suite(root:str, repeat:int = 3, stages:List[str]|None = None) -> dict:
+    pages = read_corpus(os.path.join(root, "content"))
+    results = {}
+    with tempfile.TemporaryDirectory() as scratch, contextlib.redirect_stdout(io.StringIO()):
+        functions = stage_functions(root, pages, scratch)
+        for stage in stages or STAGES:
+            results[stage] = time_stage(functions[stage], repeat)
+
+    with open(os.path.join(root, "corpus.json")) as file:
+        corpus = json.load(file)
+    return {
+        "corpus": corpus,
+        "bytes": sum(len(text) for text in pages.values()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "stages": results,
+    }
+
+def compare(results:dict, baseline:dict, threshold:float) -> List[str]:
+    regressions = []
+    for stage, timing in results["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if previous is None:
+            continue
+        ratio = timing["best"] / previous["best"]
+        line = f"{stage:<20}{previous['best']:>10.4f}s{timing['best']:>10.4f}s{ratio - 1:>+9.1%}"
+        if ratio > 1 + threshold:
+            regressions.append(line)
+            line += "  REGRESSION"
+        print(line)
+    return regressions
+
+def print_results(results:dict):
+    print(f"{'stage':<20}{'best':>11}{'median':>11}")
+    for stage, timing in results["stages"].items():
+        print(f"{stage:<20}{timing['best']:>10.4f}s{timing['median']:>10.4f}s")
+
+def main(args):
+    parser = argparse.ArgumentParser(description="Time each build stage on a synthetic corpus")
+    parser.add_argument("--pages", type=int, default=100, help="pages in the corpus, from 10 up to 100000")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the corpus generator")
+    parser.add_argument("--blocks-per-page", type=int, default=40, help="blocks in each generated page")
+    parser.add_argument("--mix", help="JSON object of block kind weights, e.g. '{\"paragraph\": 1, \"code\": 1}'")
+    parser.add_argument("--inline-mix", help="JSON object of inline markup chances per word, e.g. '{\"link\": 0.1}'")
+    parser.add_argument("--pathological-mb", type=float, default=0, help="also generate one page of this many megabytes")
+    parser.add_argument("--corpus", help="directory the corpus is generated in and reused from")
+    parser.add_argument("--stage", action="append", choices=STAGES, help="only run this stage, may be repeated")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage, the fastest is compared")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against results saved earlier with --output")
+    parser.add_argument("--threshold", type=float, default=0.1, help="fail when a stage is this fraction slower than the baseline")
+    options = parser.parse_args(args)
+
+    generator = CorpusGenerator(
+        options.seed,
+        json.loads(options.mix) if options.mix else None,
+        json.loads(options.inline_mix) if options.inline_mix else None,
+        options.blocks_per_page
+    )
+    root = options.corpus or os.path.join(
+        tempfile.gettempdir(),
+        f"ssg-corpus-{options.seed}-{options.pages}-{options.pathological_mb}"
+    )
+    if generator.ensure(root, options.pages, options.pathological_mb):
+        print(f"Generated {options.pages} pages in {root}")
+
+    results = run_suite(root, options.repeat, options.stage)
+    print_results(results)
+    if options.output:
+        with open(options.output, "w") as file:
+            json.dump(results, file, indent=1, sort_keys=True)
+
+    if options.baseline:
+        with open(options.baseline) as file:
+            baseline = json.load(file)
+        print()
+        regressions = compare(results, baseline, options.threshold)
+        if regressions:
+            print(f"{len(regressions)} stages regressed by more than {options.threshold:.0%}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,4 +1,5 @@
 from enum import Enum
+from typing import List
 
 class BlockType(Enum):
     PARAGRAPH = "paragraph"
@@ -9,9 +10,28 @@ class BlockType(Enum):
     ORDERED_LIST = "ordered list"
 
 class BlockNode:
-    def __init__(self, text:str, block_type:BlockType):
-        self.text = text
+    __slots__ = ("_text", "block_type", "items", "lines")
+
+    def __init__(
+        self,
+        text:str|None,
+        block_type:BlockType,
+        items:List[str]|None = None,
+        lines:List[str]|None = None
+    ):
+        # Blocks from markdown_to_blocks keep their source lines and only
+        # join them into text when it is asked for, list and quote blocks
+        # carry their items already split
+        self._text = text
         self.block_type = block_type
-    
+        self.items = items
+        self.lines = lines
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = "\n".join(self.lines).strip()
+        return self._text
+
     def __repr__(self):
-        return f"BlockNode({self.text}, {self.block_type})"
\ No newline at end of file
+        return f"BlockNode({self.text}, {self.block_type})"
@@ -0,0 +1,253 @@
+import io
+import os
+import posixpath
+
+from compress import SIDECAR_SUFFIXES
+from fingerprint import ASSET_MAP_NAME, AssetMap, encode_asset_map, fingerprint_name, is_hidden
+from generate import SiteBuild, decode_source, is_page, page_destination
+from images import IMAGE_EXTENSIONS, read_image_size
+from links import LinkIndex
+from manifest import MANIFEST_NAME, hash_bytes
+from output import remove_output
+from pipeline import IO_THREADS, OutputWriter, prefetch
+from search import SEARCH_DIRECTORY, SearchIndex
+from sync import collect_files
+from template import Template, compile_template, expand_includes
+from typing import Dict, List, Tuple
+
+# Sources are laid out like the repository, relative to the site root
+CONTENT = "content"
+STATIC = "static"
+TEMPLATE = "template.html"
+# Pages built in memory are keyed relative to this directory of the site
+# root, nothing is written to it
+PUBLIC = "public"
+# In-memory sources sit under this directory so templates and partials
+# resolve against each other the way files do, nothing is read from it
+ROOT = os.path.abspath(os.sep)
+
+class WriteReport:
+    def __init__(self):
+        self.written = 0
+        self.kept = 0
+        self.removed = 0
+
+    def __repr__(self):
+        return f"WriteReport({self.written}, {self.kept}, {self.removed})"
+
+    def summary(self):
+        return f"Wrote {self.written} files, kept {self.kept} unchanged, removed {self.removed}"
+
+class SourceTree:
+    # Source files keyed by their posix path relative to the site root.
+    # With a root directory, templates and partials outside of files are
+    # read from it as they are included
+    def __init__(self, files:Dict[str, bytes], root:str|None = None):
+        self.files = files
+        self.root = root
+        self.base = root or ROOT
+
+    def __repr__(self):
+        return f"SourceTree({len(self.files)} files)"
+
+    def path(self, key:str) -> str:
+        return os.path.join(self.base, *key.split("/"))
+
+    def key(self, path:str) -> str:
+        return os.path.relpath(path, self.base).replace(os.sep, "/")
+
+    def exists(self, path:str) -> bool:
+        return self.key(path) in self.files or (self.root is not None and os.path.isfile(path))
+
+    def read_bytes(self, path:str) -> bytes:
+        data = self.files.get(self.key(path))
+        if data is not None:
+            return data
+        if self.root is None:
+            raise FileNotFoundError(f"Error: build_site {self.key(path)} not found")
+        return read_bytes(path)
+
+    def read(self, path:str) -> str:
+        return self.read_bytes(path).decode()
+
+    def under(self, directory:str) -> List[str]:
+        # Keys below directory, sorted by directory the way pages on disk are
+        prefix = directory + "/"
+        return sorted((key for key in self.files if key.startswith(prefix)), key=lambda key: key.split("/"))
+
+class MemoryWriter:
+    # Stands in for OutputWriter, keeping outputs by their posix path
+    # relative to destination
+    def __init__(self, destination:str):
+        self.destination = destination
+        self.outputs:Dict[str, bytes] = {}
+
+    def __repr__(self):
+        return f"MemoryWriter({len(self.outputs)} outputs)"
+
+    def submit(self, destination:str, data:bytes):
+        self.outputs[os.path.relpath(destination, self.destination).replace(os.sep, "/")] = data
+
+    def close(self):
+        pass
+
+class MemoryBuild(SiteBuild):
+    # The pages of a SourceTree built by the same pipeline as on disk, read
+    # from the tree and written to a MemoryWriter. There is no manifest, so
+    # every page is built, and nothing is printed
+    def __init__(
+        self,
+        tree:SourceTree,
+        basepath:str,
+        minify:bool,
+        sizes:Dict[str, Tuple[int, int]]|None,
+        links:LinkIndex|None,
+        search:SearchIndex|None,
+        assets:AssetMap|None
+    ):
+        super().__init__(
+            tree.path(CONTENT), tree.path(TEMPLATE), tree.path(PUBLIC), basepath,
+            links=links, minify=minify, image_hints=sizes is not None, search=search, assets=assets
+        )
+        self.tree = tree
+        self.sizes = sizes
+        self.templates:Dict[str, Template] = {}
+        self.writer = MemoryWriter(self.destination)
+
+    def collect(self) -> List[Tuple[str, str]]:
+        paths = [self.tree.path(key) for key in self.tree.under(CONTENT) if is_page(posixpath.basename(key))]
+        return [(path, page_destination(self.source, self.destination, path)) for path in paths]
+
+    def read_source(self, path:str) -> Tuple[str, str]:
+        data = self.tree.read_bytes(path)
+        return hash_bytes(data), decode_source(data)
+
+    def exists(self, path:str) -> bool:
+        return self.tree.exists(path)
+
+    def load_template(self, path:str) -> Template:
+        template = self.templates.get(path)
+        if template is None:
+            text, dependencies = expand_includes(path, read=self.tree.read, exists=self.tree.exists)
+            template = self.templates[path] = compile_template(text, self.basepath, self.minify, self.assets)
+            template.dependencies = dependencies
+        return template
+
+    def hash_file(self, path:str) -> str:
+        return hash_bytes(self.tree.read_bytes(path))
+
+    def load_manifest(self) -> dict:
+        return {}
+
+    def save_manifest(self, manifest:dict):
+        pass
+
+    def scan_images(self, cache:dict|None) -> Tuple[Dict[str, Tuple[int, int]], dict]:
+        return self.sizes or {}, {}
+
+    def output_exists(self, path:str) -> bool:
+        return False
+
+    def remove_output(self, path:str):
+        pass
+
+    def create_writer(self) -> MemoryWriter:
+        return self.writer
+
+    def log_page(self, source, template_path, destination):
+        pass
+
+def read_bytes(path:str) -> bytes:
+    with open(path, "rb") as file:
+        return file.read()
+
+def load_tree(root:str, threads:int = IO_THREADS) -> SourceTree:
+    # Reads content, static and the site template under root, several
+    # files at a time
+    keys = [
+        f"{directory}/{item.replace(os.sep, '/')}"
+        for directory in (CONTENT, STATIC)
+        for item in collect_files(os.path.join(root, directory))
+    ]
+    if os.path.isfile(os.path.join(root, TEMPLATE)):
+        keys.append(TEMPLATE)
+    paths = (os.path.join(root, *key.split("/")) for key in keys)
+    files = dict(zip(keys, prefetch(paths, read_bytes, threads)))
+    return SourceTree(files, os.path.abspath(root))
+
+def build_site(
+    sources:Dict[str, bytes|str]|str,
+    basepath:str = "/",
+    minify:bool = False,
+    image_hints:bool = True,
+    fingerprint:bool = False,
+    links:LinkIndex|None = None,
+    search:SearchIndex|None = None
+) -> Dict[str, bytes]:
+    # Builds the whole site without writing anything and returns every
+    # output keyed by its posix path relative to the destination. sources
+    # maps paths such as content/index.md, static/index.css and
+    # template.html to their contents, or is a directory laid out that way
+    if isinstance(sources, str):
+        tree = load_tree(sources)
+    else:
+        tree = SourceTree({key: data.encode() if isinstance(data, str) else data for key, data in sources.items()})
+    if not tree.exists(tree.path(TEMPLATE)):
+        raise FileNotFoundError(f"Error: build_site {TEMPLATE} not found")
+
+    outputs:Dict[str, bytes] = {}
+    for key in tree.under(STATIC):
+        outputs[key[len(STATIC) + 1:]] = tree.files[key]
+
+    assets = None
+    if fingerprint:
+        paths = {
+            key: fingerprint_name(key, hash_bytes(data))
+            for key, data in list(outputs.items()) if not is_hidden(key)
+        }
+        for key, name in paths.items():
+            outputs[name] = outputs[key]
+        outputs[ASSET_MAP_NAME] = encode_asset_map(paths)
+        assets = AssetMap(paths)
+
+    sizes = None
+    if image_hints:
+        sizes = {}
+        for key, data in outputs.items():
+            if key.lower().endswith(IMAGE_EXTENSIONS):
+                size = read_image_size(io.BytesIO(data))
+                if size is not None:
+                    sizes[key] = size
+
+    build = MemoryBuild(tree, basepath, minify, sizes, links, search, assets)
+    build.run()
+    outputs.update(build.writer.outputs)
+    if links is not None:
+        links.add_outputs(outputs)
+    return outputs
+
+def is_later_output(key:str, files:Dict[str, bytes]) -> bool:
+    # Outputs of the stages run after the pages: the manifest, the search
+    # index and compressed sidecars of files still in the site
+    if key == MANIFEST_NAME or key.startswith(SEARCH_DIRECTORY + "/"):
+        return True
+    base, suffix = posixpath.splitext(key)
+    return suffix in SIDECAR_SUFFIXES and base in files
+
+def write_site(files:Dict[str, bytes], destination:str, threads:int = IO_THREADS) -> WriteReport:
+    # Makes destination hold files. Identical files are left untouched,
+    # mtime included, and everything else is removed except what later
+    # stages wrote, which they keep up to date themselves
+    report = WriteReport()
+    os.makedirs(destination, exist_ok=True)
+    for item in collect_files(destination):
+        key = item.replace(os.sep, "/")
+        if key not in files and not is_later_output(key, files):
+            remove_output(destination, os.path.join(destination, item))
+            report.removed += 1
+    with OutputWriter(threads) as writer:
+        for key, data in files.items():
+            writer.submit(os.path.join(destination, *key.split("/")), data)
+    report.written = writer.written
+    report.kept = writer.kept
+    return report
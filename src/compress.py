@@ -0,0 +1,112 @@
+import gzip
+import os
+
+from concurrent.futures import ThreadPoolExecutor
+from manifest import MANIFEST_NAME, hash_file, load_manifest, save_manifest
+from output import remove_output, write_output
+from typing import Dict, List
+
+try:
+    import brotli
+except ImportError:
+    # Only gzip sidecars are written without the brotli module
+    brotli = None
+
+# Text outputs worth compressing, images and fonts are compressed already
+COMPRESSIBLE = (".html", ".htm", ".css", ".js", ".mjs", ".json", ".svg", ".txt", ".xml", ".map", ".csv")
+GZIP_LEVEL = 9
+BROTLI_LEVEL = 11
+# Below this many files a thread pool costs more than it saves
+PARALLEL_THRESHOLD = 16
+SIDECAR_SUFFIXES = (".gz", ".br")
+
+class CompressReport:
+    def __init__(self):
+        self.compressed = 0
+        self.skipped = 0
+        self.removed = 0
+
+    def __repr__(self):
+        return f"CompressReport({self.compressed}, {self.skipped}, {self.removed})"
+
+    def summary(self):
+        return f"Compressed {self.compressed} outputs, skipped {self.skipped}, removed {self.removed}"
+
+def sidecar_suffixes(brotli_level:int|None) -> List[str]:
+    if brotli is None or brotli_level is None:
+        return list(SIDECAR_SUFFIXES[:1])
+    return list(SIDECAR_SUFFIXES)
+
+def collect_compressible(destination:str) -> List[str]:
+    files = []
+    for directory, _, names in os.walk(destination):
+        for name in names:
+            if name.endswith(COMPRESSIBLE) and name != MANIFEST_NAME:
+                files.append(os.path.relpath(os.path.join(directory, name), destination))
+    return sorted(files)
+
+def compress_file(path:str, gzip_level:int = GZIP_LEVEL, brotli_level:int|None = BROTLI_LEVEL):
+    with open(path, "rb") as file:
+        data = file.read()
+    # mtime=0 keeps the gzip header, and so the sidecar, identical across builds
+    # Written through a temp file so a server never sends a half written sidecar
+    write_output(f"{path}.gz", gzip.compress(data, compresslevel=gzip_level, mtime=0))
+    if brotli is not None and brotli_level is not None:
+        write_output(f"{path}.br", brotli.compress(data, quality=brotli_level))
+
+def remove_sidecars(destination:str, path:str, suffixes:List[str]):
+    for suffix in suffixes:
+        if os.path.lexists(f"{path}{suffix}"):
+            remove_output(destination, f"{path}{suffix}")
+
+def compress_outputs(
+    destination:str,
+    gzip_level:int = GZIP_LEVEL,
+    brotli_level:int|None = BROTLI_LEVEL,
+    workers:int|None = None
+) -> CompressReport:
+    # Writes .gz and, with the brotli module, .br sidecars next to every
+    # text output. Outputs whose hash and levels match the last run are
+    # skipped, and sidecars of outputs that are gone are removed
+    manifest = load_manifest(destination)
+    previous:Dict[str, dict] = manifest.get("compressed", {})
+    suffixes = sidecar_suffixes(brotli_level)
+    report = CompressReport()
+
+    compressed = {}
+    pending:List[str] = []
+    for item in collect_compressible(destination):
+        path = os.path.join(destination, item)
+        entry = {
+            "hash": hash_file(path),
+            "gzip": gzip_level,
+            "brotli": brotli_level if ".br" in suffixes else None,
+        }
+        compressed[item] = entry
+        if previous.get(item) == entry and all(os.path.exists(f"{path}{suffix}") for suffix in suffixes):
+            report.skipped += 1
+            continue
+        pending.append(path)
+
+    # zlib and brotli release the GIL while compressing, so threads scale
+    if len(pending) >= PARALLEL_THRESHOLD and workers != 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # list() so the first failure is raised here
+            list(executor.map(lambda path: compress_file(path, gzip_level, brotli_level), pending))
+    else:
+        for path in pending:
+            compress_file(path, gzip_level, brotli_level)
+    report.compressed = len(pending)
+
+    for item, entry in previous.items():
+        path = os.path.join(destination, item)
+        if item not in compressed:
+            remove_sidecars(destination, path, [".gz", ".br"])
+            report.removed += 1
+        elif entry.get("brotli") is not None and ".br" not in suffixes:
+            # Brotli was turned off or its module is gone
+            remove_sidecars(destination, path, [".br"])
+
+    manifest["compressed"] = compressed
+    save_manifest(destination, manifest)
+    return report
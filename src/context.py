@@ -0,0 +1,44 @@
+from fingerprint import AssetMap
+from images import PageImages
+from links import rewrite_markdown_link
+from search import PageTerms
+from typing import List, Tuple
+
+class RenderContext:
+    def __init__(
+        self,
+        basepath:str = "/",
+        links:List[str]|None = None,
+        images:PageImages|None = None,
+        terms:PageTerms|None = None,
+        assets:AssetMap|None = None
+    ):
+        self.basepath = basepath
+        # Link and image targets of the page, only collected when a list is given
+        self.links = links
+        # Image sizes for width, height and loading hints, none without it
+        self.images = images
+        # Words of the page for the search index, only counted when given
+        self.terms = terms
+        # Fingerprinted names of static files, urls are left as written without it
+        self.assets = assets
+
+    def __repr__(self):
+        return f"RenderContext({self.basepath})"
+
+    def resolve_url(self, url:str, link:bool = False) -> str:
+        if link:
+            url = rewrite_markdown_link(url)
+        if self.links is not None:
+            self.links.append(url)
+        if self.assets is not None:
+            url = self.assets.resolve(url)
+        # Site-absolute urls are served from under the basepath
+        if self.basepath == "/" or not url.startswith("/"):
+            return url
+        return self.basepath + url[1:]
+
+    def image_hints(self, url:str) -> Tuple[Tuple[int, int]|None, bool]:
+        if self.images is None:
+            return None, False
+        return self.images.hints(url)
@@ -1,25 +1,43 @@
+import os
 import re
 
 from blocknode import BlockNode, BlockType
+from context import RenderContext
 from htmlnode import HTMLNode
+from inline import scan_text_nodes
 from leafnode import LeafNode
 from split import split_nodes_delimiter, split_nodes_link, split_nodes_image
 from textnode import TextNode, TextType
-from typing import List
+from typing import Iterable, Iterator, List
 from parentnode import ParentNode
 
-def text_to_html_nodes(text):
+# SSG_INLINE_PARSER=split switches back to the chained split passes so both
+# parsers can be run against the same test suites
+SINGLE_PASS_INLINE = os.environ.get("SSG_INLINE_PARSER", "scan") != "split"
+
+def text_to_html_nodes(text, context:RenderContext|None = None):
     text_nodes = text_to_text_nodes(text)
-    return map(text_node_to_html_node, text_nodes)
+    if context is not None and context.terms is not None:
+        context.terms.add_all(text_node.text for text_node in text_nodes)
+    return [text_node_to_html_node(text_node, context) for text_node in text_nodes]
 
-def text_node_to_html_node(text_node:TextNode) -> HTMLNode:
+def text_node_to_html_node(text_node:TextNode, context:RenderContext|None = None) -> HTMLNode:
     tag = text_node.get_html_tag()
     value = text_node.get_html_value()
-    props = text_node.get_html_props()
+    url = text_node.url
+    if context is not None and url:
+        if text_node.text_type == TextType.IMAGE:
+            # Sizes are looked up by the url as written, before the basepath
+            return LeafNode(tag, value, text_node.get_html_props(context.resolve_url(url), *context.image_hints(url)))
+        url = context.resolve_url(url, text_node.text_type == TextType.LINK)
+    props = text_node.get_html_props(url)
     
     return LeafNode(tag, value, props)
 
 def text_to_text_nodes(text) -> List[TextNode]:
+    if SINGLE_PASS_INLINE:
+        return scan_text_nodes(text)
+
     nodes = [TextNode(text, TextType.TEXT)]
     nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
     nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
@@ -29,85 +47,121 @@ def text_to_text_nodes(text) -> List[TextNode]:
     
     return nodes
 
-def markdown_to_blocks(markdown: str) -> List[BlockNode]:
-    blocks = []
-    current_block = []
+# Block kind of a line by its first non-whitespace character, anything
+# missing is a paragraph unless it starts with a digit
+LINE_TYPES = {
+    "#": BlockType.HEADING,
+    ">": BlockType.QUOTE,
+    "*": BlockType.UNORDERED_LIST,
+    "-": BlockType.UNORDERED_LIST,
+    "+": BlockType.UNORDERED_LIST,
+    "`": BlockType.CODE,
+}
+ORDERED_MARKER = re.compile(r"\d+\.\s")
+UNORDERED_ITEM = re.compile(r"^\s*[-*+]\s", flags=re.MULTILINE)
+ORDERED_ITEM = re.compile(r"^\s*\d+\.\s", flags=re.MULTILINE)
+
+def quote_items(lines:List[str]) -> List[str]:
+    # The lines of the stripped block text, whose first line has lost its
+    # leading whitespace and last line its trailing whitespace
+    lines = lines[:]
+    lines[0] = lines[0].lstrip()
+    lines[-1] = lines[-1].rstrip()
+    return [line.lstrip("> ").rstrip() for line in lines if line.strip("> ").strip()]
+
+def iter_blocks(lines:Iterable[str]) -> Iterator[BlockNode]:
+    # Each line is stripped and classified once, blocks keep their lines
+    # and list blocks collect their items as they are scanned. A block is
+    # yielded as soon as the line after it is seen, so only the open block
+    # is held in memory
     current_type = None
+    block_lines = [] # Lines of the open block
+    items = None
     in_code_block = False
 
-    def flush_block():
-        nonlocal current_block, current_type
-        if current_block:
-            blocks.append(BlockNode("\n".join(current_block).strip(), current_type or BlockType.PARAGRAPH))
-            current_block = []
-            current_type = None
-
-    for line in markdown.splitlines():
+    for line in lines:
         stripped = line.strip()
-
-        # Detect code block fences
-        if stripped.startswith("```"):
-            if in_code_block:
-                current_block.append(line)
-                flush_block()
+        if in_code_block:
+            block_lines.append(line)
+            if stripped.startswith("```"):
+                yield BlockNode(None, BlockType.CODE, lines=block_lines)
+                block_lines = []
                 in_code_block = False
-            else:
-                flush_block()
-                current_block.append(line)
-                current_type = BlockType.CODE
-                in_code_block = True
             continue
 
-        if in_code_block:
-            current_block.append(line)
+        # Empty lines end the open block
+        if not stripped:
+            if current_type is not None:
+                yield close_block(current_type, block_lines, items)
+                current_type = None
+                block_lines = []
             continue
 
-        # Skip empty lines outside of code
-        if stripped == "":
-            flush_block()
-            continue
+        first = stripped[0]
+        line_type = LINE_TYPES.get(first, BlockType.PARAGRAPH)
+        item = None
+        match line_type:
+            case BlockType.PARAGRAPH:
+                if first.isdecimal():
+                    marker = ORDERED_MARKER.match(stripped)
+                    if marker is not None:
+                        line_type = BlockType.ORDERED_LIST
+                        item = stripped[marker.end():].lstrip()
+            case BlockType.HEADING:
+                level = len(stripped) - len(stripped.lstrip("#"))
+                if level == len(stripped) or not stripped[level].isspace():
+                    line_type = BlockType.PARAGRAPH
+            case BlockType.UNORDERED_LIST:
+                if len(stripped) > 1 and stripped[1].isspace():
+                    item = stripped[2:].lstrip()
+                else:
+                    line_type = BlockType.PARAGRAPH
+            case BlockType.CODE:
+                if not stripped.startswith("```"):
+                    line_type = BlockType.PARAGRAPH
+
+        if line_type != current_type or line_type == BlockType.HEADING or line_type == BlockType.CODE:
+            if current_type is not None:
+                yield close_block(current_type, block_lines, items)
+                block_lines = []
+            current_type = None
+            if line_type == BlockType.HEADING:
+                yield BlockNode(stripped, BlockType.HEADING, lines=[line])
+                continue
+            if line_type == BlockType.CODE:
+                block_lines.append(line)
+                in_code_block = True
+                continue
+            current_type = line_type
+            items = [] if item is not None else None
+
+        block_lines.append(line)
+        if item is not None:
+            items.append(item)
 
-        # Detect block types
-        if re.match(r"^#+\s", stripped):
-            flush_block()
-            current_block.append(line)
-            current_type = BlockType.HEADING
-            flush_block()
-        elif stripped.startswith(">"):
-            if current_type != BlockType.QUOTE:
-                flush_block()
-                current_type = BlockType.QUOTE
-            current_block.append(line)
-        elif re.match(r"^(\*|-|\+)\s", stripped):
-            if current_type != BlockType.UNORDERED_LIST:
-                flush_block()
-                current_type = BlockType.UNORDERED_LIST
-            current_block.append(line)
-        elif re.match(r"^\d+\.\s", stripped):
-            if current_type != BlockType.ORDERED_LIST:
-                flush_block()
-                current_type = BlockType.ORDERED_LIST
-            current_block.append(line)
-        else:
-            if current_type not in (None, BlockType.PARAGRAPH):
-                flush_block()
-            current_type = BlockType.PARAGRAPH
-            current_block.append(line)
-    
     if in_code_block:
         raise ValueError("Error: markdown_to_blocks missing closing delimiter code block")
 
-    flush_block()
-    return blocks
+    if current_type is not None:
+        yield close_block(current_type, block_lines, items)
+
+def close_block(block_type:BlockType, lines:List[str], items:List[str]|None) -> BlockNode:
+    if block_type == BlockType.QUOTE:
+        items = quote_items(lines)
+    return BlockNode(None, block_type, items, lines)
+
+def markdown_to_blocks(markdown: str) -> List[BlockNode]:
+    return list(iter_blocks(markdown.splitlines()))
 
-def block_node_to_html_node(block: BlockNode):
-    text = block.text
+def block_node_to_html_node(block: BlockNode, context:RenderContext|None = None):
     block_type = block.block_type
+    # List and quote blocks from markdown_to_blocks never need their text
+    text = block.text if block.items is None else ""
     match block_type:
         case BlockType.PARAGRAPH:
             return ParentNode(
                 tag="p",
-                children=text_to_html_nodes(text)
+                children=text_to_html_nodes(text, context)
             )
         
         case BlockType.HEADING:
@@ -118,7 +172,7 @@ def block_node_to_html_node(block: BlockNode):
                 raise ValueError("Header level cannot be 0")
             return ParentNode(
                 tag=f"h{level}", 
-                children=text_to_html_nodes(text[level:].lstrip())
+                children=text_to_html_nodes(text[level:].lstrip(), context)
             )
 
         case BlockType.CODE:
@@ -130,34 +184,40 @@ def block_node_to_html_node(block: BlockNode):
             )
 
         case BlockType.QUOTE:
-            lines = text.splitlines()
-            items = [line.lstrip("> ").rstrip() for line in lines if line.strip("> ").strip()]
+            items = block.items
+            if items is None:
+                lines = text.splitlines()
+                items = [line.lstrip("> ").rstrip() for line in lines if line.strip("> ").strip()]
+            if context is not None and context.terms is not None:
+                context.terms.add_all(items)
             return ParentNode(
                 tag="blockquote", 
                 children=[LeafNode(None, value=item) for item in items]
             )
         
         case BlockType.UNORDERED_LIST:
-            items = re.split(r'^\s*[-*+]\s', text, flags=re.MULTILINE)
-            items = [item.strip() for item in items if item.strip()]
+            items = block.items
+            if items is None:
+                items = [item.strip() for item in UNORDERED_ITEM.split(text) if item.strip()]
             return ParentNode(
                 tag="ul",
-                children=[ParentNode("li", children=text_to_html_nodes(item)) for item in items]
+                children=[ParentNode("li", children=text_to_html_nodes(item, context)) for item in items]
             )
         
         case BlockType.ORDERED_LIST:
-            items = re.split(r'^\s*\d+\.\s', text, flags=re.MULTILINE)
-            items = [item.strip() for item in items if item.strip()]
+            items = block.items
+            if items is None:
+                items = [item.strip() for item in ORDERED_ITEM.split(text) if item.strip()]
             return ParentNode(
                 tag="ol",
-                children=[ParentNode("li", children=text_to_html_nodes(item)) for item in items]
+                children=[ParentNode("li", children=text_to_html_nodes(item, context)) for item in items]
             )
 
-def markdown_to_html_node(markdown) -> HTMLNode:
+def markdown_to_html_node(markdown, context:RenderContext|None = None) -> HTMLNode:
     blocks = markdown_to_blocks(markdown)
     parent = ParentNode(tag="div", children=[])
     for block in blocks:
-        html_node = block_node_to_html_node(block)
+        html_node = block_node_to_html_node(block, context)
         parent.children.append(html_node)
     return parent
         
@@ -1,12 +1,15 @@
 import re
 
-from typing import List
+from typing import Dict, List, Tuple
+
+IMAGE_PATTERN = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+LINK_PATTERN = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
 
 def extract_markdown_images(text) -> List[tuple]:
-    return re.findall(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    return IMAGE_PATTERN.findall(text)
 
 def extract_markdown_links(text) -> List[tuple]:
-    return re.findall(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    return LINK_PATTERN.findall(text)
 
 def extract_markdown_title(text):
     pattern = r"^\s*#\s+(.*)$"
@@ -14,5 +17,25 @@ def extract_markdown_title(text):
     if not match:
         raise Exception("Error: extract_markdown_title invalid h1")
     return match.group(1).strip()
-    
-    
\ No newline at end of file
+
+def extract_front_matter(text) -> Tuple[Dict[str, str], str]:
+    # Optional "key: value" lines fenced by --- at the very top of a page
+    if not text.startswith("---"):
+        return {}, text
+
+    lines = text.splitlines(keepends=True)
+    if lines[0].strip() != "---":
+        return {}, text
+
+    fields = {}
+    for index, line in enumerate(lines[1:], start=1):
+        if line.strip() == "---":
+            return fields, "".join(lines[index + 1:])
+        key, separator, value = line.partition(":")
+        if not separator or not key.strip():
+            return {}, text
+        value = value.strip()
+        if len(value) > 1 and value[0] == value[-1] and value[0] in "\"'":
+            value = value[1:-1]
+        fields[key.strip()] = value
+    return {}, text
@@ -0,0 +1,96 @@
+import json
+import os
+import posixpath
+import re
+
+from manifest import hash_file, hash_text, load_manifest, save_manifest
+from output import remove_output, write_output
+from sync import collect_files, copy_file
+from typing import Dict, List
+
+# Hex digits of the content hash put in a fingerprinted name
+HASH_LENGTH = 8
+ASSET_MAP_NAME = "assets.json"
+# Site-absolute urls in href and src attributes of the template
+ATTRIBUTE_URL = re.compile(r"((?:href|src)=\")(/[^\"]*)\"")
+
+def fingerprint_name(path:str, digest:str) -> str:
+    # index.css with its hash becomes index.3f9a1c2b.css
+    root, extension = posixpath.splitext(path)
+    return f"{root}.{digest[:HASH_LENGTH]}{extension}"
+
+def is_hidden(key:str) -> bool:
+    # Hidden files like .DS_Store are never referenced
+    return any(part.startswith(".") for part in key.split("/"))
+
+def encode_asset_map(paths:Dict[str, str]) -> bytes:
+    return json.dumps(paths, indent=1, sort_keys=True).encode()
+
+class AssetMap:
+    def __init__(self, paths:Dict[str, str]):
+        # Posix path of every static file to the path of its fingerprinted copy
+        self.paths = paths
+        # Changes whenever any asset does, pages and templates are keyed by it
+        self.version = hash_text(json.dumps(paths, sort_keys=True))
+
+    def __repr__(self):
+        return f"AssetMap({len(self.paths)} assets)"
+
+    def resolve(self, url:str) -> str:
+        # Site-absolute urls of static files point at their fingerprinted
+        # copy, query strings and fragments are kept
+        if not url.startswith("/") or url.startswith("//"):
+            return url
+        end = len(url)
+        for separator in "?#":
+            index = url.find(separator, 1, end)
+            if index != -1:
+                end = index
+        fingerprinted = self.paths.get(url[1:end])
+        if fingerprinted is None:
+            return url
+        return "/" + fingerprinted + url[end:]
+
+    def rewrite(self, text:str) -> str:
+        # For template literals, before the basepath is put in
+        return ATTRIBUTE_URL.sub(lambda match: match.group(1) + self.resolve(match.group(2)) + "\"", text)
+
+def fingerprint_assets(source:str, destination:str) -> AssetMap:
+    # Copies every file under source into destination under a name holding
+    # its content hash, next to the copy under its own name, and writes the
+    # mapping to ASSET_MAP_NAME. Hashes are cached in the manifest by mtime
+    # and size, and copies of earlier versions are removed
+    manifest = load_manifest(destination)
+    previous:Dict[str, List] = manifest.get("fingerprints", {})
+    current:Dict[str, List] = {}
+    paths:Dict[str, str] = {}
+    for item in collect_files(source):
+        key = item.replace(os.sep, "/")
+        if is_hidden(key):
+            continue
+        path = os.path.join(source, item)
+        stat = os.stat(path)
+        entry = previous.get(key)
+        if entry is not None and entry[:2] == [stat.st_mtime_ns, stat.st_size]:
+            digest = entry[2]
+        else:
+            digest = hash_file(path)
+        current[key] = [stat.st_mtime_ns, stat.st_size, digest]
+        paths[key] = fingerprint_name(key, digest)
+
+        # The name changes with the contents, an existing copy is up to date.
+        # Never hardlinked, editing the source in place would change it
+        target = os.path.join(destination, *paths[key].split("/"))
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            copy_file(path, target)
+
+    for key, entry in previous.items():
+        name = fingerprint_name(key, entry[2])
+        if paths.get(key) != name:
+            remove_output(destination, os.path.join(destination, *name.split("/")))
+
+    manifest["fingerprints"] = current
+    save_manifest(destination, manifest)
+    write_output(os.path.join(destination, ASSET_MAP_NAME), encode_asset_map(paths))
+    return AssetMap(paths)
@@ -1,48 +1,601 @@
+import functools
+import io
 import os
+import signal
+import time
 
-from convert import markdown_to_html_node
-from extract import extract_markdown_title
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
+from context import RenderContext
+from convert import block_node_to_html_node, markdown_to_blocks, markdown_to_html_node
+from extract import extract_front_matter, extract_markdown_title
+from fingerprint import AssetMap
 from htmlnode import HTMLNode
+from images import PageImages, scan_images, sizes_unchanged
+from links import LinkIndex
+from search import PageTerms, SearchIndex, assign_ids
+from manifest import hash_bytes, hash_file, hash_text, load_manifest, save_manifest
+from output import remove_output, write_text
+from parentnode import ParentNode
+from pipeline import IO_THREADS, OutputWriter, prefetch
+from stream import stream_page
+from template import Template, find_template, load_template
+from timing import BuildProfile, Stopwatch
+from typing import Dict, List, Tuple
 
-def generate_page(source, template_path, destination, basepath):
+# Files under content built into pages
+PAGE_EXTENSIONS = (".md", ".markdown")
+# Pages larger than this many bytes are parsed and written block by block,
+# with memory bounded by the largest block instead of the whole page
+STREAM_THRESHOLD = int(os.environ.get("SSG_STREAM_THRESHOLD", 8 << 20))
+# Read streamed pages through mmap instead of the buffered text reader
+STREAM_MMAP = os.environ.get("SSG_STREAM_MMAP", "") == "1"
+
+# Image sizes and fingerprinted asset names of the current build, set in
+# every worker when the pool starts
+_image_sizes:Dict[str, Tuple[int, int]] = {}
+_assets:AssetMap|None = None
+
+def set_build_state(sizes:Dict[str, Tuple[int, int]], assets:AssetMap|None = None):
+    global _image_sizes, _assets
+    _image_sizes = sizes
+    _assets = assets
+
+class BuildReport:
+    def __init__(self):
+        self.rebuilt = 0
+        self.skipped = 0
+        self.deleted = 0
+
+    def __repr__(self):
+        return f"BuildReport({self.rebuilt}, {self.skipped}, {self.deleted})"
+
+    def summary(self):
+        return f"Rebuilt {self.rebuilt} pages, skipped {self.skipped}, deleted {self.deleted}"
+
+def log_page(source, template_path, destination):
     print(f"Generating page from {source} to {destination} using {template_path}")
+
+def generate_page(
+    source,
+    template_path,
+    destination,
+    basepath,
+    profile:BuildProfile|None = None,
+    links:List[str]|None = None,
+    minify:bool = False,
+    images:PageImages|None = None,
+    terms:PageTerms|None = None,
+    assets:AssetMap|None = None
+):
+    log_page(source, template_path, destination)
+    if profile is None:
+        build_page(source, template_path, destination, basepath, links, minify, images, terms, assets)
+    else:
+        profile.add(source, profile_page(source, template_path, destination, basepath, links, minify, images, terms, assets))
+
+def build_page(
+    source,
+    template_path,
+    destination,
+    basepath,
+    links:List[str]|None = None,
+    minify:bool = False,
+    images:PageImages|None = None,
+    terms:PageTerms|None = None,
+    assets:AssetMap|None = None
+):
+    # Link and image targets of the page are appended to links when given
+    template = load_template(template_path, basepath, minify, assets)
+    variables = load_page(source, basepath, links, images, terms, assets)
+    write_page(template, variables, destination)
+    if terms is not None:
+        # A streamed page has its title only once it was written
+        title = variables["Title"]
+        terms.title = title if isinstance(title, str) else "".join(title)
+
+def load_page(
+    source,
+    basepath,
+    links:List[str]|None = None,
+    images:PageImages|None = None,
+    terms:PageTerms|None = None,
+    assets:AssetMap|None = None
+) -> dict:
+    if os.path.getsize(source) > STREAM_THRESHOLD:
+        return stream_page(source, basepath, STREAM_MMAP, links, images, terms, assets)
+    return read_page(source, basepath, links, images, terms, assets)
+
+def read_page(
+    source,
+    basepath,
+    links:List[str]|None = None,
+    images:PageImages|None = None,
+    terms:PageTerms|None = None,
+    assets:AssetMap|None = None
+) -> dict:
     markdown = ""
     with open(source) as file:
         markdown = file.read()
-    
-    template = ""
-    with open(template_path) as file:
-        template = file.read()
-    
-    content = markdown_to_html_node(markdown).to_html()
-    title = extract_markdown_title(markdown)
-    template = template.replace("{{ Title }}", title)
-    template = template.replace("{{ Content }}", content)
-    template = template.replace("href=\"/", f"href=\"{basepath}")
-    template = template.replace("src=\"/", f"src=\"{basepath}")
-
-    os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
-    with open(destination, "w") as file:
-        file.write(template)
-
-def generate_pages_recursive(source:str, template_path:str, destination:str, basepath:str):
+    return parse_page(markdown, RenderContext(basepath, links, images, terms, assets))
+
+def parse_page(markdown:str, context:RenderContext) -> dict:
+    # Template variables for a page, Content is streamed from the node tree
+    variables, markdown = extract_front_matter(markdown)
+    variables["Title"] = extract_markdown_title(markdown)
+    variables["Content"] = markdown_to_html_node(markdown, context).iter_html()
+    return variables
+
+def read_source(path:str) -> Tuple[str, str|None]:
+    # The hash of a page source and its text. Pages large enough to be
+    # streamed are hashed in chunks and their text is left to the stream
+    if os.stat(path).st_size > STREAM_THRESHOLD:
+        return hash_file(path), None
+    with open(path, "rb") as file:
+        data = file.read()
+    return hash_bytes(data), decode_source(data)
+
+def decode_source(data:bytes) -> str:
+    # Decoded the way a file opened in text mode is
+    return io.TextIOWrapper(io.BytesIO(data)).read()
+
+def build_prefetched_page(
+    markdown:str,
+    writer:OutputWriter,
+    template:Template,
+    source,
+    template_path,
+    destination,
+    basepath,
+    links:List[str]|None = None,
+    minify:bool = False,
+    images:PageImages|None = None,
+    terms:PageTerms|None = None,
+    assets:AssetMap|None = None
+):
+    # build_page for a source that was already read and its template, the
+    # page is rendered here and handed to writer to be written while the
+    # next one renders
+    variables = parse_page(markdown, RenderContext(basepath, links, images, terms, assets))
+    writer.submit(destination, "".join(template.iter_render(variables)).encode())
+    if terms is not None:
+        terms.title = variables["Title"]
+
+def profile_page(
+    source,
+    template_path,
+    destination,
+    basepath,
+    links:List[str]|None = None,
+    minify:bool = False,
+    images:PageImages|None = None,
+    terms:PageTerms|None = None,
+    assets:AssetMap|None = None
+) -> Dict[str, float]:
+    # The steps of build_page, each run to completion instead of streamed
+    # so the time of every stage can be told apart
+    stopwatch = Stopwatch()
+    if os.path.getsize(source) > STREAM_THRESHOLD:
+        # Streamed as in a build, its stages interleave so the whole page
+        # is charged to render
+        build_page(source, template_path, destination, basepath, links, minify, images, terms, assets)
+        stopwatch.lap("render")
+        return stopwatch.times
+
+    with open(source) as file:
+        markdown = file.read()
+    variables, markdown = extract_front_matter(markdown)
+    variables["Title"] = extract_markdown_title(markdown)
+    if terms is not None:
+        terms.title = variables["Title"]
+    stopwatch.lap("read")
+
+    blocks = markdown_to_blocks(markdown)
+    stopwatch.lap("blocks")
+
+    context = RenderContext(basepath, links, images, terms, assets)
+    node = ParentNode(tag="div", children=[block_node_to_html_node(block, context) for block in blocks])
+    stopwatch.lap("inline")
+
+    variables["Content"] = node.to_html()
+    stopwatch.lap("render")
+
+    html = "".join(load_template(template_path, basepath, minify, assets).iter_render(variables))
+    stopwatch.lap("template")
+
+    write_chunks((html,), destination)
+    stopwatch.lap("write")
+    return stopwatch.times
+
+def write_page(template:Template, variables:dict, destination) -> bool:
+    return write_chunks(template.iter_render(variables), destination)
+
+def write_chunks(chunks, destination) -> bool:
+    # Identical pages keep their mtime, so uploads and caches skip them
+    return write_text(destination, chunks)
+
+def _raise_timeout(signum, frame):
+    raise TimeoutError()
+
+def call_with_timeout(function, timeout:float|None, *args):
+    # SIGALRM interrupts a runaway page inside the worker itself, so the
+    # worker is free again instead of being abandoned by the pool
+    if not timeout or not hasattr(signal, "SIGALRM"):
+        return function(*args)
+
+    previous = signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return function(*args)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+# What a page task hands back to the build: stage times, link targets, image
+# sizes looked up and the title and word counts, each None when not asked for
+PageResult = Tuple[
+    Dict[str, float]|None,
+    List[str]|None,
+    Dict[str, List[int]|None]|None,
+    Tuple[str, Dict[str, int]]|None
+]
+
+def _build_page_task(
+    source,
+    template_path,
+    destination,
+    basepath,
+    timeout,
+    profile:bool = False,
+    check_links:bool = False,
+    minify:bool = False,
+    image_hints:bool = False,
+    index_search:bool = False,
+    markdown:str|None = None,
+    writer:OutputWriter|None = None,
+    template:Template|None = None
+) -> PageResult:
+    links = [] if check_links else None
+    images = PageImages(_image_sizes) if image_hints else None
+    terms = PageTerms() if index_search else None
+    build = profile_page if profile else build_page
+    if markdown is not None and writer is not None:
+        build = functools.partial(build_prefetched_page, markdown, writer, template)
+    try:
+        times = call_with_timeout(
+            build, timeout, source, template_path, destination, basepath, links, minify, images, terms, _assets
+        )
+    except TimeoutError:
+        raise TimeoutError(f"Error: generate_page timed out after {timeout}s on {source}")
+    return (
+        times,
+        links,
+        images.used if images is not None else None,
+        (terms.title, dict(terms.counts)) if terms is not None else None
+    )
+
+def _build_page_serial(source, *args) -> PageResult:
+    # A failure names its page the way it does in generate_pages_parallel
+    try:
+        return _build_page_task(source, *args)
+    except Exception as error:
+        raise RuntimeError(f"Error: generate_page failed on {source}: {error}") from error
+
+def generate_pages_parallel(
+    pages:List[Tuple[str, str, str]],
+    basepath:str,
+    jobs:int,
+    timeout:float|None = None,
+    profile:bool = False,
+    check_links:bool = False,
+    minify:bool = False,
+    image_hints:bool = False,
+    index_search:bool = False
+) -> List[PageResult]:
+    # pages holds (source, template_path, destination), results of
+    # _build_page_task are returned in the same order
+    for source, template_path, destination in pages:
+        log_page(source, template_path, destination)
+
+    # Image sizes and asset names are handed to every worker once instead of
+    # with every page
+    executor = ProcessPoolExecutor(max_workers=jobs, initializer=set_build_state, initargs=(_image_sizes, _assets))
+    try:
+        futures = {
+            executor.submit(
+                _build_page_task,
+                source, template_path, destination, basepath, timeout, profile, check_links, minify, image_hints,
+                index_search
+            ): source
+            for source, template_path, destination in pages
+        }
+        done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+        for future, source in futures.items():
+            error = future.exception() if future in done else None
+            if error is not None:
+                raise RuntimeError(f"Error: generate_page failed on {source}: {error}") from error
+        return [future.result() for future in futures]
+    finally:
+        # Queued pages are dropped after a failure, running ones stop at their timeout
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def is_page(name:str) -> bool:
+    # Other files under content, such as templates and the partials next to
+    # them, are not pages
+    return name.lower().endswith(PAGE_EXTENSIONS)
+
+def page_destination(source:str, destination:str, path:str) -> str:
+    # Where the page for the file at path under source is written
+    return os.path.splitext(os.path.join(destination, os.path.relpath(path, source)))[0] + ".html"
+
+def collect_pages(source:str, destination:str) -> List[Tuple[str, str]]:
+    pages = []
+    for item in sorted(os.listdir(source)):
+        source_item = os.path.join(source, item)
+        if is_page(item) and (os.path.isfile(source_item) or os.path.islink(source_item)):
+            pages.append((source_item, page_destination(source, destination, source_item)))
+        elif os.path.isdir(source_item):
+            destination_item = os.path.join(destination, item)
+            pages.extend(collect_pages(source_item, destination_item))
+    return pages
+
+def generate_pages_recursive(
+    source:str,
+    template_path:str,
+    destination:str,
+    basepath:str,
+    incremental:bool = False,
+    jobs:int = 1,
+    timeout:float|None = None,
+    profile:BuildProfile|None = None,
+    links:LinkIndex|None = None,
+    minify:bool = False,
+    image_hints:bool = False,
+    search:SearchIndex|None = None,
+    assets:AssetMap|None = None,
+    io_threads:int = IO_THREADS,
+    static:str|None = None
+) -> BuildReport:
     if not os.path.exists(source):
         raise FileNotFoundError("Error: generate_pages_recursive source not found")
     if not os.path.isdir(source):
         raise IsADirectoryError("Error: generate_pages_recursive invalid source directory")
     if not os.path.exists(template_path):
         raise FileNotFoundError("Error: generate_pages_recursive template_path not found")
-    
+
     if not os.path.exists(destination):
         os.mkdir(destination)
 
-    for item in os.listdir(source):
-        source_item = os.path.join(source, item)
-        if os.path.isfile(source_item) or os.path.islink(source_item):
-            destination_item = os.path.splitext(os.path.join(destination, item))[0] + ".html"
-            generate_page(source_item, template_path, destination_item, basepath)
-        elif os.path.isdir(source_item):
-            destination_item = os.path.join(destination, item)
-            generate_pages_recursive(source_item, template_path, destination_item, basepath)
-        
-            
\ No newline at end of file
+    return SiteBuild(
+        source, template_path, destination, basepath, incremental, jobs, timeout, profile, links, minify, image_hints,
+        search, assets, io_threads, static
+    ).run()
+
+class SiteBuild:
+    # Builds every page under source into destination. Sources, templates,
+    # the manifest and outputs are reached through the methods below, which
+    # a build kept in memory overrides
+    def __init__(
+        self,
+        source:str,
+        template_path:str,
+        destination:str,
+        basepath:str,
+        incremental:bool = False,
+        jobs:int = 1,
+        timeout:float|None = None,
+        profile:BuildProfile|None = None,
+        links:LinkIndex|None = None,
+        minify:bool = False,
+        image_hints:bool = False,
+        search:SearchIndex|None = None,
+        assets:AssetMap|None = None,
+        io_threads:int = IO_THREADS,
+        static:str|None = None
+    ):
+        self.source = source
+        self.template_path = template_path
+        self.destination = destination
+        self.basepath = basepath
+        self.incremental = incremental
+        self.jobs = jobs
+        self.timeout = timeout
+        self.profile = profile
+        self.links = links
+        self.minify = minify
+        self.image_hints = image_hints
+        self.search = search
+        self.assets = assets
+        self.io_threads = io_threads
+        # Image sizes are read here, destination when None. The copies in
+        # destination get a new mtime on every full build, so the cache of
+        # image headers only hits for the files in static/
+        self.static = static
+
+    def __repr__(self):
+        return f"SiteBuild({self.source}, {self.destination})"
+
+    def collect(self) -> List[Tuple[str, str]]:
+        return collect_pages(self.source, self.destination)
+
+    def read_source(self, path:str) -> Tuple[str, str|None]:
+        return read_source(path)
+
+    def exists(self, path:str) -> bool:
+        return os.path.isfile(path)
+
+    def load_template(self, path:str) -> Template:
+        return load_template(path, self.basepath, self.minify, self.assets)
+
+    def hash_file(self, path:str) -> str:
+        return hash_file(path)
+
+    def load_manifest(self) -> dict:
+        return load_manifest(self.destination)
+
+    def save_manifest(self, manifest:dict):
+        save_manifest(self.destination, manifest)
+
+    def scan_images(self, cache:dict|None) -> Tuple[Dict[str, Tuple[int, int]], dict]:
+        return scan_images(self.static or self.destination, cache)
+
+    def output_exists(self, path:str) -> bool:
+        return os.path.exists(path)
+
+    def remove_output(self, path:str):
+        remove_output(self.destination, path)
+
+    def create_writer(self) -> OutputWriter|None:
+        # Parallel and profiled pages are written by their page tasks
+        if self.jobs > 1 or self.profile is not None:
+            return None
+        return OutputWriter(self.io_threads)
+
+    def log_page(self, source, template_path, destination):
+        log_page(source, template_path, destination)
+
+    def run(self) -> BuildReport:
+        started = time.perf_counter()
+        # Pages are keyed by their path relative to source so the manifest
+        # survives the build being started from another working directory
+        manifest = self.load_manifest()
+        previous = manifest.get("pages", {})
+        previous_links = manifest.get("links", {})
+        previous_search = manifest.get("search", {})
+        basepath_hash = hash_text(self.basepath)
+        # Dependencies are keyed by their path relative to the site template
+        root = os.path.dirname(os.path.abspath(self.template_path))
+        templates = {}
+        template_hashes = {}
+        file_hashes = {}
+        sizes = {}
+        if self.image_hints:
+            sizes, manifest["images"] = self.scan_images(manifest.get("images"))
+        else:
+            manifest.pop("images", None)
+        set_build_state(sizes, self.assets)
+
+        report = BuildReport()
+        pages = {}
+        pending = []
+        results = []
+        options = (
+            self.timeout, self.profile is not None, self.links is not None, self.minify, self.image_hints,
+            self.search is not None
+        )
+        # Sources are read ahead of the loop in a thread pool. Pages rendered
+        # in this process are written behind it, while the next page renders
+        writer = self.create_writer()
+        collected = self.collect()
+        sources = prefetch((source_item for source_item, _ in collected), self.read_source, self.io_threads)
+        try:
+            for (source_item, destination_item), (markdown_hash, markdown) in zip(collected, sources):
+                page_template = find_template(
+                    os.path.dirname(source_item), self.source, self.template_path, templates, self.exists
+                )
+                template = self.load_template(page_template)
+                if page_template not in template_hashes:
+                    # The template and every partial it includes, a change to any of
+                    # them rebuilds only the pages using this template
+                    hashes = template_hashes[page_template] = {}
+                    for dependency in template.dependencies:
+                        if dependency not in file_hashes:
+                            file_hashes[dependency] = self.hash_file(dependency)
+                        hashes[os.path.relpath(dependency, root)] = file_hashes[dependency]
+
+                key = os.path.relpath(source_item, self.source)
+                entry = {
+                    "destination": os.path.relpath(destination_item, self.destination),
+                    "markdown": markdown_hash,
+                    "templates": template_hashes[page_template],
+                    "basepath": basepath_hash,
+                    "minify": self.minify,
+                }
+                if self.assets is not None:
+                    # Any changed static file renames it, so every page is rebuilt
+                    entry["assets"] = self.assets.version
+                if self.image_hints:
+                    # Sizes the page showed last time, a page is rebuilt when one changes
+                    used = (previous.get(key) or {}).get("images")
+                    entry["images"] = used if used is not None and sizes_unchanged(used, sizes) else {}
+                pages[key] = entry
+
+                # Skipped pages reuse the link targets and search terms kept from
+                # their last build
+                if (
+                    self.incremental
+                    and previous.get(key) == entry
+                    and self.output_exists(destination_item)
+                    and (self.links is None or key in previous_links)
+                    and (self.search is None or key in previous_search)
+                ):
+                    report.skipped += 1
+                    continue
+
+                pending.append((source_item, page_template, destination_item))
+                if writer is not None:
+                    self.log_page(source_item, page_template, destination_item)
+                    results.append(_build_page_serial(
+                        source_item, page_template, destination_item, self.basepath, *options, markdown, writer,
+                        template
+                    ))
+        finally:
+            sources.close()
+            if writer is not None:
+                # Every output is written, or the first failed write raised,
+                # before anything is removed or the manifest is saved
+                writer.close()
+
+        if writer is None and self.jobs > 1 and len(pending) > 1:
+            results = generate_pages_parallel(pending, self.basepath, self.jobs, *options)
+        elif writer is None:
+            for source_item, page_template, destination_item in pending:
+                self.log_page(source_item, page_template, destination_item)
+                results.append(_build_page_serial(source_item, page_template, destination_item, self.basepath, *options))
+        report.rebuilt = len(pending)
+
+        page_links = {}
+        page_search = {}
+        for (source_item, _, _), (times, targets, used, terms) in zip(pending, results):
+            key = os.path.relpath(source_item, self.source)
+            if self.profile is not None:
+                self.profile.add(source_item, times)
+            if self.links is not None:
+                page_links[key] = targets
+            if self.image_hints:
+                pages[key]["images"] = used
+            if self.search is not None:
+                page_search[key] = {"title": terms[0], "terms": terms[1]}
+
+        # Remove outputs whose source was deleted since the last build
+        outputs = set(entry["destination"] for entry in pages.values())
+        for key, entry in previous.items():
+            if key in pages or entry["destination"] in outputs:
+                continue
+            self.remove_output(os.path.join(self.destination, entry["destination"]))
+            report.deleted += 1
+
+        manifest["pages"] = pages
+        if self.links is not None:
+            for key, entry in pages.items():
+                if key not in page_links:
+                    page_links[key] = previous_links[key]
+                self.links.add_page(entry["destination"].replace(os.sep, "/"), page_links[key])
+            manifest["links"] = page_links
+        else:
+            # Links of pages rendered now were not collected
+            manifest.pop("links", None)
+        if self.search is not None:
+            ids = assign_ids(pages, {key: record["id"] for key, record in previous_search.items()})
+            for key, entry in pages.items():
+                record = page_search.get(key) or previous_search[key]
+                record["id"] = ids[key]
+                page_search[key] = record
+                url = self.basepath + entry["destination"].replace(os.sep, "/")
+                self.search.add_page(ids[key], url, record["title"], record["terms"])
+            manifest["search"] = page_search
+        else:
+            manifest.pop("search", None)
+        self.save_manifest(manifest)
+        if self.profile is not None:
+            self.profile.elapsed += time.perf_counter() - started
+        return report
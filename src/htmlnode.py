@@ -1,6 +1,44 @@
-from typing import Optional, List, Dict
+from sys import intern
+from typing import Optional, List, Dict, Iterator, TextIO
+
+# Characters that would end a text run or a quoted attribute value early
+TEXT_ESCAPES = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
+ATTRIBUTE_ESCAPES = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", "\"": "&quot;"})
+
+def escape_text(text:str) -> str:
+    # Most text has nothing to escape, a few scans for the special
+    # characters are much cheaper than translate copying the string
+    if "<" in text or "&" in text or ">" in text:
+        return text.translate(TEXT_ESCAPES)
+    return text
+
+def escape_attribute(value:str) -> str:
+    if "\"" in value or "&" in value or "<" in value or ">" in value:
+        return value.translate(ATTRIBUTE_ESCAPES)
+    return value
+
+def render_props(props:Dict[str, str]) -> str:
+    return "".join(list(f" {key}=\"{escape_attribute(value)}\"" for key, value in props.items()))
+
+class FrozenProps(dict):
+    # Props shared by every node with the same attributes, so they must
+    # never be changed in place. Their html is rendered once, on first use
+    __slots__ = ("html",)
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("Error: FrozenProps cannot be modified")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return (FrozenProps, (dict(self),))
 
 class HTMLNode:
+    # Pages create hundreds of thousands of nodes, slots drop the
+    # per-instance __dict__
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(
         self, 
         tag:Optional[str] = None, 
@@ -8,19 +46,59 @@ class HTMLNode:
         children:Optional[List['HTMLNode']] = None, 
         props:Optional[Dict[str, str]] = None
     ):
-        self.tag = tag
+        self.tag = intern(tag) if tag.__class__ is str else tag
         self.value = value
         self.children = children
         self.props = props
     
     def to_html(self):
+        return "".join(self.iter_html())
+
+    def start_html(self) -> str:
         raise NotImplementedError()
 
+    def end_html(self) -> str:
+        return ""
+
+    def iter_html(self) -> Iterator[str]:
+        # Walk the tree with an explicit stack so every chunk is produced
+        # once, however deep the nesting, instead of each parent copying
+        # the joined html of its subtree
+        stack = [(self, False)]
+        open_nodes = set()
+        while stack:
+            node, closing = stack.pop()
+            if closing:
+                open_nodes.discard(id(node))
+                yield node.end_html()
+                continue
+
+            yield node.start_html()
+            children = node.children
+            if children is None:
+                continue
+
+            if id(node) in open_nodes:
+                raise RecursionError("Error: to_html node is its own ancestor")
+            open_nodes.add(id(node))
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(list(children)))
+
+    def write_html(self, fp:TextIO):
+        fp.writelines(self.iter_html())
+
     def props_to_html(self):
-        if not self.props:
+        props = self.props
+        if not props:
             return ""
-        return "".join(list(f" {key}=\"{value}\"" for key, value in self.props.items()))
+        if props.__class__ is not FrozenProps:
+            return render_props(props)
+        try:
+            return props.html
+        except AttributeError:
+            html = props.html = render_props(props)
+            return html
     
     def __repr__(self):
         return f"HTMLNode({self.tag}, {self.value}, {self.children}, {self.props})"
-    
\ No newline at end of file
+    
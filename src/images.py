@@ -0,0 +1,151 @@
+import os
+import struct
+
+from concurrent.futures import ThreadPoolExecutor
+from links import target_path
+from typing import BinaryIO, Dict, List, Tuple
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp")
+# Below this many header reads a thread pool costs more than it saves
+PARALLEL_THRESHOLD = 16
+# JPEG markers that stand alone without a length, and the start of frame
+# markers that hold the size, every SOFn but DHT, JPG and DAC
+JPEG_STANDALONE = frozenset([0x01, *range(0xD0, 0xDA)])
+JPEG_FRAMES = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+def _jpeg_size(file:BinaryIO) -> Tuple[int, int]|None:
+    # Walks the segments from the start of the file, seeking over the
+    # contents of each one, until the frame header
+    file.seek(2)
+    while True:
+        byte = file.read(1)
+        if byte != b"\xff":
+            return None
+        marker = file.read(1)
+        while marker == b"\xff":
+            # Fill bytes before the marker
+            marker = file.read(1)
+        if not marker:
+            return None
+        marker = marker[0]
+        if marker in JPEG_STANDALONE:
+            continue
+        header = file.read(2)
+        if len(header) < 2:
+            return None
+        length = struct.unpack(">H", header)[0]
+        if marker in JPEG_FRAMES:
+            frame = file.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">HH", frame[1:5])
+            return width, height
+        file.seek(length - 2, os.SEEK_CUR)
+
+def read_image_size(file:BinaryIO) -> Tuple[int, int]|None:
+    # Width and height from the header of a PNG, GIF, WebP or JPEG file
+    # without decoding any pixels, None for other or truncated files
+    head = file.read(32)
+    if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+        return struct.unpack(">II", head[16:24])
+    if head[:6] in (b"GIF87a", b"GIF89a") and len(head) >= 10:
+        return struct.unpack("<HH", head[6:10])
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP" and len(head) >= 30:
+        chunk = head[12:16]
+        if chunk == b"VP8 ":
+            width, height = struct.unpack("<HH", head[26:30])
+            return width & 0x3FFF, height & 0x3FFF
+        if chunk == b"VP8L" and head[20] == 0x2F:
+            bits = int.from_bytes(head[21:25], "little")
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b"VP8X":
+            return int.from_bytes(head[24:27], "little") + 1, int.from_bytes(head[27:30], "little") + 1
+        return None
+    if head[:2] == b"\xff\xd8":
+        return _jpeg_size(file)
+    return None
+
+def image_size(path:str) -> Tuple[int, int]|None:
+    try:
+        with open(path, "rb") as file:
+            return read_image_size(file)
+    except (OSError, struct.error):
+        return None
+
+def scan_images(
+    root:str,
+    cache:Dict[str, List]|None = None,
+    workers:int|None = None
+) -> Tuple[Dict[str, Tuple[int, int]], Dict[str, List]]:
+    # Sizes of every image under root keyed by its posix path relative to
+    # root. cache maps those paths to [mtime_ns, size, width, height] from
+    # an earlier scan, only images that are new or changed since are read.
+    # Returns the sizes and the cache to keep for the next scan
+    cache = cache or {}
+    current:Dict[str, List] = {}
+    pending:List[Tuple[str, str, os.stat_result]] = []
+    for directory, _, names in os.walk(root):
+        for name in names:
+            if not name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            path = os.path.join(directory, name)
+            key = os.path.relpath(path, root).replace(os.sep, "/")
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entry = cache.get(key)
+            if entry is not None and entry[:2] == [stat.st_mtime_ns, stat.st_size]:
+                current[key] = entry
+            else:
+                pending.append((key, path, stat))
+
+    # The headers of all new images are read in one batch up front, so
+    # pages only ever look sizes up
+    paths = [path for _, path, _ in pending]
+    if len(pending) >= PARALLEL_THRESHOLD and workers != 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            sizes = list(executor.map(image_size, paths))
+    else:
+        sizes = [image_size(path) for path in paths]
+    for (key, _, stat), size in zip(pending, sizes):
+        current[key] = [stat.st_mtime_ns, stat.st_size, *(size or (None, None))]
+
+    found = {key: (entry[2], entry[3]) for key, entry in current.items() if entry[2] is not None}
+    return found, current
+
+def image_key(url:str) -> str|None:
+    # Site-absolute urls map to a path under the output directory, relative
+    # ones depend on the page and are not looked up
+    if not url.startswith("/"):
+        return None
+    return target_path(url, "")
+
+class PageImages:
+    # Size lookups of one page, recorded so the page is rendered again when
+    # the size of an image it shows changes
+    def __init__(self, sizes:Dict[str, Tuple[int, int]]):
+        self.sizes = sizes
+        self.used:Dict[str, List[int]|None] = {}
+        self.count = 0
+
+    def __repr__(self):
+        return f"PageImages({len(self.used)} used, {self.count} images)"
+
+    def hints(self, url:str) -> Tuple[Tuple[int, int]|None, bool]:
+        # The size of the image at url if known and whether it loads lazily,
+        # every image but the first is likely below the fold
+        self.count += 1
+        key = image_key(url)
+        if key is None:
+            return None, self.count > 1
+        size = self.sizes.get(key)
+        self.used[key] = list(size) if size else None
+        return size, self.count > 1
+
+def sizes_unchanged(used:Dict[str, List[int]|None], sizes:Dict[str, Tuple[int, int]]) -> bool:
+    for key, size in used.items():
+        current = sizes.get(key)
+        if (list(current) if current else None) != size:
+            return False
+    return True
@@ -0,0 +1,90 @@
+import re
+
+from textnode import TextNode, TextType
+from typing import List
+
+# The scanner reproduces the chained split passes in convert exactly: bold
+# pairs are matched first and hide everything inside them, then italics,
+# then code, and images and links are only found in the plain text between.
+# A markup token inside an italic or code span that an earlier pass would
+# have split on leaves that span unclosed, which raises like the passes do.
+# Images are split out before links, so an image wins over a link it overlaps.
+_TEXT_MARKUP = re.compile(r"\*\*|_|`|!?\[")
+_ITALIC_END = re.compile(r"\*\*|_")
+_CODE_END = re.compile(r"\*\*|_|`")
+_DELIMITER = re.compile(r"\*\*|[_`]")
+_IMAGE = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+_LINK = re.compile(r"\[([^\[\]]*)\]\(([^\(\)]*)\)")
+
+def _closing_error():
+    return ValueError("Error: split_nodes_delimiter missing closing delimiter")
+
+def _starts_image(text:str, start:int, end:int) -> bool:
+    index = text.find("![", start, end)
+    while index != -1:
+        image = _IMAGE.match(text, index)
+        if image is not None and not _DELIMITER.search(text, index, image.end()):
+            return True
+        index = text.find("![", index + 1, end)
+    return False
+
+def scan_text_nodes(text:str) -> List[TextNode]:
+    nodes:List[TextNode] = []
+    append = nodes.append
+    position = 0
+    start = 0 # Start of the pending plain text run
+
+    while True:
+        match = _TEXT_MARKUP.search(text, position)
+        if match is None:
+            break
+
+        token = match.group()
+        index = match.start()
+        if token == "**":
+            end = text.find("**", index + 2)
+            if end == -1:
+                raise _closing_error()
+            span = (index + 2, end, TextType.BOLD)
+            position = end + 2
+        elif token == "_":
+            closing = _ITALIC_END.search(text, index + 1)
+            if closing is None or closing.group() != "_":
+                raise _closing_error()
+            span = (index + 1, closing.start(), TextType.ITALIC)
+            position = closing.end()
+        elif token == "`":
+            closing = _CODE_END.search(text, index + 1)
+            if closing is None or closing.group() != "`":
+                raise _closing_error()
+            span = (index + 1, closing.start(), TextType.CODE)
+            position = closing.end()
+        else:
+            pattern = _IMAGE if token == "![" else _LINK
+            target = pattern.match(text, index)
+            # A link the delimiter passes would have cut in two is just text
+            if (
+                target is None
+                or _DELIMITER.search(text, index, target.end())
+                or (token == "[" and _starts_image(text, index + 1, target.end()))
+            ):
+                position = match.end()
+                continue
+
+            if start < index:
+                append(TextNode(text[start:index], TextType.TEXT))
+            text_type = TextType.IMAGE if token == "![" else TextType.LINK
+            append(TextNode(target.group(1), text_type, target.group(2)))
+            position = start = target.end()
+            continue
+
+        if start < index:
+            append(TextNode(text[start:index], TextType.TEXT))
+        span_start, span_end, text_type = span
+        if span_start < span_end:
+            append(TextNode(text[span_start:span_end], text_type))
+        start = position
+
+    if start < len(text):
+        append(TextNode(text[start:], TextType.TEXT))
+    return nodes
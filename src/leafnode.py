@@ -1,7 +1,9 @@
-from htmlnode import HTMLNode
+from htmlnode import TEXT_ESCAPES, HTMLNode
 from typing import Optional, Dict
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(
         self,
         tag:str|None,
@@ -10,10 +12,15 @@ class LeafNode(HTMLNode):
     ):
         super().__init__(tag, value, None, props)
     
-    def to_html(self):
+    def start_html(self):
         if self.value is None:
             raise ValueError("Error: LeafNode expecting value property")
+        # Values are plain text, code blocks included, escaped here once.
+        # Same test as escape_text, inlined since every leaf goes through it
+        value = self.value
+        if "<" in value or "&" in value or ">" in value:
+            value = value.translate(TEXT_ESCAPES)
         if not self.tag:
-            return f"{self.value}"
+            return value
         
-        return f"<{self.tag}{self.props_to_html()}>" + (f"{self.value}</{self.tag}>" if self.value != "" else "")
\ No newline at end of file
+        return f"<{self.tag}{self.props_to_html()}>" + (f"{value}</{self.tag}>" if value != "" else "")
\ No newline at end of file
@@ -0,0 +1,94 @@
+import posixpath
+import re
+
+from typing import Dict, Iterable, List, Set, Tuple
+from urllib.parse import unquote, urlsplit
+
+def is_relative(url:str) -> bool:
+    # Not absolute, no scheme like https: or mailto: and no //host
+    return not url.startswith("/") and ":" not in url.split("/", 1)[0]
+
+def rewrite_markdown_link(url:str) -> str:
+    # Relative links to another markdown file point at the page built from it
+    if ".md" not in url or not is_relative(url):
+        return url
+    end = len(url)
+    for separator in "?#":
+        index = url.find(separator)
+        if index != -1:
+            end = min(end, index)
+    if not url.endswith(".md", 0, end):
+        return url
+    return url[:end - 3] + ".html" + url[end:]
+
+# Plain paths, most links on a site, skip urlsplit and normpath, paths
+# with empty or dot segments only need normpath
+_NEEDS_PARSING = re.compile(r"[%?#]")
+_NEEDS_NORMALIZING = re.compile(r"//|(?:^|/)\.\.?(?:/|$)")
+
+def target_path(url:str, directory:str) -> str|None:
+    # The output path relative to the site root that url points at from a
+    # page in directory, None for external urls and links within the page
+    if url.startswith("/"):
+        if url.startswith("//"):
+            return None
+        path = url[1:]
+    elif not is_relative(url):
+        return None
+    else:
+        path = f"{directory}/{url}" if directory else url
+    if _NEEDS_PARSING.search(path):
+        parts = urlsplit(url)
+        if parts.scheme or parts.netloc or not parts.path:
+            return None
+        path = unquote(parts.path)
+        if path.startswith("/"):
+            path = path.lstrip("/")
+        else:
+            path = posixpath.join(directory, path)
+    elif not _NEEDS_NORMALIZING.search(path):
+        return path
+    path = posixpath.normpath(path) if path else ""
+    return "" if path == "." else path
+
+class LinkIndex:
+    def __init__(self):
+        # Link and image targets of every page, keyed by its output path
+        self.pages:Dict[str, List[str]] = {}
+        # Paths of every generated page and static asset
+        self.outputs:Set[str] = set()
+
+    def __repr__(self):
+        return f"LinkIndex({len(self.pages)} pages, {len(self.outputs)} outputs)"
+
+    def add_page(self, path:str, urls:List[str]):
+        self.pages[path] = urls
+        self.outputs.add(path)
+
+    def add_outputs(self, paths:Iterable[str]):
+        self.outputs.update(paths)
+
+    def exists(self, path:str) -> bool:
+        # A directory is served through its index page
+        if path in self.outputs:
+            return True
+        return posixpath.join(path, "index.html") in self.outputs
+
+    def broken(self) -> List[Tuple[str, str]]:
+        # Every target is resolved once per directory it is linked from and
+        # checked with set lookups, the filesystem is never touched
+        absolute:Dict[str, bool] = {}
+        relative:Dict[str, Dict[str, bool]] = {}
+        broken = []
+        for page in sorted(self.pages):
+            directory = posixpath.dirname(page)
+            in_directory = relative.setdefault(directory, {})
+            for url in dict.fromkeys(self.pages[page]):
+                resolved = absolute if url.startswith("/") else in_directory
+                found = resolved.get(url)
+                if found is None:
+                    path = target_path(url, directory)
+                    found = resolved[url] = path is None or self.exists(path)
+                if not found:
+                    broken.append((page, url))
+        return broken
@@ -1,8 +1,19 @@
+import argparse
+import cProfile
 import os
 import shutil
 import sys
 
+from compress import BROTLI_LEVEL, GZIP_LEVEL, compress_outputs
+from fingerprint import ASSET_MAP_NAME, fingerprint_assets
 from generate import generate_pages_recursive
+from links import LinkIndex
+from pipeline import IO_THREADS
+from search import PREFIX_LENGTH, SEARCH_DIRECTORY, SearchIndex
+from serve import DevSite, serve
+from sync import collect_files, sync_contents
+from timing import BuildProfile
+from watch import SiteWatcher
 
 def remove_contents(path):
     # Everything is already removed
@@ -32,14 +43,166 @@ def copy_contents(source, destination):
         elif os.path.isdir(source_path):
             copy_contents(source_path, destination_path)
         
+def parse_args(args):
+    parser = argparse.ArgumentParser(description="Build the site in public/ from content/, static/ and template.html")
+    parser.add_argument("basepath", nargs="?", default="/", help="path the site is served from")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only rebuild pages whose markdown, template or basepath changed"
+    )
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        nargs="?",
+        default=1,
+        const=os.cpu_count() or 1,
+        help="render pages in this many processes, all cores when no count is given"
+    )
+    parser.add_argument("--timeout", type=float, help="seconds a single page may take to render")
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help="only copy static files that changed and remove the ones deleted from static/"
+    )
+    parser.add_argument("--checksum", action="store_true", help="compare static files by hash instead of size and mtime, implies --sync")
+    parser.add_argument("--hardlink", action="store_true", help="hardlink static files into public/ instead of copying, implies --sync")
+    parser.add_argument("--sync-threads", type=int, help="threads used to copy static files")
+    parser.add_argument(
+        "--io-threads", type=int, default=IO_THREADS,
+        help="threads reading pages ahead of and writing outputs behind a serial build"
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="build, then rebuild what changes in content/, static/ and template.html until interrupted"
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="serve the site from memory without building it to public/, rendering pages when first requested and reloading open pages when their sources change"
+    )
+    parser.add_argument("--port", type=int, default=8888, help="port --serve listens on")
+    parser.add_argument(
+        "--profile",
+        type=int,
+        nargs="?",
+        const=10,
+        metavar="N",
+        help="time the stages of every page and print a summary with the N slowest pages, 10 when no count is given"
+    )
+    parser.add_argument(
+        "--profile-output",
+        metavar="FILE",
+        help="write a cProfile dump of the build to FILE for pstats, only the main process is profiled with --jobs"
+    )
+    parser.add_argument(
+        "--check-links",
+        action="store_true",
+        help="report links and images pointing at pages or static files that do not exist, and fail the build if any do"
+    )
+    parser.add_argument(
+        "--minify",
+        action="store_true",
+        help="drop comments, optional quotes and whitespace between tags from the template, keeping pre, textarea, script and style"
+    )
+    parser.add_argument(
+        "--fingerprint",
+        action="store_true",
+        help=f"also copy static files under names holding their content hash, point the template and pages at them and write the mapping to public/{ASSET_MAP_NAME}, ignored by --watch"
+    )
+    parser.add_argument(
+        "--search",
+        action="store_true",
+        help="write a search index of every page to public/search/, sharded by the first letters of each word"
+    )
+    parser.add_argument(
+        "--search-prefix",
+        type=int,
+        default=PREFIX_LENGTH,
+        metavar="N",
+        help="leading letters of a word that pick its search shard"
+    )
+    parser.add_argument(
+        "--no-image-hints",
+        action="store_true",
+        help="leave out the width, height, loading and decoding attributes of images"
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="write .gz sidecars, and .br ones when the brotli module is installed, next to html, css and other text outputs"
+    )
+    parser.add_argument("--gzip-level", type=int, default=GZIP_LEVEL, choices=range(1, 10), metavar="1-9", help="gzip compression level")
+    parser.add_argument("--brotli-level", type=int, default=BROTLI_LEVEL, choices=range(0, 12), metavar="0-11", help="brotli quality")
+    parser.add_argument("--compress-threads", type=int, help="threads used to compress outputs")
+    return parser.parse_args(args[1:])
+
 def main(args):
-    basepath = "/"
-    if len(args) > 1:
-        basepath = args[1]
-    
-    remove_contents("public")
-    copy_contents("static", "public")
-    generate_pages_recursive("content", "template.html", "public", basepath)
+    options = parse_args(args)
+    if options.watch:
+        SiteWatcher(
+            "content", "static", "template.html", "public", options.basepath, options.minify, not options.no_image_hints
+        ).run()
+        return
+    if options.serve:
+        site = DevSite("content", "static", "template.html", options.basepath, options.minify, not options.no_image_hints)
+        serve(site, port=options.port)
+        return
+
+    if options.profile_output:
+        profiler = cProfile.Profile()
+        try:
+            profiler.runcall(build, options)
+        finally:
+            profiler.dump_stats(options.profile_output)
+    else:
+        build(options)
+
+def build(options):
+    if options.sync or options.hardlink or options.checksum:
+        print(sync_contents("static", "public", options.checksum, options.hardlink, options.sync_threads).summary())
+    else:
+        if not options.incremental:
+            remove_contents("public")
+        copy_contents("static", "public")
+    assets = fingerprint_assets("static", "public") if options.fingerprint else None
+    profile = BuildProfile(options.profile) if options.profile is not None else None
+    links = LinkIndex() if options.check_links else None
+    search = SearchIndex(options.search_prefix) if options.search else None
+    report = generate_pages_recursive(
+        "content",
+        "template.html",
+        "public",
+        options.basepath,
+        incremental=options.incremental,
+        jobs=options.jobs,
+        timeout=options.timeout,
+        profile=profile,
+        links=links,
+        minify=options.minify,
+        image_hints=not options.no_image_hints,
+        search=search,
+        assets=assets,
+        io_threads=options.io_threads,
+        static="static"
+    )
+    print(report.summary())
+    if search is not None:
+        written, kept = search.write(os.path.join("public", SEARCH_DIRECTORY))
+        print(f"Indexed {len(search.pages)} pages for search, wrote {written} index files, kept {kept}")
+    if options.compress:
+        print(compress_outputs("public", options.gzip_level, options.brotli_level, options.compress_threads).summary())
+    if profile is not None:
+        print(profile.summary())
+    if links is not None:
+        links.add_outputs(path.replace(os.sep, "/") for path in collect_files("static"))
+        broken = links.broken()
+        for page, url in broken:
+            print(f"Broken link in {page}: {url}")
+        print(f"Checked links in {len(links.pages)} pages, {len(broken)} broken")
+        if broken:
+            sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,49 @@
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = ".manifest.json"
+MANIFEST_VERSION = 1
+
+def hash_bytes(data:bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def hash_text(text:str) -> str:
+    return hash_bytes(text.encode())
+
+def hash_file(path:str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def manifest_path(destination:str) -> str:
+    return os.path.join(destination, MANIFEST_NAME)
+
+def load_manifest(destination:str) -> dict:
+    path = manifest_path(destination)
+    if not os.path.exists(path):
+        return {}
+
+    try:
+        with open(path) as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        # A corrupt manifest only costs a full rebuild
+        return {}
+
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest
+
+def save_manifest(destination:str, manifest:dict):
+    os.makedirs(destination, exist_ok=True)
+    path = manifest_path(destination)
+    manifest["version"] = MANIFEST_VERSION
+
+    # Write through a temp file so an interrupted build keeps the old manifest
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+    os.replace(temp_path, path)
@@ -0,0 +1,105 @@
+import re
+
+from typing import List
+
+# Elements whose text is kept exactly as written
+RAW_ELEMENTS = ("pre", "textarea", "script", "style")
+# Whitespace next to these tags never renders, so it can be dropped instead
+# of collapsed to a single space
+BLOCK_ELEMENTS = frozenset((
+    "!doctype", "address", "article", "aside", "base", "blockquote", "body", "br", "dd", "details",
+    "dialog", "div", "dl", "dt", "fieldset", "figcaption", "figure", "footer", "form", "h1", "h2",
+    "h3", "h4", "h5", "h6", "head", "header", "hr", "html", "li", "link", "main", "meta", "nav",
+    "noscript", "ol", "p", "pre", "script", "section", "style", "summary", "table", "tbody", "td",
+    "tfoot", "th", "thead", "title", "tr", "ul",
+))
+
+TOKEN_PATTERN = re.compile(
+    r"<!--.*?-->"
+    r"|<(" + "|".join(RAW_ELEMENTS) + r")\b[^>]*>.*?</\1\s*>"
+    r"|<[!/]?[A-Za-z][^>]*>"
+    r"|\{\{.*?\}\}",
+    re.DOTALL | re.IGNORECASE
+)
+TAG_PATTERN = re.compile(r"<(/?[!A-Za-z][^\s/>]*)((?:\s+[^\s\"'>/=]+(?:\s*=\s*(?:\"[^\"]*\"|'[^']*'|[^\s\"'>]+))?)*)\s*/?\s*>", re.DOTALL)
+ATTRIBUTE_PATTERN = re.compile(r"\s+([^\s\"'>/=]+)(?:\s*=\s*(\"[^\"]*\"|'[^']*'|[^\s\"'>]+))?")
+# Attribute values that parse the same without quotes
+UNQUOTED_VALUE = re.compile(r"[^\s\"'=<>`{}]+")
+WHITESPACE = re.compile(r"\s+")
+
+def tag_name(token:str) -> str|None:
+    # Lowercase name of a tag token without its slash, None for comments and slots
+    if not token.startswith("<") or token.startswith("<!--"):
+        return None
+    match = TAG_PATTERN.match(token)
+    name = match.group(1) if match else token[1:].split(None, 1)[0].rstrip(">")
+    return name.lstrip("/").lower()
+
+def minify_tag(token:str) -> str:
+    match = TAG_PATTERN.fullmatch(token)
+    if match is None or "{{" in token:
+        # Tags holding a slot may get any value, they are left alone
+        return token
+
+    parts = ["<", match.group(1)]
+    for attribute in ATTRIBUTE_PATTERN.finditer(match.group(2)):
+        name, value = attribute.groups()
+        parts.append(" " + name)
+        if value is None:
+            continue
+        if value[0] in "\"'":
+            value = value[1:-1]
+            if not UNQUOTED_VALUE.fullmatch(value):
+                value = f"\"{value}\"" if "\"" not in value else f"'{value}'"
+        parts.append("=" + value)
+    parts.append(">")
+    return "".join(parts)
+
+def minify_html(text:str) -> str:
+    # Drops comments and optional attribute quotes and collapses whitespace
+    # between tags, leaving pre, textarea, script and style elements and
+    # template slots as written
+    tokens:List[str] = []
+    position = 0
+    for match in TOKEN_PATTERN.finditer(text):
+        if match.start() > position:
+            tokens.append(text[position:match.start()])
+        token = match.group(0)
+        if token.startswith("<!--"):
+            if token.startswith("<!--["):
+                # Conditional comments still mean something to old browsers
+                tokens.append(token)
+        elif match.group(1):
+            start = token.index(">") + 1
+            tokens.append(minify_tag(token[:start]) + token[start:])
+        elif token.startswith("<"):
+            tokens.append(minify_tag(token))
+        else:
+            tokens.append(token)
+        position = match.end()
+    if position < len(text):
+        tokens.append(text[position:])
+
+    # Whitespace is a token of its own only where a comment was dropped
+    # between two runs, join those before collapsing
+    merged:List[str] = []
+    for token in tokens:
+        if merged and not token.startswith(("<", "{{")) and not merged[-1].startswith(("<", "{{")):
+            merged[-1] += token
+        else:
+            merged.append(token)
+
+    output = []
+    for index, token in enumerate(merged):
+        if token.startswith(("<", "{{")):
+            output.append(token)
+            continue
+        text = WHITESPACE.sub(" ", token)
+        before = tag_name(merged[index - 1]) if index > 0 else "!doctype"
+        after = tag_name(merged[index + 1]) if index + 1 < len(merged) else "!doctype"
+        if before in BLOCK_ELEMENTS:
+            text = text.lstrip()
+        if after in BLOCK_ELEMENTS:
+            text = text.rstrip()
+        output.append(text)
+    return "".join(output)
@@ -0,0 +1,94 @@
+import hashlib
+import os
+import tempfile
+
+from typing import Iterable, Iterator
+
+# Text chunks are encoded, hashed and written in batches of about this many
+# characters, a page streams as thousands of tiny chunks
+BATCH_SIZE = 1 << 16
+# Tiny chunks cost more as objects than as text, a batch is joined in place
+# every this many chunks
+BATCH_CHUNKS = 1 << 10
+# Temp files are created private, outputs get the mode open() would give them
+UMASK = os.umask(0)
+os.umask(UMASK)
+FILE_MODE = 0o666 & ~UMASK
+
+def remove_output(destination:str, path:str):
+    if os.path.isfile(path) or os.path.islink(path):
+        os.unlink(path)
+
+    # Prune directories left empty, but never the destination itself
+    root = os.path.abspath(destination)
+    parent = os.path.dirname(os.path.abspath(path))
+    while parent != root and parent.startswith(root) and not os.listdir(parent):
+        os.rmdir(parent)
+        parent = os.path.dirname(parent)
+
+def encode_chunks(chunks:Iterable[str]) -> Iterator[bytes]:
+    batch = []
+    length = 0
+    for chunk in chunks:
+        batch.append(chunk)
+        length += len(chunk)
+        if length >= BATCH_SIZE:
+            yield "".join(batch).encode()
+            batch = []
+            length = 0
+        elif len(batch) >= BATCH_CHUNKS:
+            batch = ["".join(batch)]
+    if batch:
+        yield "".join(batch).encode()
+
+def has_contents(path:str, size:int, digest:str) -> bool:
+    # Size first, the existing file is only read when it could be identical
+    try:
+        if os.path.getsize(path) != size:
+            return False
+        existing = hashlib.sha256()
+        with open(path, "rb") as file:
+            for block in iter(lambda: file.read(1 << 16), b""):
+                existing.update(block)
+    except OSError:
+        return False
+    return existing.hexdigest() == digest
+
+def write_output(destination:str, blocks:bytes|Iterable[bytes], create_parent:bool = True) -> bool:
+    # Streams blocks into a temp file next to destination and renames it
+    # over destination, so a failed or interrupted write never leaves a
+    # partial file behind. An identical destination is left untouched,
+    # mtime included. Returns whether destination was written
+    compared = isinstance(blocks, bytes)
+    if compared:
+        # A whole output is compared before anything is written
+        if has_contents(destination, len(blocks), hashlib.sha256(blocks).hexdigest()):
+            return False
+        blocks = (blocks,)
+    directory = os.path.dirname(destination) or "."
+    if create_parent:
+        os.makedirs(directory, exist_ok=True)
+    # Hidden and unique, so concurrent writers and outputs named like a
+    # temp file never collide
+    fd, temp_path = tempfile.mkstemp(suffix=".tmp", prefix=f".{os.path.basename(destination)}.", dir=directory)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as file:
+            for block in blocks:
+                digest.update(block)
+                size += len(block)
+                file.write(block)
+        if not compared and has_contents(destination, size, digest.hexdigest()):
+            os.unlink(temp_path)
+            return False
+        os.chmod(temp_path, FILE_MODE)
+        os.replace(temp_path, destination)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    return True
+
+def write_text(destination:str, chunks:Iterable[str]) -> bool:
+    return write_output(destination, encode_chunks(chunks))
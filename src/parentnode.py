@@ -2,6 +2,8 @@ from htmlnode import HTMLNode
 from typing import Optional, List, Dict
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(
         self,
         tag:str,
@@ -10,10 +12,13 @@ class ParentNode(HTMLNode):
     ):
         super().__init__(tag, "", children, props)
     
-    def to_html(self):
+    def start_html(self):
         if not self.tag:
             raise ValueError("Error: ParentNode expecting tag property")
         if not self.children:
             raise ValueError("Error: ParentNode expecting children property")
 
-        return f"<{self.tag}>{"".join(child.to_html() for child in self.children)}</{self.tag}>"
\ No newline at end of file
+        return f"<{self.tag}>"
+
+    def end_html(self):
+        return f"</{self.tag}>"
\ No newline at end of file
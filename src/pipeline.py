@@ -0,0 +1,90 @@
+import os
+import threading
+
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from output import write_output
+from typing import Callable, Iterable, Iterator, Set, TypeVar
+
+# Threads reading and writing small files, which spend their time waiting
+# on the filesystem rather than holding the GIL
+IO_THREADS = int(os.environ.get("SSG_IO_THREADS", 8))
+# Reads ahead of and writes behind the renderer at most this many files,
+# so memory stays bounded however many pages there are
+IO_DEPTH = 32
+
+T = TypeVar("T")
+
+def prefetch(
+    paths:Iterable[str],
+    read:Callable[[str], T],
+    threads:int = IO_THREADS,
+    depth:int = IO_DEPTH
+) -> Iterator[T]:
+    # read(path) for every path in order, run in a thread pool up to depth
+    # paths ahead of the consumer
+    executor = ThreadPoolExecutor(max_workers=threads)
+    window:deque = deque()
+    try:
+        for path in paths:
+            if len(window) >= depth:
+                yield window.popleft().result()
+            window.append(executor.submit(read, path))
+        while window:
+            yield window.popleft().result()
+    finally:
+        # A consumer that stops early leaves no reads running
+        executor.shutdown(wait=True, cancel_futures=True)
+
+class OutputWriter:
+    # Writes files with write_output in a thread pool while the caller
+    # renders the next ones. submit blocks once depth writes are pending
+    def __init__(self, threads:int = IO_THREADS, depth:int = IO_DEPTH):
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+        self.slots = threading.BoundedSemaphore(depth)
+        self.lock = threading.Lock()
+        # Directories already created, each one is created once
+        self.directories:Set[str] = set()
+        self.error:BaseException|None = None
+        self.written = 0
+        self.kept = 0
+
+    def __repr__(self):
+        return f"OutputWriter({self.written} written, {self.kept} kept)"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _write(self, destination:str, data:bytes) -> bool:
+        directory = os.path.dirname(destination) or "."
+        if directory not in self.directories:
+            os.makedirs(directory, exist_ok=True)
+            with self.lock:
+                self.directories.add(directory)
+        return write_output(destination, data, create_parent=False)
+
+    def _done(self, future:Future):
+        self.slots.release()
+        with self.lock:
+            error = future.exception()
+            if error is not None:
+                self.error = self.error or error
+            elif future.result():
+                self.written += 1
+            else:
+                self.kept += 1
+
+    def submit(self, destination:str, data:bytes):
+        if self.error is not None:
+            raise self.error
+        self.slots.acquire()
+        self.executor.submit(self._write, destination, data).add_done_callback(self._done)
+
+    def close(self):
+        # Waits for every pending write and raises the first that failed
+        self.executor.shutdown(wait=True)
+        if self.error is not None:
+            raise self.error
@@ -0,0 +1,103 @@
+import json
+import os
+import re
+
+from collections import Counter
+from output import write_output
+from typing import Dict, Iterable, List, Tuple
+
+WORD_PATTERN = re.compile(r"\w+")
+# Shards are named after the first PREFIX_LENGTH characters of their terms
+PREFIX_LENGTH = 2
+SHARD_NAME = re.compile(r"[a-z0-9_]+")
+# A dash never appears in a shard name
+PAGES_NAME = "pages-index.json"
+# Directory of public/ the index is written to
+SEARCH_DIRECTORY = "search"
+
+class PageTerms:
+    # Words of one page, counted from its text nodes while they are converted
+    def __init__(self):
+        self.title = ""
+        self.counts:Counter = Counter()
+
+    def __repr__(self):
+        return f"PageTerms({self.title}, {len(self.counts)} terms)"
+
+    def add(self, text:str):
+        self.counts.update(WORD_PATTERN.findall(text.lower()))
+
+    def add_all(self, texts:Iterable[str]):
+        for text in texts:
+            self.add(text)
+
+def shard_name(prefix:str) -> str:
+    # Prefixes outside of ascii letters and digits are spelled in hex so
+    # every shard has a safe file name
+    if SHARD_NAME.fullmatch(prefix):
+        return prefix
+    return "u" + prefix.encode().hex()
+
+def assign_ids(keys:Iterable[str], previous:Dict[str, int]) -> Dict[str, int]:
+    # Pages keep their id across builds and new pages take the ids freed by
+    # deleted ones, so one changed page only changes the shards of its terms
+    keys = list(keys)
+    ids = {key: previous[key] for key in keys if key in previous}
+    taken = set(ids.values())
+    free = (id for id in range(len(keys) + len(taken)) if id not in taken)
+    for key in keys:
+        if key not in ids:
+            ids[key] = next(free)
+    return ids
+
+class SearchIndex:
+    def __init__(self, prefix_length:int = PREFIX_LENGTH):
+        if prefix_length < 1:
+            raise ValueError("Error: SearchIndex prefix_length must be at least 1")
+        self.prefix_length = prefix_length
+        # Url, title and term counts of every page, keyed by its id
+        self.pages:Dict[int, Tuple[str, str, Dict[str, int]]] = {}
+
+    def __repr__(self):
+        return f"SearchIndex({len(self.pages)} pages)"
+
+    def add_page(self, id:int, url:str, title:str, counts:Dict[str, int]):
+        self.pages[id] = (url, title, counts)
+
+    def documents(self) -> List[List[str]|None]:
+        # [url, title] at every id, None where a page was deleted
+        documents:List[List[str]|None] = [None] * (max(self.pages, default=-1) + 1)
+        for id, (url, title, _) in self.pages.items():
+            documents[id] = [url, title]
+        return documents
+
+    def shards(self) -> Dict[str, Dict[str, List[int]]]:
+        # Postings are flat [id, count, id, count, ...] lists ordered by id
+        shards:Dict[str, Dict[str, List[int]]] = {}
+        for id in sorted(self.pages):
+            for term, count in self.pages[id][2].items():
+                postings = shards.setdefault(shard_name(term[:self.prefix_length]), {}).setdefault(term, [])
+                postings.append(id)
+                postings.append(count)
+        return shards
+
+    def write(self, directory:str) -> Tuple[int, int]:
+        # Writes PAGES_NAME and one file per shard, leaving files whose
+        # contents did not change untouched and removing stale shards.
+        # Returns the number of files written and of files kept
+        os.makedirs(directory, exist_ok=True)
+        files = {PAGES_NAME: self.documents()}
+        files.update((f"{name}.json", terms) for name, terms in self.shards().items())
+
+        written = kept = 0
+        for name, value in files.items():
+            data = json.dumps(value, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode()
+            if write_output(os.path.join(directory, name), data):
+                written += 1
+            else:
+                kept += 1
+
+        for name in os.listdir(directory):
+            if name.endswith(".json") and name not in files:
+                os.unlink(os.path.join(directory, name))
+        return written, kept
@@ -0,0 +1,308 @@
+import json
+import mimetypes
+import os
+import queue
+import threading
+
+from generate import is_page, page_destination
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from images import scan_images
+from manifest import hash_bytes
+from template import TEMPLATE_NAME, file_version, load_template
+from typing import Dict, Iterable, List, Set, Tuple
+from urllib.parse import unquote, urlsplit
+from watch import SiteWatcher, create_watcher
+
+# Under the basepath, browsers listen here for the pages to reload
+RELOAD_PATH = "__reload"
+# Seconds between comments keeping an idle event stream open
+KEEPALIVE = 15
+# Appended to every page, reloads it when its url or any static file changed
+RELOAD_SCRIPT = (
+    "<script>new EventSource(\"{url}\").onmessage=function(event){{"
+    "var urls=JSON.parse(event.data);"
+    "if(urls.indexOf(\"*\")>=0||urls.indexOf(location.pathname)>=0)location.reload()}}</script>"
+)
+
+class Response:
+    def __init__(self, body:bytes, content_type:str, version:Tuple[int, int]|None = None):
+        self.body = body
+        self.content_type = content_type
+        # Strong validator, the same bytes always get the same tag
+        self.etag = f"\"{hash_bytes(body)}\""
+        # mtime and size of the static file the body was read from
+        self.version = version
+
+    def __repr__(self):
+        return f"Response({self.content_type}, {len(self.body)} bytes)"
+
+def etag_matches(etag:str, header:str|None) -> bool:
+    # If-None-Match compares weakly, W/ prefixes are ignored
+    if not header:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag in tags
+
+class LiveReload:
+    # One queue per open event stream, every change is put on all of them
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clients:List[queue.Queue] = []
+
+    def __repr__(self):
+        return f"LiveReload({len(self.clients)} clients)"
+
+    def subscribe(self) -> queue.Queue:
+        client = queue.Queue()
+        with self.lock:
+            self.clients.append(client)
+        return client
+
+    def unsubscribe(self, client:queue.Queue):
+        with self.lock:
+            self.clients.remove(client)
+
+    def publish(self, urls:Iterable[str]):
+        data = json.dumps(sorted(urls))
+        with self.lock:
+            for client in self.clients:
+                client.put(data)
+
+class DevSite(SiteWatcher):
+    # The site held in memory: pages are rendered when first requested and
+    # again only when their markdown, template or images change, static
+    # files are read from static/ as they are requested
+    def __init__(
+        self,
+        content:str,
+        static:str,
+        template_path:str,
+        basepath:str,
+        minify:bool = False,
+        image_hints:bool = False
+    ):
+        # Nothing is written, destination only names the page outputs
+        super().__init__(content, static, template_path, "public", basepath, minify, image_hints)
+        self.lock = threading.RLock()
+        self.reload = LiveReload()
+        # Source of every page by its output path, rendered or not
+        self.sources:Dict[str, str] = {}
+        self.outputs:Dict[str, Response] = {}
+        # Every rendered page is held in memory anyway, so its parsed
+        # variables are kept next to it rather than spilled to files
+        self.pages:Dict[str, dict] = {}
+        self.assets:Dict[str, Response] = {}
+        # Urls of the pages changed by the current batch of changes
+        self.changed:Set[str] = set()
+
+    def build(self):
+        if self.image_hints:
+            self.image_sizes = scan_images(self.static)[0]
+        templates = [self.template_path]
+        for directory, _, names in os.walk(self.content):
+            for name in names:
+                if is_page(name):
+                    source = os.path.join(directory, name)
+                    self.sources[self.output_key(source)] = source
+                elif name == TEMPLATE_NAME:
+                    templates.append(os.path.join(directory, name))
+        # Nothing is rendered yet, the templates are compiled so the
+        # partials they include are watched from the start
+        for template_path in templates:
+            try:
+                self.dependencies[template_path] = load_template(template_path, self.basepath, self.minify).dependencies
+            except (OSError, ValueError) as error:
+                print(f"Error: failed to load {template_path}: {error}")
+
+    def output_key(self, source:str) -> str:
+        path = page_destination(self.content, self.destination, source)
+        return os.path.relpath(path, self.destination).replace(os.sep, "/")
+
+    def page_urls(self, key:str) -> List[str]:
+        urls = [self.basepath + key]
+        if key == "index.html" or key.endswith("/index.html"):
+            urls.append(self.basepath + key[:-len("index.html")])
+        return urls
+
+    def write(self, source:str, variables:dict, template_path:str):
+        template = load_template(template_path, self.basepath, self.minify)
+        self.dependencies[template_path] = template.dependencies
+        self.templates[source] = template_path
+        html = "".join(template.iter_render(variables))
+        # Before the closing body tag when there is one
+        script = RELOAD_SCRIPT.format(url=self.basepath + RELOAD_PATH)
+        index = html.rfind("</body>")
+        html = html + script if index == -1 else html[:index] + script + html[index:]
+        key = self.output_key(source)
+        self.outputs[key] = Response(html.encode(), "text/html; charset=utf-8")
+        self.changed.update(self.page_urls(key))
+
+    def keep_page(self, source:str, variables:dict):
+        self.pages[source] = variables
+
+    def kept_page(self, source:str) -> dict|None:
+        return self.pages.get(source)
+
+    def forget_page(self, source:str):
+        self.pages.pop(source, None)
+
+    def update_page(self, source:str):
+        # Pages never requested wait for their first request
+        key = self.output_key(source)
+        self.sources[key] = source
+        if source in self.templates:
+            super().update_page(source)
+        else:
+            self.changed.update(self.page_urls(key))
+
+    def remove_page(self, source:str):
+        key = self.output_key(source)
+        self.sources.pop(key, None)
+        self.outputs.pop(key, None)
+        self.pages.pop(source, None)
+        self.templates.pop(source, None)
+        self.page_images.pop(source, None)
+        self.changed.update(self.page_urls(key))
+
+    def update_static(self, path:str, exists:bool):
+        self.assets.pop(os.path.relpath(path, self.static).replace(os.sep, "/"), None)
+        # Any page may use a stylesheet or script
+        self.changed.add("*")
+
+    def handle(self, changes:Set[str]):
+        with self.lock:
+            self.changed = set()
+            super().handle(changes)
+            changed = self.changed
+        if changed:
+            self.reload.publish(changed)
+
+    def static_file(self, key:str) -> Response|None:
+        path = os.path.normpath(os.path.join(self.static, *key.split("/")))
+        if not path.startswith(self.static + os.sep) or not os.path.isfile(path):
+            return None
+        version = file_version(path)
+        cached = self.assets.get(key)
+        if cached is None or cached.version != version:
+            with open(path, "rb") as file:
+                body = file.read()
+            content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            cached = self.assets[key] = Response(body, content_type, version)
+        return cached
+
+    def lookup(self, key:str) -> Response|None:
+        # key is a path under the basepath, "" or ending in "/" for an index
+        if key == "" or key.endswith("/"):
+            key += "index.html"
+        with self.lock:
+            response = self.outputs.get(key)
+            if response is not None:
+                return response
+            source = self.sources.get(key)
+            if source is not None:
+                self.render_page(source)
+                return self.outputs[key]
+            return self.static_file(key)
+
+    def is_directory(self, key:str) -> bool:
+        # Directories of pages are redirected to their url ending in "/"
+        return key + "/index.html" in self.sources
+
+class DevRequestHandler(BaseHTTPRequestHandler):
+    server:"DevServer"
+    protocol_version = "HTTP/1.1"
+
+    def do_HEAD(self):
+        self.respond(head=True)
+
+    def do_GET(self):
+        self.respond()
+
+    def respond(self, head:bool = False):
+        site = self.server.site
+        path = unquote(urlsplit(self.path).path)
+        if not path.startswith(site.basepath):
+            self.send_error(404)
+            return
+        key = path[len(site.basepath):]
+        if key == RELOAD_PATH and not head:
+            self.stream_events()
+            return
+        try:
+            response = site.lookup(key)
+        except Exception as error:
+            self.send_error(500, explain=f"Error: failed to render {path}: {error}")
+            return
+        if response is None:
+            if site.is_directory(key):
+                self.send_response(301)
+                self.send_header("Location", path + "/")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            else:
+                self.send_error(404)
+            return
+
+        if etag_matches(response.etag, self.headers.get("If-None-Match")):
+            self.send_response(304)
+            self.send_header("ETag", response.etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", response.content_type)
+        self.send_header("Content-Length", str(len(response.body)))
+        self.send_header("ETag", response.etag)
+        # Browsers revalidate every time, unchanged pages cost a 304
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        if not head:
+            self.wfile.write(response.body)
+
+    def stream_events(self):
+        # Server-sent events, each one a JSON list of the urls that changed.
+        # Subscribed before the headers go out so no change is missed
+        client = self.server.site.reload.subscribe()
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            self.close_connection = True
+            while True:
+                try:
+                    message = f"data: {client.get(timeout=KEEPALIVE)}\n\n"
+                except queue.Empty:
+                    message = ": keepalive\n\n"
+                self.wfile.write(message.encode())
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.server.site.reload.unsubscribe(client)
+
+    def log_request(self, code="-", size="-"):
+        # Only failed requests are logged
+        if str(int(code) if isinstance(code, int) else code).startswith(("4", "5")):
+            super().log_request(code, size)
+
+class DevServer(ThreadingHTTPServer):
+    # Event streams stay open, they must not keep the process alive
+    daemon_threads = True
+
+    def __init__(self, address:Tuple[str, int], site:DevSite):
+        super().__init__(address, DevRequestHandler)
+        self.site = site
+
+def serve(site:DevSite, host:str = "localhost", port:int = 8888, debounce:float = 0.1):
+    site.build()
+    server = DevServer((host, port), site)
+    watcher = create_watcher([site.content, site.static, *site.watched_files()])
+    threading.Thread(target=site.follow, args=(watcher, debounce), daemon=True).start()
+    print(f"Serving {site.content} at http://{host}:{server.server_port}{site.basepath}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        watcher.close()
@@ -1,6 +1,6 @@
 import re
 
-from extract import extract_markdown_images, extract_markdown_links
+from extract import IMAGE_PATTERN, LINK_PATTERN
 from textnode import TextNode, TextType
 from typing import List
 
@@ -45,57 +45,35 @@ def split_nodes_delimiter(old_nodes:List[TextNode], delimiter:str, text_type:Tex
     
     return new_nodes
 
-def split_nodes_image(old_nodes:List[TextNode]) -> List[TextNode]:
+def split_nodes_pattern(old_nodes:List[TextNode], pattern:re.Pattern, text_type:TextType, name:str) -> List[TextNode]:
+    # Walks the match spans left to right and slices the text between them,
+    # so each node is scanned once however many images or links it holds
     new_nodes = []
     for node in old_nodes:
         if not node:
-            raise ValueError("Error: split_nodes_image node cannot be None")
-        
-        if node.text_type != TextType.TEXT:
-            new_nodes.append(node)
-            continue
-            
-        matches = extract_markdown_images(node.text)
-        parts = [node.text]
-        
-        # Find text and images and append to new_nodes
-        for alt, url in matches:
-            parts = parts[-1].split(f"![{alt}]({url})", maxsplit=1)
-            
-            if parts[0]: # Text before the image(s)
-                new_nodes.append(TextNode(parts[0], node.text_type, node.url))
-            
-            new_nodes.append(TextNode(alt, TextType.IMAGE, url))
-        
-        if parts[-1]: # Text trailing the image(s)
-            new_nodes.append(TextNode(parts[-1], node.text_type, node.url))
-            
-    return new_nodes
+            raise ValueError(f"Error: {name} node cannot be None")
 
-def split_nodes_link(old_nodes:List[TextNode]) -> List[TextNode]:
-    new_nodes = []
-    for node in old_nodes:
-        if not node:
-            raise ValueError("Error: split_nodes_link node cannot be None")
-        
         if node.text_type != TextType.TEXT:
             new_nodes.append(node)
             continue
-            
-        matches = extract_markdown_links(node.text)
-        parts = [node.text]
-        
-        # Find text and images and append to new_nodes
-        for alt, url in matches:
-            parts = parts[-1].split(f"[{alt}]({url})", maxsplit=1)
-            
-            if parts[0]: # Text before the image(s)
-                new_nodes.append(TextNode(parts[0], node.text_type, node.url))
-            
-            new_nodes.append(TextNode(alt, TextType.LINK, url))
-        
-        if parts[-1]: # Text trailing the image(s)
-            new_nodes.append(TextNode(parts[-1], node.text_type, node.url))
-            
+
+        text = node.text
+        position = 0
+        for match in pattern.finditer(text):
+            start = match.start()
+            if position < start: # Text before the match
+                new_nodes.append(TextNode(text[position:start], node.text_type, node.url))
+
+            new_nodes.append(TextNode(match.group(1), text_type, match.group(2)))
+            position = match.end()
+
+        if position < len(text): # Text trailing the matches
+            new_nodes.append(TextNode(text[position:], node.text_type, node.url))
+
     return new_nodes
 
+def split_nodes_image(old_nodes:List[TextNode]) -> List[TextNode]:
+    return split_nodes_pattern(old_nodes, IMAGE_PATTERN, TextType.IMAGE, "split_nodes_image")
+
+def split_nodes_link(old_nodes:List[TextNode]) -> List[TextNode]:
+    return split_nodes_pattern(old_nodes, LINK_PATTERN, TextType.LINK, "split_nodes_link")
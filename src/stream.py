@@ -0,0 +1,165 @@
+import io
+import itertools
+import mmap
+import os
+
+from collections import deque
+from context import RenderContext
+from convert import block_node_to_html_node, iter_blocks
+from extract import extract_front_matter
+from fingerprint import AssetMap
+from images import PageImages
+from search import PageTerms
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+def iter_source_lines(path:str, use_mmap:bool = False) -> Iterator[str]:
+    # Lines end with "\n" like a file opened in text mode yields them
+    if use_mmap:
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if size == 0:
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                # Carriage returns need the newline translation of the text
+                # reader, so only files without them are read through the map
+                if view.find(b"\r") == -1:
+                    position = 0
+                    while position < size:
+                        end = view.find(b"\n", position)
+                        end = size if end == -1 else end + 1
+                        yield view[position:end].decode("utf-8")
+                        position = end
+                    return
+
+    with open(path) as file:
+        yield from file
+
+def _ends_front_matter(line:str) -> bool:
+    # A closing fence or a line that is not "key: value"
+    key, separator, _ = line.partition(":")
+    return line.strip() == "---" or not separator or not key.strip()
+
+def read_front_matter(lines:Iterable[str]) -> Tuple[Dict[str, str], Iterator[str]]:
+    # extract_front_matter for a stream of lines, only the lines that may
+    # belong to a front matter block at the top are buffered
+    lines = iter(lines)
+    buffered = []
+    for line in lines:
+        buffered.append(line)
+        fields = line.splitlines()
+        if len(buffered) == 1:
+            if not fields or fields[0].strip() != "---":
+                break
+            fields = fields[1:]
+        if any(_ends_front_matter(field) for field in fields):
+            break
+
+    fields, rest = extract_front_matter("".join(buffered))
+    # StringIO splits the rest on "\n" only, like the file reader does
+    return fields, itertools.chain(io.StringIO(rest), lines)
+
+class TitleScanner:
+    # Finds the title extract_markdown_title would while the lines stream
+    # past, its pattern lets the whitespace after the # run onto later lines
+    def __init__(self, lines:Iterable[str]):
+        self.lines = iter(lines)
+        self.title:str|None = None
+        self.pending = False # A "#" was followed by whitespace only so far
+
+    def __iter__(self) -> Iterator[str]:
+        for line in self.lines:
+            if self.title is None:
+                self.scan(line)
+            yield line
+        self.finish()
+
+    def finish(self):
+        # Scans the lines nobody read, the title may come after a parse error
+        for line in self.lines:
+            if self.title is not None:
+                break
+            self.scan(line)
+        if self.title is None and self.pending:
+            self.title = ""
+
+    def scan(self, line:str):
+        content = line[:-1] if line.endswith("\n") else line
+        rest = content.lstrip()
+        if self.pending:
+            if rest:
+                self.title = rest.strip()
+            return
+
+        if not rest.startswith("#"):
+            return
+        after = rest[1:]
+        if after and after[0].isspace():
+            if after.strip():
+                self.title = after.strip()
+            else:
+                self.pending = True
+        elif not after and line.endswith("\n"):
+            self.pending = True
+
+class LazyTitle:
+    # A template value that parses the page only as far as its title
+    def __init__(self, page:"PageStream"):
+        self.page = page
+
+    def __iter__(self) -> Iterator[str]:
+        yield self.page.title()
+
+class PageStream:
+    # Renders a page block by block while it is written, so memory is
+    # bounded by the largest block and whatever precedes the title
+    def __init__(self, lines:Iterable[str], context:RenderContext):
+        self.titles = TitleScanner(lines)
+        self.blocks = iter_blocks(line for physical in self.titles for line in physical.splitlines())
+        self.context = context
+        self.rendered = deque() # Chunks rendered while looking for the title
+
+    def render_next(self) -> bool:
+        block = next(self.blocks, None)
+        if block is None:
+            return False
+        self.rendered.extend(block_node_to_html_node(block, self.context).iter_html())
+        return True
+
+    def title(self) -> str:
+        try:
+            while self.titles.title is None and self.render_next():
+                pass
+        except ValueError:
+            # read_page looks for the title before parsing, so a missing
+            # title is reported over the parse error
+            self.titles.finish()
+            if self.titles.title is None:
+                raise Exception("Error: extract_markdown_title invalid h1")
+            raise
+        if self.titles.title is None:
+            raise Exception("Error: extract_markdown_title invalid h1")
+        return self.titles.title
+
+    def iter_content(self) -> Iterator[str]:
+        yield "<div>"
+        while self.rendered or self.render_next():
+            while self.rendered:
+                yield self.rendered.popleft()
+        yield "</div>"
+
+def stream_page(
+    source:str,
+    basepath:str,
+    use_mmap:bool = False,
+    links:List[str]|None = None,
+    images:PageImages|None = None,
+    terms:PageTerms|None = None,
+    assets:AssetMap|None = None
+) -> dict:
+    # The variables read_page returns, with Title and Content produced while
+    # the page is being written
+    variables, lines = read_front_matter(iter_source_lines(source, use_mmap))
+    page = PageStream(lines, RenderContext(basepath, links, images, terms, assets))
+    variables["Title"] = LazyTitle(page)
+    variables["Content"] = page.iter_content()
+    return variables
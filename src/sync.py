@@ -0,0 +1,153 @@
+import os
+import shutil
+import tempfile
+
+from concurrent.futures import ThreadPoolExecutor
+from manifest import hash_file, load_manifest, save_manifest
+from output import FILE_MODE, remove_output
+from typing import List, Tuple
+
+# Below this many copies a thread pool costs more than it saves
+PARALLEL_THRESHOLD = 16
+
+class SyncReport:
+    def __init__(self):
+        self.copied = 0
+        self.skipped = 0
+        self.removed = 0
+
+    def __repr__(self):
+        return f"SyncReport({self.copied}, {self.skipped}, {self.removed})"
+
+    def summary(self):
+        return f"Copied {self.copied} assets, skipped {self.skipped}, removed {self.removed}"
+
+def collect_files(source:str) -> List[str]:
+    files = []
+    for directory, _, names in os.walk(source, followlinks=True):
+        for name in names:
+            files.append(os.path.relpath(os.path.join(directory, name), source))
+    return sorted(files)
+
+def _copy_file_range(source_fd:int, destination_fd:int, offset:int, count:int) -> int:
+    return os.copy_file_range(source_fd, destination_fd, count, offset, offset)
+
+def _sendfile(source_fd:int, destination_fd:int, offset:int, count:int) -> int:
+    return os.sendfile(destination_fd, source_fd, offset, count)
+
+# In-kernel copies, fastest first, that skip the round trip through userspace
+KERNEL_COPIES = [
+    copy for name, copy in (("copy_file_range", _copy_file_range), ("sendfile", _sendfile))
+    if hasattr(os, name)
+]
+
+def _kernel_copy(source_fd:int, destination_fd:int, size:int) -> bool:
+    for copy in KERNEL_COPIES:
+        offset = 0
+        try:
+            while offset < size:
+                copied = copy(source_fd, destination_fd, offset, size - offset)
+                if copied == 0:
+                    break
+                offset += copied
+        except OSError:
+            # Unsupported by this filesystem or platform
+            pass
+        if offset == size:
+            return True
+        os.ftruncate(destination_fd, 0)
+        os.lseek(destination_fd, 0, os.SEEK_SET)
+    return False
+
+def copy_file(source:str, destination:str, hardlink:bool = False):
+    stat = os.stat(source)
+    # Always replace the destination instead of writing into it, it may
+    # be a hardlink to the source from an earlier sync. The temp file is
+    # hidden and unique like in write_output, so a static file named like
+    # it is never clobbered
+    fd, temp_path = tempfile.mkstemp(
+        suffix=".tmp", prefix=f".{os.path.basename(destination)}.", dir=os.path.dirname(destination) or "."
+    )
+    try:
+        if hardlink:
+            os.close(fd)
+            fd = None
+            os.unlink(temp_path)
+            try:
+                os.link(source, temp_path)
+                os.replace(temp_path, destination)
+                return
+            except OSError:
+                # Different filesystem, fall back to copying
+                pass
+
+        with open(source, "rb") as source_file, open(temp_path if fd is None else fd, "wb") as destination_file:
+            if not _kernel_copy(source_file.fileno(), destination_file.fileno(), stat.st_size):
+                shutil.copyfileobj(source_file, destination_file)
+        os.chmod(temp_path, FILE_MODE)
+        os.utime(temp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        os.replace(temp_path, destination)
+    except BaseException:
+        if os.path.lexists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+def is_unchanged(source:str, destination:str, checksum:bool) -> bool:
+    try:
+        destination_stat = os.stat(destination)
+    except FileNotFoundError:
+        return False
+
+    source_stat = os.stat(source)
+    if source_stat.st_size != destination_stat.st_size:
+        return False
+    if checksum:
+        return hash_file(source) == hash_file(destination)
+    return source_stat.st_mtime_ns == destination_stat.st_mtime_ns
+
+def sync_contents(
+    source:str,
+    destination:str,
+    checksum:bool = False,
+    hardlink:bool = False,
+    workers:int|None = None
+) -> SyncReport:
+    if not os.path.exists(source):
+        os.mkdir(source)
+    os.makedirs(destination, exist_ok=True)
+
+    manifest = load_manifest(destination)
+    previous = manifest.get("static", [])
+    report = SyncReport()
+
+    files = collect_files(source)
+    pending:List[Tuple[str, str]] = []
+    for item in files:
+        source_path = os.path.join(source, item)
+        destination_path = os.path.join(destination, item)
+        if is_unchanged(source_path, destination_path, checksum):
+            report.skipped += 1
+            continue
+        os.makedirs(os.path.dirname(destination_path), exist_ok=True)
+        pending.append((source_path, destination_path))
+
+    if len(pending) >= PARALLEL_THRESHOLD and workers != 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # list() so the first failed copy is raised here
+            list(executor.map(lambda paths: copy_file(*paths, hardlink), pending))
+    else:
+        for source_path, destination_path in pending:
+            copy_file(source_path, destination_path, hardlink)
+    report.copied = len(pending)
+
+    # Only files an earlier sync copied are removed, generated pages and
+    # anything else in destination are left alone
+    current = set(files)
+    for item in previous:
+        if item not in current:
+            remove_output(destination, os.path.join(destination, item))
+            report.removed += 1
+
+    manifest["static"] = files
+    save_manifest(destination, manifest)
+    return report
@@ -0,0 +1,169 @@
+import os
+import re
+
+from fingerprint import AssetMap
+from htmlnode import escape_attribute
+from minify import minify_html
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+SLOT_PATTERN = re.compile(r"\{\{\s*([A-Za-z_][\w.-]*)\s*\}\}")
+INCLUDE_PATTERN = re.compile(r"\{\{>\s*([^\s{}]+)\s*\}\}")
+# A template with this name in a content directory is used for the pages in
+# that directory and below, instead of the site template
+TEMPLATE_NAME = "_template.html"
+# The only variable holding html, every other value is escaped as it is
+# filled in, so a title or front matter value can sit in text or an attribute
+CONTENT = "Content"
+
+class Template:
+    def __init__(self, parts:List[str], slots:List[Tuple[int, str]], dependencies:List[str]|None = None):
+        # parts holds the literal segments with the placeholder text at every
+        # slot index, so unknown variables render exactly as written
+        self.parts = parts
+        self.slots = slots
+        # Absolute paths of the template file and every partial it includes
+        self.dependencies = dependencies or []
+
+    def __repr__(self):
+        return f"Template({self.parts}, {self.slots})"
+
+    @property
+    def variables(self) -> List[str]:
+        return [name for _, name in self.slots]
+
+    def render(self, values:Dict[str, str]) -> str:
+        parts = self.parts.copy()
+        for index, name in self.slots:
+            value = values.get(name)
+            if value is not None:
+                parts[index] = value if name == CONTENT else escape_attribute(value)
+        return "".join(parts)
+
+    def iter_render(self, values:Dict[str, str|Iterable[str]]) -> Iterator[str]:
+        # Values may be iterables of chunks, such as HTMLNode.iter_html(),
+        # which are streamed through without being joined first
+        parts = self.parts
+        position = 0
+        for index, name in self.slots:
+            yield from parts[position:index]
+            value = values.get(name)
+            if value is None:
+                yield parts[index]
+            elif isinstance(value, str):
+                yield value if name == CONTENT else escape_attribute(value)
+            elif name == CONTENT:
+                yield from value
+            else:
+                yield from map(escape_attribute, value)
+            position = index + 1
+        yield from parts[position:]
+
+def rewrite_basepath(text:str, basepath:str) -> str:
+    if basepath == "/":
+        return text
+    text = text.replace("href=\"/", f"href=\"{basepath}")
+    return text.replace("src=\"/", f"src=\"{basepath}")
+
+def compile_template(text:str, basepath:str = "/", minify:bool = False, assets:AssetMap|None = None) -> Template:
+    if assets is not None:
+        # Static files are referenced by their fingerprinted names, looked
+        # up by the site-absolute urls written in the template
+        text = assets.rewrite(text)
+    if minify:
+        # Quotes are dropped by the minifier, so the basepath goes in first
+        text = minify_html(rewrite_basepath(text, basepath))
+        basepath = "/"
+    parts = []
+    slots = []
+    position = 0
+    for match in SLOT_PATTERN.finditer(text):
+        parts.append(rewrite_basepath(text[position:match.start()], basepath))
+        slots.append((len(parts), match.group(1)))
+        parts.append(match.group(0))
+        position = match.end()
+    parts.append(rewrite_basepath(text[position:], basepath))
+    return Template(parts, slots)
+
+def read_file(path:str) -> str:
+    with open(path) as file:
+        return file.read()
+
+def expand_includes(
+    path:str,
+    including:Tuple[str, ...] = (),
+    read:Callable[[str], str] = read_file,
+    exists:Callable[[str], bool] = os.path.isfile
+) -> Tuple[str, List[str]]:
+    # Replaces every {{> partial }} with the text of the partial, resolved
+    # against the directory of the file including it. Returns the text and
+    # the absolute paths of every file read, the template itself first.
+    # read and exists stand in for the filesystem when templates are in memory
+    path = os.path.abspath(path)
+    if path in including:
+        raise ValueError(f"Error: expand_includes include cycle through {path}")
+    text = read(path)
+
+    parts = []
+    dependencies = {path: None}
+    position = 0
+    for match in INCLUDE_PATTERN.finditer(text):
+        partial = os.path.join(os.path.dirname(path), match.group(1))
+        if not exists(partial):
+            raise FileNotFoundError(f"Error: expand_includes partial {match.group(1)} not found from {path}")
+        partial_text, partial_dependencies = expand_includes(partial, including + (path,), read, exists)
+        parts.append(text[position:match.start()])
+        parts.append(partial_text)
+        dependencies.update(dict.fromkeys(partial_dependencies))
+        position = match.end()
+    parts.append(text[position:])
+    return "".join(parts), list(dependencies)
+
+def find_template(
+    directory:str,
+    root:str,
+    default:str,
+    found:Dict[str, str]|None = None,
+    exists:Callable[[str], bool] = os.path.isfile
+) -> str:
+    # The nearest TEMPLATE_NAME from directory up to root, default when
+    # there is none. found caches the answer for every directory visited
+    if found is None:
+        found = {}
+    template = found.get(directory)
+    if template is not None:
+        return template
+
+    candidate = os.path.join(directory, TEMPLATE_NAME)
+    parent = os.path.dirname(directory)
+    if exists(candidate):
+        template = candidate
+    elif os.path.normpath(directory) == os.path.normpath(root) or parent == directory:
+        template = default
+    else:
+        template = find_template(parent, root, default, found, exists)
+    found[directory] = template
+    return template
+
+def file_version(path:str) -> Tuple[int, int]|None:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+_cache:Dict[Tuple[str, str, bool, str|None], Tuple[List[Tuple[int, int]|None], Template]] = {}
+
+def load_template(path:str, basepath:str = "/", minify:bool = False, assets:AssetMap|None = None) -> Template:
+    # Compiled once per process and recompiled only when the file or one
+    # of its partials changes
+    key = (os.path.abspath(path), basepath, minify, assets.version if assets else None)
+    cached = _cache.get(key)
+    if cached and cached[0] == [file_version(dependency) for dependency in cached[1].dependencies]:
+        return cached[1]
+
+    text, dependencies = expand_includes(path)
+    versions = [file_version(dependency) for dependency in dependencies]
+    template = compile_template(text, basepath, minify, assets)
+    template.dependencies = dependencies
+    _cache[key] = (versions, template)
+    return template
@@ -0,0 +1,43 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from benchmark.corpus import CorpusGenerator
+from benchmark.suite import compare, run_suite
+from convert import markdown_to_html_node
+
+class TestCorpusGenerator(unittest.TestCase):
+    def test_pages_are_reproducible(self):
+        self.assertEqual(CorpusGenerator(3).page(7), CorpusGenerator(3).page(7))
+        self.assertNotEqual(CorpusGenerator(3).page(7), CorpusGenerator(4).page(7))
+
+    def test_pages_parse(self):
+        generator = CorpusGenerator(inline={"bold": 0.1, "italic": 0.1, "code": 0.1, "link": 0.1, "image": 0.1})
+        for index in range(20):
+            markdown_to_html_node(generator.page(index)).to_html()
+
+    def test_block_mix(self):
+        page = CorpusGenerator(blocks={"code": 1}, blocks_per_page=3).page(0)
+        self.assertEqual(page.count("```"), 6)
+
+    def test_pathological_page_size(self):
+        self.assertGreaterEqual(len(CorpusGenerator().pathological_page(50000)), 50000)
+
+class TestSuite(unittest.TestCase):
+    def test_run_and_compare(self):
+        with tempfile.TemporaryDirectory() as root:
+            generator = CorpusGenerator(blocks_per_page=5)
+            self.assertTrue(generator.ensure(root, 3))
+            self.assertFalse(generator.ensure(root, 3))
+            results = run_suite(root, repeat=1)
+            self.assertTrue(os.path.exists(os.path.join(root, "public", "section0", "group0", "page0.html")))
+
+        slower = {"stages": {stage: {"best": timing["best"] * 2} for stage, timing in results["stages"].items()}}
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(compare(results, results, 0.1), [])
+            self.assertEqual(len(compare(slower, results, 0.1)), len(results["stages"]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -20,5 +20,10 @@ class TestBlockNode(unittest.TestCase):
             self.assertEqual(block.block_type, btype)
             self.assertIn(btype.name, block.text)
 
+    def test_text_from_lines(self):
+        block = BlockNode(None, BlockType.PARAGRAPH, lines=["  first", "second  "])
+        self.assertEqual(block.text, "first\nsecond")
+        self.assertIsNone(block.items)
+
 if __name__ == "__main__":
     unittest.main()
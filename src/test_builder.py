@@ -0,0 +1,126 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from builder import build_site, write_site
+from generate import generate_pages_recursive
+from links import LinkIndex
+from search import SearchIndex
+from sync import collect_files
+
+GIF = b"GIF89a\x10\x00\x08\x00"
+
+SOURCES = {
+    "template.html": "<title>{{ Title }}</title><link href=\"/index.css\">{{ Content }}",
+    "content/index.md": "# Home\n\n![a](/images/a.gif) [post](blog/post.md)",
+    "content/blog/post.md": "---\nauthor: Elrond\n---\n# Post\n\nBy the river",
+    "content/blog/_template.html": "{{> ../../partials/header.html }}<p>{{ author }}</p>{{> partials/footer.html }}{{ Content }}",
+    "content/blog/partials/footer.html": "<footer></footer>",
+    "partials/header.html": "<header>{{ Title }}</header>",
+    "static/index.css": "body {}",
+    "static/images/a.gif": GIF,
+}
+
+class TestBuildSite(unittest.TestCase):
+    def test_builds_from_mapping(self):
+        files = build_site(SOURCES, "/base/")
+        self.assertEqual(sorted(files), ["blog/post.html", "images/a.gif", "index.css", "index.html"])
+        self.assertEqual(files["images/a.gif"], GIF)
+        self.assertEqual(
+            files["index.html"],
+            b"<title>Home</title><link href=\"/base/index.css\"><div><h1>Home</h1><p>"
+            b"<img src=\"/base/images/a.gif\" alt=\"a\" width=\"16\" height=\"8\"> <a href=\"blog/post.html\">post</a></p></div>"
+        )
+        self.assertEqual(files["blog/post.html"], b"<header>Post</header><p>Elrond</p><footer></footer><div><h1>Post</h1><p>By the river</p></div>")
+
+    def test_fingerprint_links_and_search(self):
+        links = LinkIndex()
+        search = SearchIndex()
+        files = build_site(SOURCES, fingerprint=True, links=links, search=search)
+        css = [name for name in files if name.startswith("index.") and name != "index.html" and name != "index.css"]
+        self.assertEqual(len(css), 1)
+        self.assertIn(f"href=\"/{css[0]}\"".encode(), files["index.html"])
+        self.assertIn(b"\"index.css\"", files["assets.json"])
+        self.assertEqual(links.broken(), [])
+        self.assertEqual(
+            sorted(page[:2] for page in search.pages.values()),
+            [("/blog/post.html", "Post"), ("/index.html", "Home")]
+        )
+
+    def test_missing_template(self):
+        with self.assertRaises(FileNotFoundError):
+            build_site({"content/index.md": "# Home"})
+        # A partial missing from the mapping
+        sources = dict(SOURCES)
+        del sources["partials/header.html"]
+        with self.assertRaises(FileNotFoundError):
+            build_site(sources)
+
+class TestBuildSiteDirectory(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.root = self.temp.name
+        for key, data in SOURCES.items():
+            path = os.path.join(self.root, *key.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as file:
+                file.write(data.encode() if isinstance(data, str) else data)
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def read_tree(self, root):
+        files = {}
+        for item in collect_files(root):
+            with open(os.path.join(root, item), "rb") as file:
+                files[item.replace(os.sep, "/")] = file.read()
+        return files
+
+    def test_matches_build_on_disk(self):
+        files = build_site(self.root, "/base/")
+        public = os.path.join(self.root, "public")
+        write_site(self.read_tree(os.path.join(self.root, "static")), public)
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursive(
+                os.path.join(self.root, "content"), os.path.join(self.root, "template.html"), public, "/base/",
+                image_hints=True
+            )
+        expected = self.read_tree(public)
+        expected.pop(".manifest.json")
+        self.assertEqual(files, expected)
+
+    def test_write_site(self):
+        public = os.path.join(self.root, "public")
+        report = write_site(build_site(self.root), public)
+        self.assertEqual((report.written, report.kept, report.removed), (4, 0, 0))
+        with open(os.path.join(public, "blog", "stale.html"), "w") as file:
+            file.write("old")
+
+        with open(os.path.join(self.root, "content", "index.md"), "w") as file:
+            file.write("# Home\n\nEdited")
+        report = write_site(build_site(self.root), public)
+        self.assertEqual((report.written, report.kept, report.removed), (1, 3, 1))
+        self.assertFalse(os.path.exists(os.path.join(public, "blog", "stale.html")))
+
+    def test_write_site_keeps_later_outputs(self):
+        public = os.path.join(self.root, "public")
+        files = build_site(self.root)
+        write_site(files, public)
+        kept = [".manifest.json", "index.html.gz", "index.html.br", "search/pages-index.json", "search/ho.json"]
+        removed = ["blog/stale.html.gz", "index.html.zip"]
+        os.makedirs(os.path.join(public, "search"))
+        for key in kept + removed:
+            with open(os.path.join(public, *key.split("/")), "w") as file:
+                file.write("later")
+
+        report = write_site(files, public)
+        self.assertEqual((report.written, report.kept, report.removed), (0, 4, 2))
+        for key in kept:
+            self.assertTrue(os.path.exists(os.path.join(public, *key.split("/"))), key)
+        for key in removed:
+            self.assertFalse(os.path.exists(os.path.join(public, *key.split("/"))), key)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import time
+import unittest
+
+import convert
+
+from convert import markdown_to_blocks, markdown_to_html_node, text_to_text_nodes
+from split import split_nodes_delimiter, split_nodes_image, split_nodes_link
+from textnode import TextNode, TextType
+
+# Inputs are timed at SIZE and at GROWTH times SIZE. Linear work grows the
+# time by about GROWTH, quadratic work by GROWTH squared, so a bound of a
+# few times GROWTH fails quadratic work while leaving room for timer noise
+SIZE = 500
+GROWTH = 16
+SLACK = 2
+
+def best_time(function, argument, repeat:int = 3) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            function(argument)
+        except ValueError:
+            # Unclosed delimiters raise, reaching the error must be linear too
+            pass
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def text_node(text):
+    return [TextNode(text, TextType.TEXT)]
+
+# Adversarial inputs, each repeats a unit of text n times
+ADVERSARIAL = {
+    "many links": lambda n: "see [link](/page) and " * n,
+    "many images": lambda n: "an ![alt](/image.png) too " * n,
+    "links and images": lambda n: "[a](/a)![b](/b.png)" * n,
+    "unclosed brackets": lambda n: "[" * (n * 8),
+    "unclosed bracket text": lambda n: "[word " * n,
+    "unclosed parens": lambda n: "[a](" * (n * 2),
+    "unclosed image": lambda n: "![alt](/x " * n,
+    "bracket before long text": lambda n: "[" + "word " * n,
+    "repeated bold": lambda n: "**a**" * n,
+    "repeated italic": lambda n: "_a_ " * n,
+    "repeated code": lambda n: "`a` " * n,
+    "unclosed bold": lambda n: "**" + "word " * n,
+    "unclosed italic": lambda n: "_a_ " * n + "_",
+    "delimiters inside links": lambda n: "[a_b](/u) " * n,
+}
+
+class LinearTestCase(unittest.TestCase):
+    def assertLinear(self, function, make_input, size:int = SIZE, attempts:int = 3):
+        small_input = make_input(size)
+        large_input = make_input(size * GROWTH)
+        for _ in range(attempts):
+            small = best_time(function, small_input)
+            large = best_time(function, large_input)
+            # Clamp tiny timings, a run below the timer's resolution says nothing
+            ratio = large / max(small, 1e-4)
+            if ratio < GROWTH * SLACK:
+                return
+            # A busy machine can slow either run, quadratic work fails every attempt
+        self.fail(f"{GROWTH}x the input took {ratio:.1f}x the time")
+
+class TestSplitComplexity(LinearTestCase):
+    def test_split_nodes_link(self):
+        for name, make_input in ADVERSARIAL.items():
+            with self.subTest(name):
+                self.assertLinear(lambda text: split_nodes_link(text_node(text)), make_input)
+
+    def test_split_nodes_image(self):
+        for name, make_input in ADVERSARIAL.items():
+            with self.subTest(name):
+                self.assertLinear(lambda text: split_nodes_image(text_node(text)), make_input)
+
+    def test_split_nodes_delimiter(self):
+        for name, make_input in ADVERSARIAL.items():
+            with self.subTest(name):
+                self.assertLinear(lambda text: split_nodes_delimiter(text_node(text), "**", TextType.BOLD), make_input)
+
+class TestInlineComplexity(LinearTestCase):
+    def test_text_to_text_nodes(self):
+        for single_pass in (True, False):
+            previous = convert.SINGLE_PASS_INLINE
+            convert.SINGLE_PASS_INLINE = single_pass
+            try:
+                for name, make_input in ADVERSARIAL.items():
+                    with self.subTest(name, single_pass=single_pass):
+                        self.assertLinear(text_to_text_nodes, make_input)
+            finally:
+                convert.SINGLE_PASS_INLINE = previous
+
+class TestMarkdownComplexity(LinearTestCase):
+    def test_megabyte_line(self):
+        # The larger input is a single line of about 1.2MB
+        line = lambda n: "A line with **bold**, _italic_, `code`, [a link](/a) and ![an image](/i.png). " * n
+        self.assertLinear(lambda text: markdown_to_html_node(text).to_html(), line, 1000)
+
+    def test_many_blocks(self):
+        blocks = lambda n: "# Heading\n\nSome text\n\n- item\n- item\n\n> quote\n\n```\ncode\n```\n\n" * n
+        self.assertLinear(markdown_to_blocks, blocks)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from unittest import mock
+
+import compress
+
+from compress import PARALLEL_THRESHOLD, compress_outputs
+from manifest import load_manifest
+
+class TestCompressOutputs(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.public = self.temp.name
+        self.write("index.html", "<p>home</p>" * 100)
+        self.write("blog/post.html", "<p>post</p>")
+        self.write("index.css", "body {}")
+        self.write("images/a.png", "png bytes")
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def write(self, path, text):
+        path = os.path.join(self.public, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(text)
+        return path
+
+    def counts(self, report):
+        return (report.compressed, report.skipped, report.removed)
+
+    def test_sidecars_for_text_outputs(self):
+        report = compress_outputs(self.public)
+        self.assertEqual(self.counts(report), (3, 0, 0))
+        with gzip.open(os.path.join(self.public, "index.html.gz"), "rt") as file:
+            self.assertEqual(file.read(), "<p>home</p>" * 100)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "images", "a.png.gz")))
+        self.assertIn(os.path.join("blog", "post.html"), load_manifest(self.public)["compressed"])
+
+    def test_sidecars_are_reproducible(self):
+        compress_outputs(self.public)
+        with open(os.path.join(self.public, "index.css.gz"), "rb") as file:
+            first = file.read()
+        os.unlink(os.path.join(self.public, "index.css.gz"))
+        compress_outputs(self.public)
+        with open(os.path.join(self.public, "index.css.gz"), "rb") as file:
+            self.assertEqual(file.read(), first)
+
+    def test_unchanged_outputs_are_skipped(self):
+        compress_outputs(self.public)
+        self.write("index.css", "p {}")
+        report = compress_outputs(self.public)
+        self.assertEqual(self.counts(report), (1, 2, 0))
+        with gzip.open(os.path.join(self.public, "index.css.gz"), "rt") as file:
+            self.assertEqual(file.read(), "p {}")
+
+    def test_changed_level_recompresses(self):
+        compress_outputs(self.public)
+        self.assertEqual(compress_outputs(self.public, gzip_level=1).compressed, 3)
+
+    def test_removed_output_removes_sidecars(self):
+        compress_outputs(self.public)
+        os.unlink(os.path.join(self.public, "blog", "post.html"))
+        report = compress_outputs(self.public)
+        self.assertEqual(self.counts(report), (0, 2, 1))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog")))
+
+    def test_brotli_when_installed(self):
+        brotli = mock.Mock()
+        brotli.compress.side_effect = lambda data, quality: b"br" + data
+        with mock.patch.object(compress, "brotli", brotli):
+            compress_outputs(self.public, brotli_level=5)
+        with open(os.path.join(self.public, "index.css.br"), "rb") as file:
+            self.assertEqual(file.read(), b"brbody {}")
+        brotli.compress.assert_any_call(b"body {}", quality=5)
+
+        with mock.patch.object(compress, "brotli", None):
+            report = compress_outputs(self.public)
+        self.assertEqual(report.compressed, 3)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "index.css.br")))
+
+    def test_parallel_matches_serial(self):
+        for index in range(PARALLEL_THRESHOLD):
+            self.write(f"pages/{index}.html", f"<p>{index}</p>")
+        compress_outputs(self.public, workers=4)
+        with gzip.open(os.path.join(self.public, "pages", "7.html.gz"), "rt") as file:
+            self.assertEqual(file.read(), "<p>7</p>")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,9 @@
 import unittest
 
+import convert
+
 from blocknode import BlockNode, BlockType
+from context import RenderContext
 from convert import text_node_to_html_node, text_to_text_nodes, markdown_to_html_node, block_node_to_html_node, markdown_to_blocks
 from htmlnode import HTMLNode
 from leafnode import LeafNode
@@ -50,6 +53,15 @@ class TestTextNodeToHTMLNode(unittest.TestCase):
         self.assertEqual(html_node.props, {'src': 'https://www.boot.dev', 'alt': 'This is a image node'})
         self.assertEqual(html_node.to_html(), "<img src=\"https://www.boot.dev\" alt=\"This is a image node\">")
 
+    def test_basepath_context(self):
+        context = RenderContext("/repo/")
+        link = text_node_to_html_node(TextNode("home", TextType.LINK, url="/blog"), context)
+        image = text_node_to_html_node(TextNode("alt", TextType.IMAGE, url="/images/a.png"), context)
+        external = text_node_to_html_node(TextNode("boot", TextType.LINK, url="https://boot.dev"), context)
+        self.assertEqual(link.props, {"href": "/repo/blog"})
+        self.assertEqual(image.props, {"src": "/repo/images/a.png", "alt": "alt"})
+        self.assertEqual(external.props, {"href": "https://boot.dev"})
+
 
 class TestTextToTextNodes(unittest.TestCase):
     def test_text_to_text_nodes_full_pipeline(self):
@@ -172,6 +184,14 @@ class TestTextToTextNodes(unittest.TestCase):
         with self.assertRaises(ValueError):
             text_to_text_nodes(text)
 
+class TestTextToTextNodesAlternateParser(TestTextToTextNodes):
+    def setUp(self):
+        self.single_pass = convert.SINGLE_PASS_INLINE
+        convert.SINGLE_PASS_INLINE = not self.single_pass
+
+    def tearDown(self):
+        convert.SINGLE_PASS_INLINE = self.single_pass
+
 class TestBlockNodeToHTMLNode(unittest.TestCase):
     def test_paragraph(self):
         node = BlockNode("This is a paragraph.", BlockType.PARAGRAPH)
@@ -355,8 +375,40 @@ class TestMarkdownToBlocks(unittest.TestCase):
         self.assertEqual(blocks[0].block_type, BlockType.PARAGRAPH)
         self.assertIn("> 'This is inline quote style'", blocks[0].text)
 
+    def test_list_items_are_pre_split(self):
+        blocks = markdown_to_blocks("- Item 1\n  *  Item 2\n+ Item 3\n\n1. First\n10.\tTenth")
+        self.assertEqual(blocks[0].items, ["Item 1", "Item 2", "Item 3"])
+        self.assertEqual(blocks[1].items, ["First", "Tenth"])
+
+    def test_quote_items_are_pre_split(self):
+        blocks = markdown_to_blocks("  > First\n>\n>> Second  ")
+        self.assertEqual(blocks[0].items, ["First", "Second"])
+        self.assertEqual(blocks[0].text, "> First\n>\n>> Second")
+
+    def test_markers_need_whitespace(self):
+        blocks = markdown_to_blocks("#hashtag\n\n-dash\n\n1.5 million")
+        self.assertEqual([block.block_type for block in blocks], [BlockType.PARAGRAPH] * 3)
+
+    def test_pre_split_items_match_text(self):
+        # Blocks built from text alone render the same as scanned blocks
+        md = "- a **b**\n- c\n\n> d\n> e\n\n1. f\n2. [g](/g)"
+        for block in markdown_to_blocks(md):
+            rebuilt = BlockNode(block.text, block.block_type)
+            self.assertEqual(
+                block_node_to_html_node(block).to_html(),
+                block_node_to_html_node(rebuilt).to_html()
+            )
+
 
 class TestMarkdownToHTMLNode(unittest.TestCase):
+    def test_special_characters_escaped(self):
+        markdown = "[< Back](/?a=1&b=2) and ![a \"b\"](/c.png) x < y\n\n```\nif a < b && c > d:\n```\n\n> 1 < 2"
+        self.assertEqual(
+            markdown_to_html_node(markdown).to_html(),
+            "<div><p><a href=\"/?a=1&amp;b=2\">&lt; Back</a> and <img src=\"/c.png\" alt=\"a &quot;b&quot;\"> x &lt; y</p>"
+            "<pre><code>\nif a &lt; b &amp;&amp; c &gt; d:\n</code></pre><blockquote>1 &lt; 2</blockquote></div>"
+        )
+
     def test_all_types(self):
         markdown = """
         # Heading 1
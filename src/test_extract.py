@@ -1,6 +1,6 @@
 import unittest
 
-from extract import extract_markdown_images, extract_markdown_links, extract_markdown_title
+from extract import extract_front_matter, extract_markdown_images, extract_markdown_links, extract_markdown_title
 
 
 class TestExtractMarkdownImages(unittest.TestCase):
@@ -83,5 +83,20 @@ class TestExtractMarkdownTitle(unittest.TestCase):
         text = "# Windows Title\r\nSome text"
         self.assertEqual(extract_markdown_title(text), "Windows Title")
 
+class TestExtractFrontMatter(unittest.TestCase):
+    def test_fields(self):
+        text = "---\ndate: 2024-01-01\nauthor: \"Elrond\"\n---\n# Title\n"
+        fields, body = extract_front_matter(text)
+        self.assertEqual(fields, {"date": "2024-01-01", "author": "Elrond"})
+        self.assertEqual(body, "# Title\n")
+
+    def test_no_front_matter(self):
+        text = "# Title\n\n---\n"
+        self.assertEqual(extract_front_matter(text), ({}, text))
+
+    def test_unclosed_front_matter(self):
+        text = "---\ndate: 2024-01-01\n# Title"
+        self.assertEqual(extract_front_matter(text), ({}, text))
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
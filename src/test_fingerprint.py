@@ -0,0 +1,79 @@
+import os
+import tempfile
+import unittest
+
+from unittest import mock
+
+import fingerprint
+
+from fingerprint import ASSET_MAP_NAME, AssetMap, fingerprint_assets, fingerprint_name
+from manifest import hash_bytes
+
+class TestAssetMap(unittest.TestCase):
+    def setUp(self):
+        self.assets = AssetMap({"index.css": "index.0123abcd.css", "images/a b.png": "images/a b.4567ef01.png"})
+
+    def test_fingerprint_name(self):
+        self.assertEqual(fingerprint_name("index.css", "3f9a1c2b77"), "index.3f9a1c2b.css")
+        self.assertEqual(fingerprint_name("fonts/LICENSE", "3f9a1c2b77"), "fonts/LICENSE.3f9a1c2b")
+
+    def test_resolve(self):
+        self.assertEqual(self.assets.resolve("/index.css"), "/index.0123abcd.css")
+        self.assertEqual(self.assets.resolve("/index.css?v=2#top"), "/index.0123abcd.css?v=2#top")
+        self.assertEqual(self.assets.resolve("/images/a b.png"), "/images/a b.4567ef01.png")
+        self.assertEqual(self.assets.resolve("/missing.css"), "/missing.css")
+        self.assertEqual(self.assets.resolve("index.css"), "index.css")
+        self.assertEqual(self.assets.resolve("//cdn.example.com/index.css"), "//cdn.example.com/index.css")
+
+    def test_rewrite(self):
+        self.assertEqual(
+            self.assets.rewrite("<link href=\"/index.css\"><a href=\"/\">home</a><img src=\"{{ Image }}\">"),
+            "<link href=\"/index.0123abcd.css\"><a href=\"/\">home</a><img src=\"{{ Image }}\">"
+        )
+
+    def test_version_follows_mapping(self):
+        self.assertEqual(self.assets.version, AssetMap(dict(self.assets.paths)).version)
+        self.assertNotEqual(self.assets.version, AssetMap({"index.css": "index.89abcdef.css"}).version)
+
+class TestFingerprintAssets(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.temp.name, "static")
+        self.public = os.path.join(self.temp.name, "public")
+        self.write("index.css", b"body {}")
+        self.write("images/a.png", b"png")
+        self.write(".DS_Store", b"")
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def write(self, path, data):
+        path = os.path.join(self.static, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as file:
+            file.write(data)
+
+    def read(self, path):
+        with open(os.path.join(self.public, path), "rb") as file:
+            return file.read()
+
+    def test_copies_under_hashed_names(self):
+        assets = fingerprint_assets(self.static, self.public)
+        css = fingerprint_name("index.css", hash_bytes(b"body {}"))
+        self.assertEqual(assets.paths, {"index.css": css, "images/a.png": fingerprint_name("images/a.png", hash_bytes(b"png"))})
+        self.assertEqual(self.read(css), b"body {}")
+        self.assertEqual(self.read("images/" + os.path.basename(assets.paths["images/a.png"])), b"png")
+        self.assertIn(b"\"index.css\": \"" + css.encode(), self.read(ASSET_MAP_NAME))
+
+    def test_hashes_only_changed_files_and_removes_old_copies(self):
+        old = fingerprint_assets(self.static, self.public).paths["index.css"]
+        self.write("index.css", b"body { margin: 0 }")
+        with mock.patch("fingerprint.hash_file", wraps=fingerprint.hash_file) as hasher:
+            new = fingerprint_assets(self.static, self.public).paths["index.css"]
+        self.assertEqual([call.args[0] for call in hasher.call_args_list], [os.path.join(self.static, "index.css")])
+        self.assertNotEqual(new, old)
+        self.assertEqual(self.read(new), b"body { margin: 0 }")
+        self.assertFalse(os.path.exists(os.path.join(self.public, old)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,328 @@
+import contextlib
+import io
+import os
+import tempfile
+import time
+import unittest
+
+from fingerprint import AssetMap
+from generate import call_with_timeout, generate_pages_recursive
+from images import image_size
+from links import LinkIndex
+from manifest import load_manifest
+from search import SearchIndex
+from stream import stream_page
+from timing import STAGES, BuildProfile
+from unittest import mock
+
+TEMPLATE = "<title>{{ Title }}</title><a href=\"/\">home</a>{{ Content }}"
+
+class TestGeneratePagesIncremental(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.root = self.temp.name
+        self.content = os.path.join(self.root, "content")
+        self.public = os.path.join(self.root, "public")
+        self.template = os.path.join(self.root, "template.html")
+        self.write("template.html", TEMPLATE)
+        self.write("content/index.md", "# Home\n\nWelcome")
+        self.write("content/blog/post/index.md", "# Post\n\nSome **bold** text")
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def write(self, path, text):
+        path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(text)
+
+    def build(self, basepath="/", incremental=True):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return generate_pages_recursive(self.content, self.template, self.public, basepath, incremental)
+
+    def test_first_build_rebuilds_everything(self):
+        report = self.build()
+        self.assertEqual((report.rebuilt, report.skipped, report.deleted), (2, 0, 0))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "index.html")))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "blog", "post", "index.html")))
+        self.assertIn("index.md", load_manifest(self.public)["pages"])
+
+    def test_unchanged_pages_are_skipped(self):
+        self.build()
+        report = self.build()
+        self.assertEqual((report.rebuilt, report.skipped, report.deleted), (0, 2, 0))
+
+    def test_changed_markdown_rebuilds_page(self):
+        self.build()
+        self.write("content/index.md", "# Home\n\nWelcome back")
+        report = self.build()
+        self.assertEqual((report.rebuilt, report.skipped, report.deleted), (1, 1, 0))
+        with open(os.path.join(self.public, "index.html")) as file:
+            self.assertIn("Welcome back", file.read())
+
+    def test_changed_template_or_basepath_rebuilds_all(self):
+        self.build()
+        self.write("template.html", TEMPLATE + "<footer></footer>")
+        self.assertEqual(self.build().rebuilt, 2)
+        self.assertEqual(self.build(basepath="/repo/").rebuilt, 2)
+
+    def test_changed_partial_rebuilds_only_dependent_pages(self):
+        self.write("template.html", "{{> nav.html }}" + TEMPLATE)
+        self.write("nav.html", "<nav></nav>")
+        self.write("content/blog/_template.html", "{{> ../../blog.html }}{{ Content }}")
+        self.write("blog.html", "<aside></aside>")
+        self.assertEqual(self.build().rebuilt, 2)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog", "_template.html")))
+        with open(os.path.join(self.public, "blog", "post", "index.html")) as file:
+            self.assertTrue(file.read().startswith("<aside></aside><div>"))
+
+        self.write("nav.html", "<nav>home</nav>")
+        report = self.build()
+        self.assertEqual((report.rebuilt, report.skipped), (1, 1))
+        with open(os.path.join(self.public, "index.html")) as file:
+            self.assertTrue(file.read().startswith("<nav>home</nav>"))
+
+        self.write("blog.html", "<aside>blog</aside>")
+        report = self.build()
+        self.assertEqual((report.rebuilt, report.skipped), (1, 1))
+        self.assertEqual(
+            load_manifest(self.public)["pages"][os.path.join("blog", "post", "index.md")]["templates"].keys(),
+            {os.path.join("content", "blog", "_template.html"), "blog.html"}
+        )
+
+    def test_partials_under_content_are_not_pages(self):
+        self.write("content/blog/_template.html", "{{> partials/header.html }}{{ Content }}")
+        self.write("content/blog/partials/header.html", "<header>{{ Title }}</header>")
+        self.write("content/blog/notes.txt", "not markdown")
+        self.write("content/blog/draft.markdown", "# Draft\n\nText")
+        self.assertEqual(self.build().rebuilt, 3)
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog", "partials")))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog", "notes.html")))
+        with open(os.path.join(self.public, "blog", "draft.html")) as file:
+            self.assertTrue(file.read().startswith("<header>Draft</header>"))
+
+    def test_variables_other_than_content_are_escaped(self):
+        self.write("template.html", "<title>{{ Title }}</title><meta content=\"{{ author }}\">{{ Content }}")
+        self.write("content/index.md", "---\nauthor: A \"B\" <c>\n---\n# Fish & <Chips>\n\n**Welcome**")
+        expected = (
+            "<title>Fish &amp; &lt;Chips&gt;</title><meta content=\"A &quot;B&quot; &lt;c&gt;\">"
+            "<div><h1>Fish &amp; &lt;Chips&gt;</h1><p><b>Welcome</b></p></div>"
+        )
+        self.build()
+        with open(os.path.join(self.public, "index.html")) as file:
+            self.assertEqual(file.read(), expected)
+        with mock.patch("generate.STREAM_THRESHOLD", 0):
+            self.build(incremental=False)
+        with open(os.path.join(self.public, "index.html")) as file:
+            self.assertEqual(file.read(), expected)
+
+    def test_minify_keeps_code_blocks(self):
+        self.write("template.html", "<html>\n  <body>\n    {{ Content }}\n  </body>\n</html>")
+        self.write("content/index.md", "# Home\n\n```\n  indented\n\n  code\n```")
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursive(self.content, self.template, self.public, "/", True, minify=True)
+        with open(os.path.join(self.public, "index.html")) as file:
+            self.assertEqual(file.read(), "<html><body><div><h1>Home</h1><pre><code>\n  indented\n\n  code\n</code></pre></div></body></html>")
+        # Turning minify off rebuilds every page
+        self.assertEqual(self.build().rebuilt, 2)
+
+    def test_image_size_change_rebuilds_pages_showing_it(self):
+        self.write("content/index.md", "# Home\n\n![a](/images/a.gif) ![b](/images/b.gif)")
+        self.write("public/images/a.gif", "GIF89a\x10\x00\x08\x00")
+        self.write("public/images/b.gif", "GIF89a\x02\x00\x03\x00")
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursive(self.content, self.template, self.public, "/", True, image_hints=True)
+        with open(os.path.join(self.public, "index.html")) as file:
+            html = file.read()
+        self.assertIn("<img src=\"/images/a.gif\" alt=\"a\" width=\"16\" height=\"8\">", html)
+        self.assertIn(
+            "<img src=\"/images/b.gif\" alt=\"b\" width=\"2\" height=\"3\" loading=\"lazy\" decoding=\"async\">", html
+        )
+
+        self.write("public/images/b.gif", "GIF89a\x04\x00\x03\x00")
+        with contextlib.redirect_stdout(io.StringIO()):
+            report = generate_pages_recursive(self.content, self.template, self.public, "/", True, image_hints=True)
+        self.assertEqual((report.rebuilt, report.skipped), (1, 1))
+        with open(os.path.join(self.public, "index.html")) as file:
+            self.assertIn("width=\"4\"", file.read())
+
+    def test_image_headers_cached_from_static(self):
+        # A full copy of static/ gives every image in public/ a new mtime,
+        # the headers are cached by the files in static/
+        self.write("content/index.md", "# Home\n\n![a](/images/a.gif)")
+        self.write("static/images/a.gif", "GIF89a\x10\x00\x08\x00")
+        static = os.path.join(self.root, "static")
+        for _ in range(2):
+            self.write("public/images/a.gif", "GIF89a\x10\x00\x08\x00")
+            with contextlib.redirect_stdout(io.StringIO()), mock.patch("images.image_size", wraps=image_size) as reads:
+                generate_pages_recursive(self.content, self.template, self.public, "/", True, image_hints=True, static=static)
+            with open(os.path.join(self.public, "index.html")) as file:
+                self.assertIn("width=\"16\" height=\"8\"", file.read())
+        self.assertEqual(reads.call_count, 0)
+
+    def test_assets_are_referenced_by_fingerprinted_names(self):
+        self.write("template.html", "<link href=\"/index.css\">{{ Content }}")
+        self.write("content/index.md", "# Home\n\n![a](/images/a.png) [css](/index.css?v=1) [post](/blog/post/)")
+        assets = AssetMap({"index.css": "index.0123abcd.css", "images/a.png": "images/a.4567ef01.png"})
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursive(self.content, self.template, self.public, "/base/", True, assets=assets)
+        with open(os.path.join(self.public, "index.html")) as file:
+            self.assertEqual(
+                file.read(),
+                "<link href=\"/base/index.0123abcd.css\"><div><h1>Home</h1><p><img src=\"/base/images/a.4567ef01.png\" alt=\"a\">"
+                " <a href=\"/base/index.0123abcd.css?v=1\">css</a> <a href=\"/base/blog/post/\">post</a></p></div>"
+            )
+
+        # A changed asset renames it, so every page is rebuilt
+        assets = AssetMap({"index.css": "index.89abcdef.css", "images/a.png": "images/a.4567ef01.png"})
+        with contextlib.redirect_stdout(io.StringIO()):
+            report = generate_pages_recursive(self.content, self.template, self.public, "/base/", True, assets=assets)
+        self.assertEqual(report.rebuilt, 2)
+        with open(os.path.join(self.public, "blog", "post", "index.html")) as file:
+            self.assertIn("/base/index.89abcdef.css", file.read())
+
+    def test_missing_output_is_rebuilt(self):
+        self.build()
+        os.unlink(os.path.join(self.public, "index.html"))
+        report = self.build()
+        self.assertEqual((report.rebuilt, report.skipped), (1, 1))
+
+    def test_deleted_source_removes_output_only(self):
+        self.build()
+        self.write("public/index.css", "body {}")
+        os.unlink(os.path.join(self.content, "blog", "post", "index.md"))
+        report = self.build()
+        self.assertEqual((report.rebuilt, report.skipped, report.deleted), (0, 1, 1))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog")))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "index.css")))
+
+    def test_links_of_skipped_pages_are_kept(self):
+        self.write("content/index.md", "# Home\n\n[post](blog/post/index.md) and [gone](/gone)")
+        self.build()
+        # The first build collected no links, so the pages are rendered again
+        links = LinkIndex()
+        with contextlib.redirect_stdout(io.StringIO()):
+            report = generate_pages_recursive(self.content, self.template, self.public, "/", True, links=links)
+        self.assertEqual(report.rebuilt, 2)
+
+        links = LinkIndex()
+        with contextlib.redirect_stdout(io.StringIO()):
+            report = generate_pages_recursive(self.content, self.template, self.public, "/", True, links=links)
+        self.assertEqual(report.skipped, 2)
+        self.assertEqual(links.broken(), [("index.html", "/gone")])
+
+    def test_search_terms_of_skipped_pages_are_kept(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursive(self.content, self.template, self.public, "/", True, search=SearchIndex())
+        self.write("content/index.md", "# Home\n\nWelcome **friends**")
+        search = SearchIndex()
+        with contextlib.redirect_stdout(io.StringIO()):
+            report = generate_pages_recursive(self.content, self.template, self.public, "/", True, search=search)
+        self.assertEqual((report.rebuilt, report.skipped), (1, 1))
+        self.assertEqual(search.pages[0], ("/blog/post/index.html", "Post", {"post": 1, "some": 1, "bold": 1, "text": 1}))
+        self.assertEqual(search.pages[1], ("/index.html", "Home", {"home": 1, "welcome": 1, "friends": 1}))
+
+    def test_full_build_ignores_manifest(self):
+        self.build()
+        report = self.build(incremental=False)
+        self.assertEqual((report.rebuilt, report.skipped), (2, 0))
+
+class TestGeneratePagesParallel(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.root = self.temp.name
+        self.template = os.path.join(self.root, "template.html")
+        with open(self.template, "w") as file:
+            file.write(TEMPLATE)
+        for i in range(6):
+            path = os.path.join(self.root, "content", f"section{i % 2}", f"page{i}.md")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as file:
+                file.write(f"# Page {i}\n\nSome _text_ with a [link](/page{i}) and `code`")
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def build(self, destination, jobs):
+        destination = os.path.join(self.root, destination)
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            generate_pages_recursive(os.path.join(self.root, "content"), self.template, destination, "/base/", jobs=jobs)
+        return destination, output.getvalue()
+
+    def read_tree(self, root):
+        files = {}
+        for directory, _, names in os.walk(root):
+            for name in names:
+                path = os.path.join(directory, name)
+                with open(path) as file:
+                    files[os.path.relpath(path, root)] = file.read()
+        return files
+
+    def test_parallel_matches_serial(self):
+        serial, serial_log = self.build("serial", jobs=1)
+        parallel, parallel_log = self.build("parallel", jobs=3)
+        self.assertEqual(self.read_tree(serial), self.read_tree(parallel))
+        self.assertEqual(serial_log.replace("serial", "parallel"), parallel_log)
+
+    def test_pipelined_matches_streamed(self):
+        # Pages above the stream threshold are read and written by the
+        # renderer itself instead of the I/O pipeline
+        pipelined, pipelined_log = self.build("pipelined", jobs=1)
+        with mock.patch("generate.STREAM_THRESHOLD", 0):
+            streamed, streamed_log = self.build("streamed", jobs=1)
+        self.assertEqual(self.read_tree(pipelined), self.read_tree(streamed))
+        self.assertEqual(pipelined_log.replace("pipelined", "streamed"), streamed_log)
+
+    def test_failure_reports_path(self):
+        path = os.path.join(self.root, "content", "section1", "broken.md")
+        with open(path, "w") as file:
+            file.write("# Broken\n\nUnclosed **bold")
+        for jobs in (1, 3):
+            with self.assertRaises(RuntimeError) as context:
+                self.build(f"jobs{jobs}", jobs=jobs)
+            self.assertIn("broken.md", str(context.exception))
+
+class TestGeneratePagesProfile(TestGeneratePagesParallel):
+    def build_profiled(self, destination, jobs):
+        profile = BuildProfile(slowest=2)
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursive(
+                os.path.join(self.root, "content"), self.template, os.path.join(self.root, destination), "/base/",
+                jobs=jobs, profile=profile
+            )
+        return profile
+
+    def test_profiled_output_matches(self):
+        plain, _ = self.build("plain", jobs=1)
+        self.build_profiled("profiled", jobs=1)
+        self.assertEqual(self.read_tree(plain), self.read_tree(os.path.join(self.root, "profiled")))
+
+    def test_every_page_and_stage_is_timed(self):
+        for jobs in (1, 3):
+            profile = self.build_profiled(f"profiled{jobs}", jobs)
+            self.assertEqual(len(profile.pages), 6)
+            for _, times in profile.pages:
+                self.assertEqual(set(times), set(STAGES))
+            self.assertGreater(profile.elapsed, 0)
+            self.assertIn("Slowest 2 pages", profile.summary())
+
+    def test_large_pages_are_streamed(self):
+        plain, _ = self.build("plain", jobs=1)
+        with mock.patch("generate.STREAM_THRESHOLD", 0), mock.patch("generate.stream_page", wraps=stream_page) as streamed:
+            profile = self.build_profiled("profiled", jobs=1)
+        self.assertEqual(streamed.call_count, 6)
+        self.assertEqual(self.read_tree(plain), self.read_tree(os.path.join(self.root, "profiled")))
+        for _, times in profile.pages:
+            self.assertEqual(set(times), {"render"})
+
+class TestCallWithTimeout(unittest.TestCase):
+    def test_returns_result(self):
+        self.assertEqual(call_with_timeout(max, 1, 2, 3), 3)
+
+    def test_times_out(self):
+        with self.assertRaises(TimeoutError):
+            call_with_timeout(time.sleep, 0.05, 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,6 @@
 import unittest
 
-from htmlnode import HTMLNode
+from htmlnode import FrozenProps, HTMLNode, escape_attribute, escape_text
 
 
 class TestHTMLNode(unittest.TestCase):
@@ -15,6 +15,20 @@ class TestHTMLNode(unittest.TestCase):
             " href=\"https://www.google.com\" target=\"_blank\""
         )
     
+    def test_props_escaped(self):
+        node = HTMLNode(props={"alt": "a \"quoted\" <b> & more", "href": "/search?q=1&page=2"})
+        self.assertEqual(
+            node.props_to_html(),
+            " alt=\"a &quot;quoted&quot; &lt;b&gt; &amp; more\" href=\"/search?q=1&amp;page=2\""
+        )
+
+    def test_escape(self):
+        text = "plain text"
+        self.assertIs(escape_text(text), text)
+        self.assertIs(escape_attribute(text), text)
+        self.assertEqual(escape_text("a < b & \"c\""), "a &lt; b &amp; \"c\"")
+        self.assertEqual(escape_attribute("a < b & \"c\""), "a &lt; b &amp; &quot;c&quot;")
+
     def test_props_empty(self):
         node = HTMLNode()
         self.assertEqual(node.props_to_html(), "")
@@ -38,5 +52,31 @@ class TestHTMLNode(unittest.TestCase):
             "HTMLNode(h, This is a heading, [HTMLNode(None, None, None, None)], {'href': 'https://www.google.com', 'target': '_blank'})"
         )
 
+    def test_no_instance_dict(self):
+        node = HTMLNode("p", "text")
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.extra = True
+
+    def test_tag_interned(self):
+        level = 2
+        self.assertIs(HTMLNode(f"h{level}").tag, HTMLNode("h2").tag)
+
+class TestFrozenProps(unittest.TestCase):
+    def test_read_only(self):
+        props = FrozenProps(href="/")
+        with self.assertRaises(TypeError):
+            props["href"] = "/other"
+        with self.assertRaises(TypeError):
+            props.update(src="/")
+        self.assertEqual(props, {"href": "/"})
+        self.assertEqual(repr(props), "{'href': '/'}")
+
+    def test_html_rendered_once(self):
+        props = FrozenProps(href="/a&b")
+        html = HTMLNode("a", props=props).props_to_html()
+        self.assertEqual(html, " href=\"/a&amp;b\"")
+        self.assertIs(HTMLNode("a", props=props).props_to_html(), html)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,95 @@
+import io
+import os
+import struct
+import tempfile
+import unittest
+
+from unittest import mock
+
+import images
+
+from images import PageImages, image_key, read_image_size, scan_images
+
+def png(width, height):
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I4sII", 13, b"IHDR", width, height) + b"\x08\x06\x00\x00\x00"
+
+def gif(width, height):
+    return b"GIF89a" + struct.pack("<HH", width, height) + b"\x00" * 8
+
+def jpeg(width, height):
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+    frame = b"\xff\xc2" + struct.pack(">HBHH", 17, 8, height, width) + b"\x00" * 10
+    return b"\xff\xd8" + app0 + b"\xff" + frame + b"\xff\xd9"
+
+def webp(chunk, payload):
+    return b"RIFF" + struct.pack("<I", 4 + 8 + len(payload)) + b"WEBP" + chunk + struct.pack("<I", len(payload)) + payload
+
+class TestReadImageSize(unittest.TestCase):
+    def size(self, data):
+        return read_image_size(io.BytesIO(data))
+
+    def test_formats(self):
+        self.assertEqual(self.size(png(1100, 438)), (1100, 438))
+        self.assertEqual(self.size(gif(40, 30)), (40, 30))
+        self.assertEqual(self.size(jpeg(640, 480)), (640, 480))
+
+    def test_webp(self):
+        lossy = b"\x00" * 6 + struct.pack("<HH", 300, 200)
+        self.assertEqual(self.size(webp(b"VP8 ", lossy + b"\x00" * 8)), (300, 200))
+        bits = (300 - 1) | ((200 - 1) << 14)
+        self.assertEqual(self.size(webp(b"VP8L", b"\x2f" + bits.to_bytes(4, "little") + b"\x00" * 8)), (300, 200))
+        extended = b"\x00" * 4 + (299).to_bytes(3, "little") + (199).to_bytes(3, "little")
+        self.assertEqual(self.size(webp(b"VP8X", extended + b"\x00" * 8)), (300, 200))
+
+    def test_unknown_or_truncated(self):
+        self.assertIsNone(self.size(b"not an image"))
+        self.assertIsNone(self.size(jpeg(640, 480)[:20]))
+        self.assertIsNone(self.size(b""))
+
+class TestScanImages(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.root = self.temp.name
+        self.write("images/a.png", png(10, 20))
+        self.write("images/b.gif", gif(3, 4))
+        self.write("index.css", b"body {}")
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def write(self, path, data):
+        path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as file:
+            file.write(data)
+
+    def test_reads_only_new_or_changed_images(self):
+        sizes, cache = scan_images(self.root)
+        self.assertEqual(sizes, {"images/a.png": (10, 20), "images/b.gif": (3, 4)})
+
+        self.write("images/b.gif", gif(30, 4))
+        with mock.patch("images.image_size", wraps=images.image_size) as reader:
+            sizes, cache = scan_images(self.root, cache)
+        self.assertEqual([call.args[0] for call in reader.call_args_list], [os.path.join(self.root, "images", "b.gif")])
+        self.assertEqual(sizes["images/b.gif"], (30, 4))
+
+    def test_batch_in_parallel(self):
+        for index in range(images.PARALLEL_THRESHOLD):
+            self.write(f"many/{index}.png", png(index + 1, 1))
+        sizes, _ = scan_images(self.root, workers=4)
+        self.assertEqual(sizes["many/7.png"], (8, 1))
+
+class TestPageImages(unittest.TestCase):
+    def test_hints(self):
+        page = PageImages({"images/a.png": (10, 20)})
+        self.assertEqual(page.hints("/images/a.png"), ((10, 20), False))
+        self.assertEqual(page.hints("/images/missing.png"), (None, True))
+        self.assertEqual(page.hints("https://example.com/a.png"), (None, True))
+        self.assertEqual(page.used, {"images/a.png": [10, 20], "images/missing.png": None})
+
+    def test_image_key(self):
+        self.assertEqual(image_key("/images/a%20b.png"), "images/a b.png")
+        self.assertIsNone(image_key("images/a.png"))
+
+if __name__ == "__main__":
+    unittest.main()
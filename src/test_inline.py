@@ -0,0 +1,85 @@
+import random
+import unittest
+
+from inline import scan_text_nodes
+from split import split_nodes_delimiter, split_nodes_image, split_nodes_link
+from textnode import TextNode, TextType
+
+def split_text_nodes(text):
+    nodes = [TextNode(text, TextType.TEXT)]
+    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+    nodes = split_nodes_delimiter(nodes, "_", TextType.ITALIC)
+    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+    nodes = split_nodes_image(nodes)
+    return split_nodes_link(nodes)
+
+def parse(parser, text):
+    try:
+        return parser(text)
+    except ValueError as error:
+        return str(error)
+
+class TestScanTextNodes(unittest.TestCase):
+    def test_full_pipeline(self):
+        text = (
+            "This is **text** with an _italic_ word and a `code block` "
+            "and an ![obi wan image](https://i.imgur.com/fJRm4Vk.jpeg) "
+            "and a [link](https://boot.dev)"
+        )
+        self.assertListEqual(
+            scan_text_nodes(text),
+            [
+                TextNode("This is ", TextType.TEXT),
+                TextNode("text", TextType.BOLD),
+                TextNode(" with an ", TextType.TEXT),
+                TextNode("italic", TextType.ITALIC),
+                TextNode(" word and a ", TextType.TEXT),
+                TextNode("code block", TextType.CODE),
+                TextNode(" and an ", TextType.TEXT),
+                TextNode("obi wan image", TextType.IMAGE, "https://i.imgur.com/fJRm4Vk.jpeg"),
+                TextNode(" and a ", TextType.TEXT),
+                TextNode("link", TextType.LINK, "https://boot.dev"),
+            ]
+        )
+
+    def test_markup_inside_bold_is_text(self):
+        self.assertListEqual(
+            scan_text_nodes("**a _b_ [c](d)**"),
+            [TextNode("a _b_ [c](d)", TextType.BOLD)]
+        )
+
+    def test_unclosed_delimiters_raise(self):
+        for text in ["**bold", "_italic", "`code", "_a **b** c_", "`a_b`"]:
+            with self.assertRaises(ValueError):
+                scan_text_nodes(text)
+
+    def test_image_wins_over_overlapping_link(self):
+        text = "[b](![ )(]()"
+        self.assertListEqual(scan_text_nodes(text), split_text_nodes(text))
+
+class TestScanMatchesSplitPasses(unittest.TestCase):
+    examples = [
+        "",
+        "This is text with a `code block` word",
+        "This is text with a **bold block** word",
+        "This is text with an ![image](https://i.imgur.com/zjjcJKZ.png) and another ![second image](https://i.imgur.com/3elNhQu.png) and text after",
+        "![one](url1)![two](url2)",
+        "This is text with a link [to boot dev](https://www.boot.dev) and [to youtube](https://www.youtube.com/@bootdotdev)",
+        "[one](url1)[two](url2) and ![img](url3)",
+        "***bold*** and ____ and ``",
+        "a [link with **bold**](url) and [a](b_c_d)",
+    ]
+
+    def test_examples(self):
+        for text in self.examples:
+            self.assertEqual(parse(scan_text_nodes, text), parse(split_text_nodes, text), text)
+
+    def test_random_markup(self):
+        rng = random.Random(20240101)
+        alphabet = list("ab !![[]](())\n") + ["**", "_", "`", "![a](u)", "[l](v)", "](", "x*"]
+        for _ in range(5000):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 20)))
+            self.assertEqual(parse(scan_text_nodes, text), parse(split_text_nodes, text), repr(text))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -18,6 +18,13 @@ class TestLeafNode(unittest.TestCase):
             node.to_html(),
             "Normal text"
         )
+
+    def test_value_escaped(self):
+        self.assertEqual(LeafNode("a", "< Back & Home >", {"href": "/"}).to_html(), "<a href=\"/\">&lt; Back &amp; Home &gt;</a>")
+        self.assertEqual(LeafNode(None, "say \"hi\"").to_html(), "say \"hi\"")
+
+    def test_value_escaped_once(self):
+        self.assertEqual(LeafNode("code", "a &lt; b").to_html(), "<code>a &amp;lt; b</code>")
     
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
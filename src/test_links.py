@@ -0,0 +1,49 @@
+import unittest
+
+from context import RenderContext
+from convert import markdown_to_html_node
+from links import LinkIndex, rewrite_markdown_link, target_path
+
+class TestRewriteMarkdownLink(unittest.TestCase):
+    def test_relative_markdown_links(self):
+        self.assertEqual(rewrite_markdown_link("post.md"), "post.html")
+        self.assertEqual(rewrite_markdown_link("../tom/index.md#section"), "../tom/index.html#section")
+        self.assertEqual(rewrite_markdown_link("notes.md?raw=1"), "notes.html?raw=1")
+
+    def test_other_links_are_unchanged(self):
+        for url in ("/blog/post.md", "https://example.com/README.md", "readme.mdx", "#part.md", "image.png"):
+            self.assertEqual(rewrite_markdown_link(url), url)
+
+class TestTargetPath(unittest.TestCase):
+    def test_internal(self):
+        self.assertEqual(target_path("/images/tom.png", "blog/tom"), "images/tom.png")
+        self.assertEqual(target_path("/", "blog"), "")
+        self.assertEqual(target_path("../majesty", "blog/tom"), "blog/majesty")
+        self.assertEqual(target_path("./a/../b/", "blog"), "blog/b")
+        self.assertEqual(target_path("page%20two.html?x=1#top", ""), "page two.html")
+
+    def test_external_and_same_page(self):
+        for url in ("https://boot.dev", "mailto:me@example.com", "//cdn.example.com/x.js", "#top", "?page=2"):
+            self.assertIsNone(target_path(url, "blog"))
+
+class TestLinkIndex(unittest.TestCase):
+    def test_broken(self):
+        index = LinkIndex()
+        index.add_outputs(["index.css", "images/tom.png"])
+        index.add_page("index.html", ["/blog/tom", "/images/tom.png", "/missing", "https://boot.dev"])
+        index.add_page("blog/tom/index.html", ["../../index.css", "../majesty", "/", "../majesty"])
+        self.assertEqual(
+            index.broken(),
+            [("blog/tom/index.html", "../majesty"), ("index.html", "/missing")]
+        )
+
+    def test_collected_while_converting(self):
+        links = []
+        context = RenderContext("/base/", links)
+        html = markdown_to_html_node("[a](/a) ![b](b.png) [c](c.md) [d](https://d.dev)", context).to_html()
+        self.assertEqual(links, ["/a", "b.png", "c.html", "https://d.dev"])
+        self.assertIn('href="/base/a"', html)
+        self.assertIn('href="c.html"', html)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+
+from minify import minify_html
+
+class TestMinifyHTML(unittest.TestCase):
+    def test_template(self):
+        text = """<!doctype html>
+<html>
+  <head>
+    <meta charset="utf-8" />
+    <!-- the stylesheet -->
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+  <body>
+    <article>{{ Content }}</article>
+  </body>
+</html>
+"""
+        self.assertEqual(
+            minify_html(text),
+            "<!doctype html><html><head><meta charset=utf-8><link href=/index.css rel=stylesheet></head>"
+            "<body><article>{{ Content }}</article></body></html>"
+        )
+
+    def test_inline_whitespace_collapsed_to_a_space(self):
+        self.assertEqual(minify_html("<p>one  <b>two</b>\n\n<i>three</i> </p>"), "<p>one <b>two</b> <i>three</i></p>")
+
+    def test_quotes_kept_when_needed(self):
+        self.assertEqual(
+            minify_html("<a href=\"\" title=\"two words\" data-x='say \"hi\"' class=\"a=b\" hidden>x</a>"),
+            "<a href=\"\" title=\"two words\" data-x='say \"hi\"' class=\"a=b\" hidden>x</a>"
+        )
+
+    def test_raw_elements_kept(self):
+        text = "<div>\n<pre class=\"code\"><code>  a\n\n    b  </code></pre>\n<script>\n  if (a  < b) {}\n</script></div>"
+        self.assertEqual(
+            minify_html(text),
+            "<div><pre class=code><code>  a\n\n    b  </code></pre><script>\n  if (a  < b) {}\n</script></div>"
+        )
+
+    def test_slots_kept(self):
+        self.assertEqual(
+            minify_html("<a href=\"{{ url }}\" class=\"x\"> {{ Title }} </a>"),
+            "<a href=\"{{ url }}\" class=\"x\"> {{ Title }} </a>"
+        )
+
+    def test_conditional_comment_kept(self):
+        self.assertEqual(minify_html("<p>a<!--[if IE]>x<![endif]--><!-- b --></p>"), "<p>a<!--[if IE]>x<![endif]--></p>")
+
+if __name__ == "__main__":
+    unittest.main()
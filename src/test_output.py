@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+
+from output import BATCH_SIZE, FILE_MODE, encode_chunks, write_output, write_text
+from unittest import mock
+
+class TestWriteOutput(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp.name, "blog", "index.html")
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def read(self):
+        with open(self.path, encoding="utf-8") as file:
+            return file.read()
+
+    def test_identical_output_keeps_mtime(self):
+        self.assertTrue(write_text(self.path, ["<p>", "café", "</p>"]))
+        os.utime(self.path, ns=(1, 1))
+        self.assertFalse(write_text(self.path, ["<p>café", "</p>"]))
+        self.assertEqual(os.stat(self.path).st_mtime_ns, 1)
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["index.html"])
+
+    def test_changed_output_is_replaced(self):
+        write_text(self.path, ["<p>one</p>"])
+        os.utime(self.path, ns=(1, 1))
+        # Same size, different bytes
+        self.assertTrue(write_text(self.path, ["<p>two</p>"]))
+        self.assertEqual(self.read(), "<p>two</p>")
+        self.assertNotEqual(os.stat(self.path).st_mtime_ns, 1)
+
+    def test_failed_write_keeps_old_output(self):
+        write_text(self.path, ["<p>old</p>"])
+
+        def chunks():
+            yield "<p>new"
+            raise ValueError("render failed")
+
+        with self.assertRaises(ValueError):
+            write_output(self.path, encode_chunks(chunks()))
+        self.assertEqual(self.read(), "<p>old</p>")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["index.html"])
+
+    def test_identical_bytes_are_not_written(self):
+        self.assertTrue(write_output(self.path, b"<p>one</p>"))
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, FILE_MODE)
+        with mock.patch("output.tempfile.mkstemp") as mkstemp:
+            self.assertFalse(write_output(self.path, b"<p>one</p>"))
+        mkstemp.assert_not_called()
+        self.assertTrue(write_output(self.path, b"<p>two</p>"))
+        self.assertEqual(self.read(), "<p>two</p>")
+
+    def test_output_named_like_a_temp_file(self):
+        temp_named = f"{self.path}.tmp"
+        write_output(temp_named, b"kept")
+        write_output(self.path, b"<p>page</p>")
+        with open(temp_named, "rb") as file:
+            self.assertEqual(file.read(), b"kept")
+        self.assertEqual(sorted(os.listdir(os.path.dirname(self.path))), ["index.html", "index.html.tmp"])
+
+    def test_chunks_are_batched(self):
+        chunks = ["x" * 1000] * (BATCH_SIZE * 3 // 1000)
+        blocks = list(encode_chunks(chunks))
+        self.assertEqual(len(blocks), 3)
+        self.assertEqual(b"".join(blocks), "".join(chunks).encode())
+
+        # Tiny chunks are batched by length all the same
+        chunks = ["<p>", "x", "</p>"] * (BATCH_SIZE // 2)
+        blocks = list(encode_chunks(chunks))
+        self.assertEqual(len(blocks), 4)
+        self.assertEqual(b"".join(blocks), "".join(chunks).encode())
+
+if __name__ == "__main__":
+    unittest.main()
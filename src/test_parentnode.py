@@ -1,3 +1,5 @@
+import io
+import sys
 import unittest
 
 from leafnode import LeafNode
@@ -54,5 +56,29 @@ class TestParentNode(unittest.TestCase):
         child_node.children = [parent_node]
         self.assertRaises(RecursionError, parent_node.to_html)
 
+    def test_iter_html_chunks(self):
+        node = ParentNode("p", [LeafNode("b", "Bold"), LeafNode(None, " text")])
+        self.assertEqual(list(node.iter_html()), ["<p>", "<b>Bold</b>", " text", "</p>"])
+
+    def test_write_html(self):
+        node = ParentNode("div", [ParentNode("p", [LeafNode(None, "text")])])
+        buffer = io.StringIO()
+        node.write_html(buffer)
+        self.assertEqual(buffer.getvalue(), "<div><p>text</p></div>")
+
+    def test_deep_nesting(self):
+        depth = sys.getrecursionlimit() * 5
+        node = LeafNode(None, "leaf")
+        for _ in range(depth):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertEqual(len(html), depth * len("<span></span>") + len("leaf"))
+        self.assertTrue(html.startswith("<span><span>"))
+
+    def test_shared_child_is_not_a_cycle(self):
+        child = LeafNode("b", "x")
+        node = ParentNode("p", [child, ParentNode("i", [child]), child])
+        self.assertEqual(node.to_html(), "<p><b>x</b><i><b>x</b></i><b>x</b></p>")
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
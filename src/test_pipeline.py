@@ -0,0 +1,81 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from pipeline import OutputWriter, prefetch
+from unittest import mock
+
+class TestPrefetch(unittest.TestCase):
+    def test_results_in_order(self):
+        paths = [f"page{i}.md" for i in range(50)]
+        self.assertEqual(list(prefetch(paths, str.upper, threads=4, depth=3)), [path.upper() for path in paths])
+
+    def test_reads_at_most_depth_ahead(self):
+        read = []
+        lock = threading.Lock()
+
+        def record(path):
+            with lock:
+                read.append(path)
+            return path
+
+        results = prefetch(range(100), record, threads=2, depth=4)
+        self.assertEqual(next(results), 0)
+        # The first result, and a window of depth after it at most
+        self.assertLessEqual(len(read), 5)
+        results.close()
+        self.assertLess(len(read), 100)
+
+    def test_error_raised_in_order(self):
+        def read(path):
+            if path == 2:
+                raise OSError("Error: read failed")
+            return path
+
+        results = prefetch(range(5), read, threads=2)
+        self.assertEqual([next(results), next(results)], [0, 1])
+        with self.assertRaises(OSError):
+            next(results)
+
+class TestOutputWriter(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.root = self.temp.name
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_writes_and_keeps(self):
+        with OutputWriter(threads=4, depth=2) as writer:
+            for i in range(10):
+                writer.submit(os.path.join(self.root, f"section{i % 2}", f"page{i}.html"), f"<p>{i}</p>".encode())
+        self.assertEqual((writer.written, writer.kept), (10, 0))
+        with open(os.path.join(self.root, "section1", "page3.html"), "rb") as file:
+            self.assertEqual(file.read(), b"<p>3</p>")
+
+        with OutputWriter() as writer:
+            writer.submit(os.path.join(self.root, "section0", "page0.html"), b"<p>0</p>")
+            writer.submit(os.path.join(self.root, "section0", "page2.html"), b"<p>changed</p>")
+        self.assertEqual((writer.written, writer.kept), (1, 1))
+
+    def test_directories_created_once(self):
+        with mock.patch("pipeline.os.makedirs", wraps=os.makedirs) as makedirs:
+            with OutputWriter(threads=1) as writer:
+                for i in range(6):
+                    writer.submit(os.path.join(self.root, "blog", f"post{i}.html"), b"post")
+        self.assertEqual(makedirs.call_count, 1)
+
+    def test_first_error_raised_on_close(self):
+        # A file where a directory is expected
+        with open(os.path.join(self.root, "blog"), "w") as file:
+            file.write("")
+        writer = OutputWriter()
+        writer.submit(os.path.join(self.root, "index.html"), b"home")
+        writer.submit(os.path.join(self.root, "blog", "post.html"), b"post")
+        with self.assertRaises(OSError):
+            writer.close()
+        self.assertEqual(writer.written, 1)
+
+if __name__ == "__main__":
+    unittest.main()
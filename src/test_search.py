@@ -0,0 +1,49 @@
+import json
+import os
+import tempfile
+import unittest
+
+from search import PAGES_NAME, PageTerms, SearchIndex, assign_ids, shard_name
+
+class TestPageTerms(unittest.TestCase):
+    def test_counts_lowercase_words(self):
+        terms = PageTerms()
+        terms.add_all(["The Ring, the ", "ring-bearer's"])
+        self.assertEqual(terms.counts, {"the": 2, "ring": 2, "bearer": 1, "s": 1})
+
+class TestAssignIds(unittest.TestCase):
+    def test_ids_are_kept_and_reused(self):
+        ids = assign_ids(["a", "c", "d"], {"a": 0, "b": 1, "c": 2})
+        self.assertEqual(ids, {"a": 0, "c": 2, "d": 1})
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.temp.name, "search")
+        self.index = SearchIndex()
+        self.index.add_page(0, "/index.html", "Home", {"hobbit": 2, "home": 1, "é": 1})
+        self.index.add_page(2, "/blog.html", "Blog", {"hobbit": 1, "ring": 3})
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def read(self, name):
+        with open(os.path.join(self.directory, name), encoding="utf-8") as file:
+            return json.load(file)
+
+    def test_shards(self):
+        self.assertEqual(self.index.write(self.directory), (4, 0))
+        self.assertEqual(self.read(PAGES_NAME), [["/index.html", "Home"], None, ["/blog.html", "Blog"]])
+        self.assertEqual(self.read("ho.json"), {"hobbit": [0, 2, 2, 1], "home": [0, 1]})
+        self.assertEqual(self.read("ri.json"), {"ring": [2, 3]})
+        self.assertEqual(self.read(shard_name("é") + ".json"), {"é": [0, 1]})
+        self.assertEqual(shard_name("é"), "uc3a9")
+
+    def test_only_changed_shards_are_written(self):
+        self.index.write(self.directory)
+        self.index.add_page(2, "/blog.html", "Blog", {"hobbit": 2})
+        self.assertEqual(self.index.write(self.directory), (1, 2))
+        self.assertFalse(os.path.exists(os.path.join(self.directory, "ri.json")))
+
+if __name__ == "__main__":
+    unittest.main()
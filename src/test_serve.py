@@ -0,0 +1,146 @@
+import contextlib
+import http.client
+import io
+import json
+import os
+import threading
+import unittest
+
+from serve import RELOAD_PATH, DevServer, DevSite, etag_matches
+from test_watch import WatchTestCase
+from unittest import mock
+from watch import read_page
+
+class DevSiteTestCase(WatchTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write("content/blog/index.md", "# Blog\n\nPosts")
+        self.site = DevSite(self.content, self.static, self.template, "/")
+        self.site.build()
+
+    def render(self, function, *args):
+        # Sources read by read_page while function runs
+        with mock.patch("watch.read_page", wraps=read_page) as reader:
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = function(*args)
+        return result, [os.path.relpath(call.args[0], self.content) for call in reader.call_args_list]
+
+class TestDevSite(DevSiteTestCase):
+    def test_pages_rendered_when_first_requested(self):
+        response, rendered = self.render(self.site.lookup, "blog/post.html")
+        self.assertEqual(rendered, [os.path.join("blog", "post.md")])
+        self.assertTrue(response.body.startswith(b"<title>Post</title>"))
+        self.assertIn(b"new EventSource(\"/__reload\")", response.body)
+
+        again, rendered = self.render(self.site.lookup, "blog/post.html")
+        self.assertIs(again, response)
+        self.assertEqual(rendered, [])
+        self.assertEqual(self.render(self.site.lookup, "blog/")[1], [os.path.join("blog", "index.md")])
+        self.assertIsNone(self.site.lookup("missing.html"))
+        self.assertIsNone(self.site.lookup("../template.html"))
+
+    def test_change_renders_only_that_page(self):
+        published = []
+        self.site.reload.publish = published.append
+        self.render(self.site.lookup, "")
+        self.render(self.site.lookup, "blog/post.html")
+
+        self.write("content/blog/post.md", "# Post\n\nEdited")
+        self.write("content/blog/index.md", "# Blog\n\nMore posts")
+        changes = {os.path.join(self.content, "blog", "post.md"), os.path.join(self.content, "blog", "index.md")}
+        _, rendered = self.render(self.site.handle, changes)
+        self.assertEqual(rendered, [os.path.join("blog", "post.md")])
+        self.assertIn(b"Edited", self.site.lookup("blog/post.html").body)
+        self.assertEqual(published, [{"/blog/post.html", "/blog/index.html", "/blog/"}])
+
+        # A template change re-templates the rendered pages without parsing them
+        self.write("template.html", "<h1>{{ Title }}</h1>{{ Content }}")
+        _, rendered = self.render(self.site.handle, {self.template})
+        self.assertEqual(rendered, [])
+        self.assertTrue(self.site.lookup("").body.startswith(b"<h1>Home</h1>"))
+
+    def test_partials_watched_before_any_request(self):
+        header = self.write("header.html", "<header>old</header>")
+        self.write("template.html", "{{> header.html }}{{ Content }}")
+        aside = self.write("content/blog/aside.html", "<aside></aside>")
+        self.write("content/blog/_template.html", "{{> aside.html }}{{ Content }}")
+        site = DevSite(self.content, self.static, self.template, "/")
+        site.build()
+        self.assertTrue({header, aside} <= site.watched_files())
+
+        self.render(site.lookup, "")
+        self.write("header.html", "<header>new</header>")
+        published = []
+        site.reload.publish = published.append
+        self.render(site.handle, {header})
+        self.assertTrue(site.lookup("").body.startswith(b"<header>new</header>"))
+        self.assertEqual(published, [{"/index.html", "/"}])
+
+    def test_static_change_reloads_every_page(self):
+        published = []
+        self.site.reload.publish = published.append
+        etag = self.site.lookup("index.css").etag
+        self.write("static/index.css", "body { margin: 0 }")
+        self.site.handle({os.path.join(self.static, "index.css")})
+        self.assertEqual(published, [{"*"}])
+        self.assertNotEqual(self.site.lookup("index.css").etag, etag)
+
+    def test_etag_matches(self):
+        self.assertTrue(etag_matches("\"a\"", "\"b\", W/\"a\""))
+        self.assertTrue(etag_matches("\"a\"", "*"))
+        self.assertFalse(etag_matches("\"a\"", "\"b\""))
+        self.assertFalse(etag_matches("\"a\"", None))
+
+class TestDevServer(DevSiteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.server = DevServer(("localhost", 0), self.site)
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,))
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        super().tearDown()
+
+    def request(self, path, headers={}):
+        connection = http.client.HTTPConnection("localhost", self.server.server_port, timeout=5)
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            connection.request("GET", path, headers=headers)
+            response = connection.getresponse()
+            body = response.read()
+        connection.close()
+        return response, body
+
+    def test_etag_and_not_modified(self):
+        response, body = self.request("/blog/post.html")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader("Content-Type"), "text/html; charset=utf-8")
+        self.assertTrue(body.startswith(b"<title>Post</title>"))
+        etag = response.getheader("ETag")
+
+        response, body = self.request("/blog/post.html", {"If-None-Match": etag})
+        self.assertEqual((response.status, body), (304, b""))
+        self.assertEqual(self.request("/index.css", {"If-None-Match": etag})[0].status, 200)
+
+    def test_directories_and_missing_files(self):
+        response, _ = self.request("/blog")
+        self.assertEqual((response.status, response.getheader("Location")), (301, "/blog/"))
+        self.assertEqual(self.request("/missing")[0].status, 404)
+        self.assertEqual(self.request("/index.css")[1], b"body {}")
+
+    def test_reload_event(self):
+        connection = http.client.HTTPConnection("localhost", self.server.server_port, timeout=5)
+        connection.request("GET", "/" + RELOAD_PATH)
+        response = connection.getresponse()
+        self.assertEqual(response.getheader("Content-Type"), "text/event-stream")
+
+        self.write("content/index.md", "# Home\n\nEdited")
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.site.handle({os.path.join(self.content, "index.md")})
+        self.assertEqual(response.fp.readline(), b"data: " + json.dumps(["/", "/index.html"]).encode() + b"\n")
+        connection.close()
+
+if __name__ == "__main__":
+    unittest.main()
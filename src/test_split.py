@@ -216,5 +216,15 @@ class TestSplitNodesLink(unittest.TestCase):
             new_nodes
         )
 
+    def test_image_with_same_text_is_not_split(self):
+        node = TextNode("![a](/u) then [a](/u)", TextType.TEXT)
+        self.assertListEqual(
+            [
+                TextNode("![a](/u) then ", TextType.TEXT),
+                TextNode("a", TextType.LINK, "/u"),
+            ],
+            split_nodes_link([node])
+        )
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,190 @@
+import contextlib
+import io
+import itertools
+import os
+import tempfile
+import tracemalloc
+import unittest
+
+from extract import extract_front_matter, extract_markdown_title
+from generate import generate_pages_recursive, read_page
+from output import BATCH_SIZE
+from stream import TitleScanner, iter_source_lines, read_front_matter, stream_page
+from unittest import mock
+
+PAGE = """---
+title: Ignored
+author: "Tolkien"
+---
+
+Some text before the title
+
+# The _Title_
+
+> A quote
+
+- an item with a [link](/blog/post)
+- and ![an image](/images/x.png)
+
+```
+# not a title
+```
+"""
+
+def render(variables):
+    title = variables["Title"]
+    return "".join(title) if not isinstance(title, str) else title, "".join(variables["Content"])
+
+class TestStreamPage(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp.name, "page.md")
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def write(self, text):
+        with open(self.path, "w", newline="") as file:
+            file.write(text)
+
+    def test_matches_read_page(self):
+        for text in (PAGE, PAGE.replace("\n", "\r\n"), "# Only a title", "#\n\n  Late title\n\ntext"):
+            self.write(text)
+            page = read_page(self.path, "/base/")
+            expected = render(page)
+            for use_mmap in (False, True):
+                with self.subTest(text=text, use_mmap=use_mmap):
+                    variables = stream_page(self.path, "/base/", use_mmap)
+                    self.assertEqual(variables.get("author"), page.get("author"))
+                    self.assertEqual(render(variables), expected)
+
+    def test_collects_links(self):
+        self.write(PAGE)
+        expected = []
+        render(read_page(self.path, "/", expected))
+        links = []
+        render(stream_page(self.path, "/", links=links))
+        self.assertEqual(links, expected)
+        self.assertEqual(links, ["/blog/post", "/images/x.png"])
+
+    def test_missing_title(self):
+        self.write("No title here\n\n```\nunclosed")
+        with self.assertRaises(Exception) as context:
+            render(stream_page(self.path, "/"))
+        self.assertIn("extract_markdown_title", str(context.exception))
+
+    def test_parse_error_before_title(self):
+        self.write("Some **unclosed\n\n# Title")
+        with self.assertRaises(ValueError):
+            render(stream_page(self.path, "/"))
+
+    def test_memory_is_bounded_by_block(self):
+        paragraph = "A paragraph with **bold** and a [link](/a) in it.\n" * 20 + "\n"
+        # One-time allocations of either inline parser, such as compiled
+        # patterns, are made before measuring
+        self.write("# Small\n\n" + paragraph)
+        render(stream_page(self.path, "/"))
+        self.write("# Big\n\n" + paragraph * 1000)
+        tracemalloc.start()
+        try:
+            variables = stream_page(self.path, "/")
+            for _ in itertools.chain(variables["Title"], variables["Content"]):
+                pass
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, os.path.getsize(self.path) / 10)
+
+    def test_build_memory_is_bounded_by_block(self):
+        # Hashing a page for the manifest does not read it whole either
+        paragraph = "A paragraph with **bold** and a [link](/a) in it.\n" * 20 + "\n"
+        template = os.path.join(self.temp.name, "template.html")
+        with open(template, "w") as file:
+            file.write("<title>{{ Title }}</title>{{ Content }}")
+        content = os.path.join(self.temp.name, "content")
+        os.mkdir(content)
+        self.path = os.path.join(content, "small.md")
+        self.write("# Small\n\n" + paragraph)
+        public = os.path.join(self.temp.name, "public")
+        with contextlib.redirect_stdout(io.StringIO()), mock.patch("generate.STREAM_THRESHOLD", 1 << 16):
+            generate_pages_recursive(content, template, public, "/")
+            self.path = os.path.join(content, "big.md")
+            self.write("# Big\n\n" + paragraph * 1000)
+            tracemalloc.start()
+            try:
+                generate_pages_recursive(content, template, public, "/", incremental=True)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        # A few write batches, whatever the size of the page
+        self.assertGreater(os.path.getsize(self.path), 8 * BATCH_SIZE)
+        self.assertLess(peak, 8 * BATCH_SIZE)
+
+    def test_large_pages_are_not_read_ahead(self):
+        # Pages read ahead of a serial build are never large ones, so many
+        # large pages cost no more than one
+        paragraph = "A paragraph with **bold** and a [link](/a) in it.\n" * 20 + "\n"
+        template = os.path.join(self.temp.name, "template.html")
+        with open(template, "w") as file:
+            file.write("<title>{{ Title }}</title>{{ Content }}")
+        content = os.path.join(self.temp.name, "content")
+        os.mkdir(content)
+        self.path = os.path.join(content, "small.md")
+        self.write("# Small\n\n" + paragraph)
+        public = os.path.join(self.temp.name, "public")
+        with contextlib.redirect_stdout(io.StringIO()), mock.patch("generate.STREAM_THRESHOLD", 1 << 16):
+            generate_pages_recursive(content, template, public, "/")
+            for index in range(4):
+                self.path = os.path.join(content, f"big{index}.md")
+                self.write(f"# Big {index}\n\n" + paragraph * 1000)
+            tracemalloc.start()
+            try:
+                generate_pages_recursive(content, template, public, "/", incremental=True, io_threads=8)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        self.assertGreater(os.path.getsize(self.path), 8 * BATCH_SIZE)
+        self.assertLess(peak, 8 * BATCH_SIZE)
+
+class TestReadFrontMatter(unittest.TestCase):
+    def test_matches_extract_front_matter(self):
+        for text in (PAGE, "---\nkey: value\n", "---\nnot front matter\n---\n", "--- \nkey: v\n---\nbody", "text\n---\n"):
+            with self.subTest(text=text):
+                fields, lines = read_front_matter(text.splitlines(keepends=True))
+                self.assertEqual((fields, "".join(lines)), extract_front_matter(text))
+
+    def test_stops_at_body(self):
+        def lines():
+            yield "---\n"
+            yield "key: value\n"
+            yield "---\n"
+            yield "body\n"
+            raise AssertionError("read past the front matter")
+
+        fields, _ = read_front_matter(lines())
+        self.assertEqual(fields, {"key": "value"})
+
+class TestTitleScanner(unittest.TestCase):
+    def test_matches_extract_markdown_title(self):
+        for text in ("# Title", "  #   Spaced  \nx", "#\n\n  Below\n", "#", "#\n", "## Sub\n# Main", "#tag\n# Real", "# \t\n"):
+            with self.subTest(text=text):
+                scanner = TitleScanner(text.splitlines(keepends=True))
+                list(scanner)
+                try:
+                    expected = extract_markdown_title(text)
+                except Exception:
+                    expected = None
+                self.assertEqual(scanner.title, expected)
+
+class TestIterSourceLines(unittest.TestCase):
+    def test_mmap_matches_text_reader(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "page.md")
+            for data in (b"", b"one\ntwo", b"one\r\ntwo\r", "café\n x\n".encode()):
+                with open(path, "wb") as file:
+                    file.write(data)
+                with self.subTest(data=data):
+                    self.assertEqual(list(iter_source_lines(path, True)), list(iter_source_lines(path)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+
+from output import FILE_MODE
+from sync import PARALLEL_THRESHOLD, copy_file, sync_contents
+
+class TestSyncContents(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.temp.name, "static")
+        self.public = os.path.join(self.temp.name, "public")
+        self.write(self.static, "index.css", "body {}")
+        self.write(self.static, "images/a.png", "png bytes")
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def write(self, root, path, text):
+        path = os.path.join(root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(text)
+        return path
+
+    def read(self, path):
+        with open(os.path.join(self.public, path)) as file:
+            return file.read()
+
+    def counts(self, report):
+        return (report.copied, report.skipped, report.removed)
+
+    def test_first_sync_copies_everything(self):
+        report = sync_contents(self.static, self.public)
+        self.assertEqual(self.counts(report), (2, 0, 0))
+        self.assertEqual(self.read("images/a.png"), "png bytes")
+        self.assertEqual(
+            os.stat(os.path.join(self.public, "index.css")).st_mtime_ns,
+            os.stat(os.path.join(self.static, "index.css")).st_mtime_ns
+        )
+
+    def test_unchanged_files_are_skipped(self):
+        sync_contents(self.static, self.public)
+        self.assertEqual(self.counts(sync_contents(self.static, self.public)), (0, 2, 0))
+
+    def test_changed_file_is_copied(self):
+        sync_contents(self.static, self.public)
+        path = self.write(self.static, "index.css", "body { color: red; }")
+        os.utime(path, ns=(0, 10**18))
+        self.assertEqual(self.counts(sync_contents(self.static, self.public)), (1, 1, 0))
+        self.assertEqual(self.read("index.css"), "body { color: red; }")
+
+    def test_checksum_detects_same_size_and_mtime(self):
+        sync_contents(self.static, self.public)
+        stat = os.stat(os.path.join(self.static, "index.css"))
+        path = self.write(self.static, "index.css", "body []")
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        self.assertEqual(sync_contents(self.static, self.public).copied, 0)
+        self.assertEqual(sync_contents(self.static, self.public, checksum=True).copied, 1)
+        self.assertEqual(self.read("index.css"), "body []")
+
+    def test_deleted_source_is_removed_and_pages_kept(self):
+        sync_contents(self.static, self.public)
+        self.write(self.public, "index.html", "<html></html>")
+        os.unlink(os.path.join(self.static, "images", "a.png"))
+        self.assertEqual(self.counts(sync_contents(self.static, self.public)), (0, 1, 1))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "images")))
+        self.assertTrue(os.path.exists(os.path.join(self.public, "index.html")))
+
+    def test_hardlink(self):
+        sync_contents(self.static, self.public, hardlink=True)
+        self.assertTrue(os.path.samefile(
+            os.path.join(self.static, "index.css"),
+            os.path.join(self.public, "index.css")
+        ))
+
+    def test_copy_replaces_hardlink_without_touching_source(self):
+        sync_contents(self.static, self.public, hardlink=True)
+        copy_file(self.write(self.temp.name, "other.css", "p {}"), os.path.join(self.public, "index.css"))
+        self.assertEqual(self.read("index.css"), "p {}")
+        with open(os.path.join(self.static, "index.css")) as file:
+            self.assertEqual(file.read(), "body {}")
+
+    def test_file_named_like_a_temp_file(self):
+        self.write(self.static, "index.css.tmp", "kept")
+        for hardlink in (False, True):
+            with self.subTest(hardlink=hardlink):
+                sync_contents(self.static, self.public, checksum=True, hardlink=hardlink)
+                self.assertEqual(self.read("index.css"), "body {}")
+                self.assertEqual(self.read("index.css.tmp"), "kept")
+                self.assertEqual([name for name in os.listdir(self.public) if name.endswith(".tmp")], ["index.css.tmp"])
+                self.assertEqual(os.stat(os.path.join(self.public, "index.css")).st_mode & 0o777, FILE_MODE)
+                copy_file(os.path.join(self.static, "index.css"), os.path.join(self.public, "index.css"), hardlink)
+                self.assertEqual(self.read("index.css.tmp"), "kept")
+
+    def test_large_tree_in_parallel(self):
+        for i in range(PARALLEL_THRESHOLD * 2):
+            self.write(self.static, f"many/{i}.txt", str(i) * (i + 1) * 1000)
+        report = sync_contents(self.static, self.public, workers=4)
+        self.assertEqual(report.copied, PARALLEL_THRESHOLD * 2 + 2)
+        self.assertEqual(self.read("many/7.txt"), "7" * 8000)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+import os
+import tempfile
+import time
+import unittest
+
+from fingerprint import AssetMap
+from template import compile_template, expand_includes, find_template, load_template
+
+class TestCompileTemplate(unittest.TestCase):
+    def test_render(self):
+        template = compile_template("<title>{{ Title }}</title><article>{{ Content }}</article>")
+        self.assertEqual(template.variables, ["Title", "Content"])
+        self.assertEqual(
+            template.render({"Title": "Hello", "Content": "<p>World</p>"}),
+            "<title>Hello</title><article><p>World</p></article>"
+        )
+
+    def test_extra_variables(self):
+        template = compile_template("{{ Title }} on {{date}} by {{ author }}")
+        self.assertEqual(
+            template.render({"Title": "Post", "date": "2024-01-01", "author": "Elrond"}),
+            "Post on 2024-01-01 by Elrond"
+        )
+
+    def test_unknown_variable_kept(self):
+        template = compile_template("<p>{{ Missing }}</p>")
+        self.assertEqual(template.render({}), "<p>{{ Missing }}</p>")
+
+    def test_basepath_only_rewrites_literals(self):
+        template = compile_template("<link href=\"/index.css\"><img src=\"/a.png\">{{ Content }}", "/repo/")
+        self.assertEqual(
+            template.render({"Content": "href=\"/kept"}),
+            "<link href=\"/repo/index.css\"><img src=\"/repo/a.png\">href=\"/kept"
+        )
+
+    def test_value_containing_slot_is_not_expanded(self):
+        template = compile_template("{{ Title }}{{ Content }}")
+        self.assertEqual(template.render({"Title": "{{ Content }}", "Content": "x"}), "{{ Content }}x")
+
+    def test_minify_rewrites_basepath_first(self):
+        template = compile_template("<link href=\"/index.css\" />\n<title> {{ Title }} </title>", "/repo/", minify=True)
+        self.assertEqual(template.render({"Title": "x"}), "<link href=/repo/index.css><title>x</title>")
+
+    def test_assets_renamed_before_basepath_and_minify(self):
+        assets = AssetMap({"index.css": "index.0123abcd.css"})
+        text = "<link href=\"/index.css\" />\n<a href=\"/\">home</a>{{ Content }}"
+        self.assertEqual(
+            compile_template(text, "/repo/", assets=assets).render({"Content": "href=\"/index.css\""}),
+            "<link href=\"/repo/index.0123abcd.css\" />\n<a href=\"/repo/\">home</a>href=\"/index.css\""
+        )
+        self.assertEqual(
+            compile_template(text, "/repo/", True, assets).render({"Content": ""}),
+            "<link href=/repo/index.0123abcd.css><a href=/repo/>home</a>"
+        )
+
+    def test_values_other_than_content_are_escaped(self):
+        template = compile_template("<meta content=\"{{ author }}\"><h1>{{ Title }}</h1>{{ Content }}")
+        values = {"author": "A \"B\" <c>", "Title": "Fish & <Chips>", "Content": "<p>&amp;</p>"}
+        expected = "<meta content=\"A &quot;B&quot; &lt;c&gt;\"><h1>Fish &amp; &lt;Chips&gt;</h1><p>&amp;</p>"
+        self.assertEqual(template.render(values), expected)
+        values["Title"] = iter(["Fish & <Chips>"])
+        self.assertEqual("".join(template.iter_render(values)), expected)
+
+    def test_iter_render_streams_chunks(self):
+        template = compile_template("<title>{{ Title }}</title><article>{{ Content }}</article>")
+        chunks = list(template.iter_render({"Title": "Hi", "Content": iter(["<p>", "x", "</p>"])}))
+        self.assertEqual(chunks, ["<title>", "Hi", "</title><article>", "<p>", "x", "</p>", "</article>"])
+
+class TestLoadTemplate(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp.name, "template.html")
+        with open(self.path, "w") as file:
+            file.write("<h1>{{ Title }}</h1>")
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def test_cached_per_basepath(self):
+        template = load_template(self.path)
+        self.assertIs(load_template(self.path), template)
+        self.assertIsNot(load_template(self.path, "/repo/"), template)
+
+    def test_reloaded_when_changed(self):
+        template = load_template(self.path)
+        with open(self.path, "w") as file:
+            file.write("<h2>{{ Title }}</h2>")
+        future = time.time() + 10
+        os.utime(self.path, (future, future))
+        reloaded = load_template(self.path)
+        self.assertIsNot(reloaded, template)
+        self.assertEqual(reloaded.render({"Title": "x"}), "<h2>x</h2>")
+
+    def test_reloaded_when_partial_changed(self):
+        partial = os.path.join(self.temp.name, "partials", "nav.html")
+        os.makedirs(os.path.dirname(partial))
+        with open(partial, "w") as file:
+            file.write("<nav>{{ Title }}</nav>")
+        with open(self.path, "w") as file:
+            file.write("{{> partials/nav.html }}{{ Content }}")
+        template = load_template(self.path)
+        self.assertEqual(template.dependencies, [self.path, partial])
+
+        with open(partial, "w") as file:
+            file.write("<nav>home</nav>")
+        future = time.time() + 10
+        os.utime(partial, (future, future))
+        self.assertEqual(load_template(self.path).render({"Content": "x"}), "<nav>home</nav>x")
+
+class TestIncludes(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.root = self.temp.name
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def write(self, path, text):
+        path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(text)
+        return path
+
+    def test_nested_partials_resolve_from_their_directory(self):
+        template = self.write("template.html", "<body>{{> partials/header.html }}{{ Content }}{{>partials/footer.html}}</body>")
+        header = self.write("partials/header.html", "<header>{{> nav.html }}</header>")
+        nav = self.write("partials/nav.html", "<nav>{{ Title }}</nav>")
+        footer = self.write("partials/footer.html", "<footer>{{> nav.html }}</footer>")
+        text, dependencies = expand_includes(template)
+        self.assertEqual(text, "<body><header><nav>{{ Title }}</nav></header>{{ Content }}<footer><nav>{{ Title }}</nav></footer></body>")
+        self.assertEqual(dependencies, [template, header, nav, footer])
+
+    def test_cycle(self):
+        template = self.write("template.html", "{{> a.html }}")
+        self.write("a.html", "{{> b.html }}")
+        self.write("b.html", "{{> a.html }}")
+        with self.assertRaises(ValueError):
+            expand_includes(template)
+
+    def test_missing_partial(self):
+        template = self.write("template.html", "{{> missing.html }}")
+        with self.assertRaises(FileNotFoundError):
+            expand_includes(template)
+
+    def test_find_template(self):
+        content = os.path.join(self.root, "content")
+        blog = self.write("content/blog/_template.html", "{{ Content }}")
+        os.makedirs(os.path.join(content, "blog", "post"))
+        os.makedirs(os.path.join(content, "about"))
+        found = {}
+        self.assertEqual(find_template(os.path.join(content, "blog", "post"), content, "template.html", found), blog)
+        self.assertEqual(find_template(os.path.join(content, "about"), content, "template.html", found), "template.html")
+        self.assertEqual(find_template(content, content, "template.html", found), "template.html")
+        self.assertEqual(found[os.path.join(content, "blog")], blog)
+
+if __name__ == "__main__":
+    unittest.main()
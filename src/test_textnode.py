@@ -24,5 +24,20 @@ class TestTextNode(unittest.TestCase):
         node2 = TextNode("This is a text node", TextType.BOLD)
         self.assertNotEqual(node, node2)
 
+    def test_repr(self):
+        node = TextNode("link", TextType.LINK, "https://boot.dev/")
+        self.assertEqual(repr(node), "TextNode(link, LINK, https://boot.dev/)")
+
+    def test_shared_link_props(self):
+        first = TextNode("one", TextType.LINK, "/blog").get_html_props()
+        second = TextNode("two", TextType.LINK, "/blog").get_html_props()
+        self.assertIs(first, second)
+        self.assertEqual(first, {"href": "/blog"})
+        self.assertIsNone(TextNode("text", TextType.TEXT).get_html_props())
+
+    def test_props_url_override(self):
+        node = TextNode("alt", TextType.IMAGE, "/a.png")
+        self.assertEqual(node.get_html_props("/repo/a.png"), {"src": "/repo/a.png", "alt": "alt"})
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
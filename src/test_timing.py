@@ -0,0 +1,41 @@
+import unittest
+
+from timing import STAGES, BuildProfile, Stopwatch, percentile
+
+class TestPercentile(unittest.TestCase):
+    def test_nearest_rank(self):
+        values = [float(i) for i in range(1, 101)]
+        self.assertEqual(percentile(values, 0.5), 50.0)
+        self.assertEqual(percentile(values, 0.99), 99.0)
+        self.assertEqual(percentile(values, 1.0), 100.0)
+        self.assertEqual(percentile([3.0], 0.1), 3.0)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+class TestStopwatch(unittest.TestCase):
+    def test_laps_accumulate(self):
+        stopwatch = Stopwatch()
+        stopwatch.lap("read")
+        stopwatch.lap("write")
+        stopwatch.lap("read")
+        self.assertEqual(set(stopwatch.times), {"read", "write"})
+        self.assertTrue(all(time >= 0 for time in stopwatch.times.values()))
+
+class TestBuildProfile(unittest.TestCase):
+    def test_summary(self):
+        profile = BuildProfile(slowest=2)
+        profile.add("a.md", {stage: 0.001 for stage in STAGES})
+        profile.add("b.md", {stage: 0.003 for stage in STAGES})
+        profile.add("c.md", {stage: 0.002 for stage in STAGES})
+        profile.elapsed = 0.1
+        self.assertEqual([source for _, source in profile.page_totals()], ["b.md", "c.md", "a.md"])
+
+        summary = profile.summary()
+        self.assertIn("Profiled 3 pages in 0.100s", summary)
+        for stage in STAGES:
+            self.assertIn(stage, summary)
+        self.assertIn("Slowest 2 pages", summary)
+        self.assertIn("b.md", summary)
+        self.assertNotIn("a.md", summary)
+
+if __name__ == "__main__":
+    unittest.main()
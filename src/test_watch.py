@@ -0,0 +1,174 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from unittest import mock
+from watch import InotifyWatcher, PollingWatcher, SiteWatcher, create_watcher, read_page, wait_for_changes
+
+def inotify_available():
+    watcher = create_watcher([])
+    watcher.close()
+    return isinstance(watcher, InotifyWatcher)
+
+class WatchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.temp = tempfile.TemporaryDirectory()
+        self.root = self.temp.name
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.public = os.path.join(self.root, "public")
+        self.template = self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+        self.write("content/index.md", "# Home\n\nWelcome")
+        self.write("content/blog/post.md", "# Post\n\nText")
+        self.write("static/index.css", "body {}")
+
+    def tearDown(self):
+        self.temp.cleanup()
+
+    def write(self, path, text):
+        path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as file:
+            file.write(text)
+        return path
+
+    def read(self, path):
+        with open(os.path.join(self.public, path)) as file:
+            return file.read()
+
+class TestWatchers(WatchTestCase):
+    def check_watcher(self, watcher):
+        try:
+            self.assertEqual(watcher.read(0.05), set())
+            page = self.write("content/index.md", "# Home\n\nChanged")
+            created = self.write("content/new/page.md", "# New")
+            os.unlink(os.path.join(self.static, "index.css"))
+            self.write("unrelated.txt", "not watched")
+            changes = wait_for_changes(watcher, debounce=0.05, timeout=2)
+            self.assertEqual(changes, {page, created, os.path.join(self.static, "index.css")})
+        finally:
+            watcher.close()
+
+    def test_polling_watcher(self):
+        self.check_watcher(PollingWatcher([self.content, self.static, self.template], interval=0.01))
+
+    @unittest.skipUnless(inotify_available(), "inotify not available")
+    def test_inotify_watcher(self):
+        self.check_watcher(InotifyWatcher([self.content, self.static, self.template]))
+
+    def test_template_file_watched(self):
+        watcher = PollingWatcher([self.template], interval=0.01)
+        self.write("template.html", "{{ Content }}")
+        self.assertEqual(wait_for_changes(watcher, debounce=0.01, timeout=1), {self.template})
+
+    def test_watch_files_adds_partials(self):
+        partial = self.write("partials/nav.html", "<nav></nav>")
+        for watcher in (PollingWatcher([self.template], interval=0.01), create_watcher([self.template])):
+            try:
+                watcher.watch_files([partial])
+                self.assertEqual(watcher.read(0.05), set())
+                self.write("partials/nav.html", "<nav>changed</nav>")
+                self.assertEqual(wait_for_changes(watcher, debounce=0.01, timeout=1), {partial})
+            finally:
+                watcher.close()
+
+class TestSiteWatcher(WatchTestCase):
+    def setUp(self):
+        super().setUp()
+        self.site = SiteWatcher(self.content, self.static, self.template, self.public, "/")
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.site.build()
+
+    def handle(self, *paths):
+        with mock.patch("watch.read_page", wraps=read_page) as reader:
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.site.handle(set(os.path.join(self.root, path) for path in paths))
+        return [call.args[0] for call in reader.call_args_list]
+
+    def test_markdown_change_renders_only_that_page(self):
+        self.write("content/blog/post.md", "# Post\n\nEdited")
+        self.assertEqual(self.handle("content/blog/post.md"), [os.path.join(self.content, "blog", "post.md")])
+        self.assertIn("Edited", self.read("blog/post.html"))
+
+    def test_template_change_does_not_reparse(self):
+        self.write("template.html", "<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertEqual(self.handle("template.html"), [])
+        self.assertTrue(self.read("index.html").startswith("<h1>Home</h1>"))
+        self.assertTrue(self.read("blog/post.html").startswith("<h1>Post</h1>"))
+
+    def test_template_change_after_failed_render(self):
+        # The broken page is reported on its own, every other page using the
+        # template is still re-templated
+        self.write("content/index.md", "No title")
+        self.handle("content/index.md")
+        self.write("template.html", "<h1>{{ Title }}</h1>{{ Content }}")
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.site.handle({self.template})
+        self.assertIn(f"Error: failed to render {os.path.join(self.content, 'index.md')}", output.getvalue())
+        self.assertTrue(self.read("blog/post.html").startswith("<h1>Post</h1>"))
+
+        self.write("content/index.md", "# Home\n\nFixed")
+        self.handle("content/index.md")
+        self.assertTrue(self.read("index.html").startswith("<h1>Home</h1>"))
+
+    def test_partial_change_retemplates_only_dependent_pages(self):
+        self.write("content/blog/_template.html", "<aside>{{> ../../sidebar.html }}</aside>{{ Content }}")
+        self.write("sidebar.html", "old")
+        self.assertEqual(self.handle("content/blog/_template.html"), [])
+        self.assertTrue(self.read("blog/post.html").startswith("<aside>old</aside>"))
+        self.assertTrue(self.read("index.html").startswith("<title>Home</title>"))
+
+        os.unlink(os.path.join(self.public, "index.html"))
+        self.write("sidebar.html", "new")
+        self.assertEqual(self.handle("sidebar.html"), [])
+        self.assertTrue(self.read("blog/post.html").startswith("<aside>new</aside>"))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "index.html")))
+        self.assertIn(os.path.join(self.root, "sidebar.html"), self.site.watched_files())
+
+        os.unlink(os.path.join(self.content, "blog", "_template.html"))
+        self.handle("content/blog/_template.html")
+        self.assertTrue(self.read("blog/post.html").startswith("<title>Post</title>"))
+
+    def test_partial_under_content_is_not_a_page(self):
+        self.write("content/blog/_template.html", "{{> partials/header.html }}{{ Content }}")
+        self.write("content/blog/partials/header.html", "<header>old</header>")
+        self.assertEqual(self.handle("content/blog/_template.html"), [])
+        self.write("content/blog/partials/header.html", "<header>new</header>")
+        self.assertEqual(self.handle("content/blog/partials/header.html"), [])
+        self.assertTrue(self.read("blog/post.html").startswith("<header>new</header>"))
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog", "partials")))
+
+    def test_image_change_renders_pages_showing_it(self):
+        self.write("static/images/a.gif", "GIF89a\x01\x00\x01\x00")
+        self.write("content/blog/post.md", "# Post\n\n![a](/images/a.gif)")
+        self.site.image_hints = True
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.site.build()
+        self.assertIn("width=\"1\"", self.read("blog/post.html"))
+
+        self.write("static/images/a.gif", "GIF89a\x05\x00\x01\x00")
+        self.assertEqual(self.handle("static/images/a.gif"), [os.path.join(self.content, "blog", "post.md")])
+        self.assertIn("width=\"5\"", self.read("blog/post.html"))
+
+    def test_static_change_copies_asset(self):
+        self.write("static/index.css", "p {}")
+        self.write("static/new.css", "a {}")
+        self.assertEqual(self.handle("static/index.css", "static/new.css"), [])
+        self.assertEqual(self.read("index.css"), "p {}")
+        self.assertEqual(self.read("new.css"), "a {}")
+
+    def test_deleted_page_is_removed(self):
+        os.unlink(os.path.join(self.content, "blog", "post.md"))
+        self.handle("content/blog/post.md")
+        self.assertFalse(os.path.exists(os.path.join(self.public, "blog")))
+
+    def test_broken_page_keeps_watching(self):
+        self.write("content/index.md", "no title")
+        self.handle("content/index.md")
+        self.assertIn("Welcome", self.read("index.html"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,6 @@
 from enum import Enum, auto
+from functools import lru_cache
+from htmlnode import FrozenProps
 
 class TextType(Enum):
     TEXT = "text"
@@ -8,7 +10,23 @@ class TextType(Enum):
     LINK = "link"
     IMAGE = "image"
     
+@lru_cache(maxsize=8192)
+def _link_props(url):
+    return FrozenProps(href=url)
+
+@lru_cache(maxsize=8192)
+def _image_props(url, alt, size=None, lazy=False):
+    props = {"src": url, "alt": alt}
+    if size is not None:
+        props["width"], props["height"] = str(size[0]), str(size[1])
+    if lazy:
+        props["loading"] = "lazy"
+        props["decoding"] = "async"
+    return FrozenProps(props)
+
 class TextNode:
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text:str, text_type:TextType, url:str|None=None):
         self.text = text
         self.text_type = text_type
@@ -46,12 +64,13 @@ class TextNode:
             case _:
                 return self.text
 
-    def get_html_props(self):
+    def get_html_props(self, url:str|None=None, size:tuple|None=None, lazy:bool=False):
+        # Links and images repeated across a site share one props dict
         match self.text_type:
             case TextType.LINK:
-                return {"href": self.url}
+                return _link_props(url or self.url)
             case TextType.IMAGE:
-                return {"src": self.url, "alt": self.text}
+                return _image_props(url or self.url, self.text, size, lazy)
             case _:
                 return None        
 
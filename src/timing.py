@@ -0,0 +1,63 @@
+import math
+import time
+
+from typing import Dict, List, Tuple
+
+# Stages of rendering one page, in the order they run
+STAGES = ("read", "blocks", "inline", "render", "template", "write")
+
+class Stopwatch:
+    def __init__(self):
+        self.times:Dict[str, float] = {}
+        self.last = time.perf_counter()
+
+    def lap(self, stage:str):
+        # Charges the time since the previous lap to stage
+        now = time.perf_counter()
+        self.times[stage] = self.times.get(stage, 0.0) + now - self.last
+        self.last = now
+
+def percentile(values:List[float], fraction:float) -> float:
+    # Nearest rank, values must be sorted
+    if not values:
+        return 0.0
+    return values[max(math.ceil(fraction * len(values)) - 1, 0)]
+
+class BuildProfile:
+    def __init__(self, slowest:int = 10):
+        self.slowest = slowest
+        self.pages:List[Tuple[str, Dict[str, float]]] = []
+        self.elapsed = 0.0
+
+    def __repr__(self):
+        return f"BuildProfile({len(self.pages)} pages, {self.elapsed:.3f}s)"
+
+    def add(self, source:str, times:Dict[str, float]):
+        self.pages.append((source, times))
+
+    def stage_times(self, stage:str) -> List[float]:
+        return sorted(times.get(stage, 0.0) for _, times in self.pages)
+
+    def page_totals(self) -> List[Tuple[float, str]]:
+        return sorted(((sum(times.values()), source) for source, times in self.pages), reverse=True)
+
+    def summary(self) -> str:
+        totals = {stage: sum(self.stage_times(stage)) for stage in STAGES}
+        measured = sum(totals.values())
+        lines = [
+            f"Profiled {len(self.pages)} pages in {self.elapsed:.3f}s, {measured:.3f}s of it spent on pages",
+            f"{'stage':<10}{'total':>11}{'share':>8}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}",
+        ]
+        for stage in STAGES:
+            values = self.stage_times(stage)
+            share = totals[stage] / measured if measured else 0.0
+            lines.append(
+                f"{stage:<10}{totals[stage]:>10.4f}s{share:>8.1%}"
+                + "".join(f"{percentile(values, fraction) * 1000:>8.2f}ms" for fraction in (0.5, 0.9, 0.99, 1.0))
+            )
+
+        slowest = self.page_totals()[:self.slowest]
+        if slowest:
+            lines.append(f"Slowest {len(slowest)} pages")
+            lines.extend(f"{total * 1000:>10.2f}ms  {source}" for total, source in slowest)
+        return "\n".join(lines)
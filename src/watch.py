@@ -0,0 +1,419 @@
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import tempfile
+import time
+
+from generate import is_page, log_page, page_destination, read_page, write_page
+from images import IMAGE_EXTENSIONS, PageImages, image_size, scan_images
+from manifest import hash_text
+from output import remove_output, write_output
+from sync import copy_file, sync_contents
+from template import TEMPLATE_NAME, file_version, find_template, load_template
+from typing import Dict, Iterable, List, Set, Tuple
+
+# inotify(7) event flags
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (
+    IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+    | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+)
+EVENT_HEADER = struct.Struct("iIII")
+
+class PollingWatcher:
+    def __init__(self, roots:Iterable[str], interval:float = 0.25):
+        self.roots = [os.path.abspath(root) for root in roots]
+        self.interval = interval
+        self.snapshot = self.scan()
+
+    def scan(self) -> Dict[str, tuple]:
+        snapshot = {}
+        for root in self.roots:
+            if os.path.isfile(root):
+                paths = [root]
+            else:
+                paths = [
+                    os.path.join(directory, name)
+                    for directory, _, names in os.walk(root)
+                    for name in names
+                ]
+            for path in paths:
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def watch_files(self, paths:Iterable[str]):
+        for path in paths:
+            path = os.path.abspath(path)
+            if path in self.roots:
+                continue
+            self.roots.append(path)
+            version = file_version(path)
+            if version is not None:
+                self.snapshot[path] = version
+
+    def read(self, timeout:float|None = None) -> Set[str]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self.scan()
+            changes = set(
+                path for path in snapshot.keys() | self.snapshot.keys()
+                if snapshot.get(path) != self.snapshot.get(path)
+            )
+            self.snapshot = snapshot
+            if changes:
+                return changes
+
+            remaining = self.interval if deadline is None else deadline - time.monotonic()
+            if remaining <= 0:
+                return set()
+            time.sleep(min(self.interval, remaining))
+
+    def close(self):
+        pass
+
+class InotifyWatcher:
+    def __init__(self, roots:Iterable[str]):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "Error: inotify_init1 failed")
+
+        self.directories:Dict[int, str] = {}
+        self.files = set()
+        self.roots = []
+        for root in roots:
+            root = os.path.abspath(root)
+            if os.path.isdir(root):
+                self.roots.append(root)
+                self.watch_tree(root)
+            else:
+                # Editors replace files on save, so watch the directory
+                # holding a single file rather than the file itself
+                self.files.add(root)
+                self.watch(os.path.dirname(root))
+
+    def watch(self, directory:str):
+        wd = self._add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"Error: inotify_add_watch failed on {directory}")
+        self.directories[wd] = directory
+
+    def watch_files(self, paths:Iterable[str]):
+        watched = set(self.directories.values())
+        for path in paths:
+            path = os.path.abspath(path)
+            if path in self.files:
+                continue
+            self.files.add(path)
+            directory = os.path.dirname(path)
+            if directory not in watched:
+                self.watch(directory)
+                watched.add(directory)
+
+    def watch_tree(self, root:str) -> Set[str]:
+        # Returns the files already inside, which may have been written
+        # before the watch was in place
+        files = set()
+        for directory, _, names in os.walk(root):
+            self.watch(directory)
+            files.update(os.path.join(directory, name) for name in names)
+        return files
+
+    def is_watched(self, path:str) -> bool:
+        return path in self.files or any(path.startswith(root + os.sep) for root in self.roots)
+
+    def read(self, timeout:float|None = None) -> Set[str]:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return set()
+
+        changes = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped, report every watched file
+                changes.update(self.files)
+                for root in self.roots:
+                    changes.update(self.watch_tree(root))
+                continue
+            if mask & IN_IGNORED:
+                self.directories.pop(wd, None)
+                continue
+
+            directory = self.directories.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO) and self.is_watched(path):
+                    changes.update(self.watch_tree(path))
+                continue
+            if self.is_watched(path):
+                changes.add(path)
+        return changes
+
+    def close(self):
+        os.close(self.fd)
+
+def create_watcher(roots:Iterable[str]):
+    roots = list(roots)
+    if hasattr(select, "select") and ctypes.util.find_library("c"):
+        try:
+            return InotifyWatcher(roots)
+        except (OSError, AttributeError):
+            # No inotify on this platform
+            pass
+    return PollingWatcher(roots)
+
+def wait_for_changes(watcher, debounce:float = 0.1, timeout:float|None = None) -> Set[str]:
+    # Editors often write a file several times per save, keep collecting
+    # until the tree has been quiet for the debounce interval
+    changes = watcher.read(timeout)
+    while changes:
+        more = watcher.read(debounce)
+        if not more:
+            break
+        changes |= more
+    return changes
+
+class SiteWatcher:
+    def __init__(
+        self,
+        content:str,
+        static:str,
+        template_path:str,
+        destination:str,
+        basepath:str,
+        minify:bool = False,
+        image_hints:bool = False
+    ):
+        self.content = os.path.abspath(content)
+        self.static = os.path.abspath(static)
+        self.template_path = os.path.abspath(template_path)
+        self.destination = os.path.abspath(destination)
+        self.basepath = basepath
+        self.minify = minify
+        self.image_hints = image_hints
+        # The template each rendered page was written with, and the files
+        # each template was compiled from
+        self.templates:Dict[str, str] = {}
+        # Parsed variables of every page are spilled to files here, so a
+        # template change re-templates pages without parsing their markdown
+        # again and without holding the whole site in memory
+        self.cache:tempfile.TemporaryDirectory|None = None
+        self.dependencies:Dict[str, List[str]] = {}
+        self.found:Dict[str, str] = {}
+        # Sizes of the images in destination and the ones each page shows
+        self.image_sizes:Dict[str, Tuple[int, int]] = {}
+        self.page_images:Dict[str, Dict[str, List[int]|None]] = {}
+
+    def build(self):
+        sync_contents(self.static, self.destination)
+        if self.image_hints:
+            self.image_sizes = scan_images(self.static)[0]
+        for directory, _, names in os.walk(self.content):
+            for name in sorted(names):
+                if is_page(name):
+                    self.render_page(os.path.join(directory, name))
+
+    def template_for(self, source:str) -> str:
+        return find_template(os.path.dirname(source), self.content, self.template_path, self.found)
+
+    def write(self, source:str, variables:dict, template_path:str):
+        template = load_template(template_path, self.basepath, self.minify)
+        self.dependencies[template_path] = template.dependencies
+        self.templates[source] = template_path
+        write_page(template, variables, page_destination(self.content, self.destination, source))
+
+    def cached_page(self, source:str) -> str:
+        if self.cache is None:
+            self.cache = tempfile.TemporaryDirectory(prefix="ssg-watch-")
+        return os.path.join(self.cache.name, f"{hash_text(source)}.json")
+
+    def keep_page(self, source:str, variables:dict):
+        write_output(self.cached_page(source), json.dumps(variables).encode())
+
+    def kept_page(self, source:str) -> dict|None:
+        try:
+            with open(self.cached_page(source), "rb") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def forget_page(self, source:str):
+        try:
+            os.unlink(self.cached_page(source))
+        except FileNotFoundError:
+            pass
+
+    def render_page(self, source:str):
+        template_path = self.template_for(source)
+        log_page(source, template_path, page_destination(self.content, self.destination, source))
+        images = PageImages(self.image_sizes) if self.image_hints else None
+        variables = read_page(source, self.basepath, None, images)
+        variables["Content"] = "".join(variables["Content"])
+        self.keep_page(source, variables)
+        if images is not None:
+            self.page_images[source] = images.used
+        self.write(source, variables, template_path)
+
+    def retemplate_page(self, source:str, template_path:str):
+        # A page whose variables were not kept, after a failed render, is
+        # read again
+        try:
+            variables = self.kept_page(source)
+            if variables is None:
+                self.render_page(source)
+            else:
+                self.write(source, variables, template_path)
+        except Exception as error:
+            print(f"Error: failed to render {source}: {error}")
+
+    def retemplate(self, changes:Set[str], skip:Set[str]):
+        # Re-templates the pages whose template or one of its partials is
+        # in changes, and the pages that now select another template
+        changed = set(
+            template_path for template_path, dependencies in self.dependencies.items()
+            if not changes.isdisjoint(dependencies)
+        )
+        failed = set()
+        for source, previous in list(self.templates.items()):
+            template_path = self.template_for(source)
+            if source in skip or template_path in failed:
+                continue
+            if template_path == previous and template_path not in changed:
+                continue
+            try:
+                load_template(template_path, self.basepath, self.minify)
+            except (OSError, ValueError) as error:
+                # A deleted template or a half written partial, the pages
+                # keep their old output until the next save
+                print(f"Error: failed to load {template_path}: {error}")
+                failed.add(template_path)
+                continue
+            self.retemplate_page(source, template_path)
+
+    def watched_files(self) -> Set[str]:
+        files = set([self.template_path])
+        for dependencies in self.dependencies.values():
+            files.update(dependencies)
+        return files
+
+    def update_image(self, path:str) -> str:
+        # path is under static, its copy in destination has the same size
+        key = os.path.relpath(path, self.static).replace(os.sep, "/")
+        size = image_size(path) if os.path.isfile(path) else None
+        if size is None:
+            self.image_sizes.pop(key, None)
+        else:
+            self.image_sizes[key] = size
+        return key
+
+    def update_page(self, source:str):
+        try:
+            self.render_page(source)
+        except Exception as error:
+            # Keep watching, the next save will likely fix it. The kept
+            # variables no longer match the markdown
+            print(f"Error: failed to render {source}: {error}")
+            self.forget_page(source)
+
+    def remove_page(self, source:str):
+        if self.templates.pop(source, None) is not None:
+            self.forget_page(source)
+            self.page_images.pop(source, None)
+            remove_output(self.destination, page_destination(self.content, self.destination, source))
+
+    def update_static(self, path:str, exists:bool):
+        destination = os.path.join(self.destination, os.path.relpath(path, self.static))
+        if exists:
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            copy_file(path, destination)
+        else:
+            remove_output(self.destination, destination)
+
+    def handle(self, changes:Set[str]):
+        rendered = set()
+        images = set()
+        for path in sorted(changes):
+            exists = os.path.isfile(path)
+            name = os.path.basename(path)
+            if name.startswith(".") or name.endswith("~"):
+                # Editor swap and backup files
+                continue
+            if path.startswith(self.content + os.sep):
+                if name == TEMPLATE_NAME:
+                    # Adding or removing one changes the template of every
+                    # page below it, which is sorted out by retemplate
+                    self.found.clear()
+                elif not is_page(name):
+                    # A partial included by a template, sorted out by
+                    # retemplate like any other dependency
+                    continue
+                elif exists:
+                    self.update_page(path)
+                    rendered.add(path)
+                else:
+                    self.remove_page(path)
+            elif path.startswith(self.static + os.sep):
+                self.update_static(path, exists)
+                if self.image_hints and name.lower().endswith(IMAGE_EXTENSIONS):
+                    images.add(self.update_image(path))
+
+        # Pages showing an image whose size changed are rendered again
+        for source, used in list(self.page_images.items()):
+            if source not in rendered and not images.isdisjoint(used):
+                self.update_page(source)
+                rendered.add(source)
+
+        self.retemplate(changes, rendered)
+
+    def run(self, debounce:float = 0.1):
+        self.build()
+        watcher = create_watcher([self.content, self.static, *self.watched_files()])
+        print(f"Watching {self.content}, {self.static} and {self.template_path} for changes")
+        try:
+            self.follow(watcher, debounce)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            watcher.close()
+            if self.cache is not None:
+                self.cache.cleanup()
+
+    def follow(self, watcher, debounce:float = 0.1):
+        while True:
+            changes = wait_for_changes(watcher, debounce)
+            if changes:
+                self.handle(changes)
+                # Partials included since the last change
+                watcher.watch_files(self.watched_files())